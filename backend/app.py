@@ -10,6 +10,7 @@ from models import db, bcrypt
 from flask_migrate import Migrate
 from flask_socketio import SocketIO, join_room
 from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from models import (
     Product,
     Projects,
@@ -33,6 +34,7 @@ from routes.simulation import simulation_bp
 from routes.financial import financial_bp
 from routes.consumption import consumption_bp
 from routes.optimize import optimize_bp
+from routes.jobs import jobs_bp
 from routes.products import products_bp
 from routes.energy_data import energy_data_bp
 
@@ -48,6 +50,12 @@ from routes.jobcards import jobcards_bp
 from routes.technicians import technicians_bp
 from routes.invoices import invoices_bp
 from routes.notifications import notifications_bp
+from routes.health import health_bp
+from routes.metrics import metrics_bp
+from services.warmup import start_warmup
+from services.jobs import start_dispatcher
+from services import metrics
+import services.result_store  # registers the mapper events that invalidate stored simulation runs
 
 # Initialize app
 app = Flask(__name__)
@@ -58,10 +66,6 @@ if env == "production":
 else:
     app.config.from_object('config.DevelopmentConfig')
 
-print("Using SQLALCHEMY_DATABASE_URI:", app.config['SQLALCHEMY_DATABASE_URI'])
-
-
-
 # app.config.from_object(Config)
 # # Update CORS for production - add your Vercel domain
 # LAN = "http://192.168.8.181:5173"
@@ -79,7 +83,8 @@ CORS(
     app,
     origins=app.config['ALLOWED_ORIGINS'],
     supports_credentials=True,
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", metrics.DEBUG_HEADER],
+    expose_headers=["ETag", metrics.DEBUG_HEADER],
 )
 
 socketio = SocketIO(app, cors_allowed_origins=app.config['ALLOWED_ORIGINS'], async_mode="eventlet")
@@ -92,6 +97,23 @@ mail = Mail(app)
 migrate = Migrate(app, db)
 
 logging.basicConfig(level=logging.INFO)
+db_uri = app.config.get("SQLALCHEMY_DATABASE_URI")
+app.logger.info("FLASK_ENV=%s, database %s", env,
+                make_url(db_uri).render_as_string(hide_password=True) if db_uri else None)
+
+
+# Request and stage timings, scraped from GET /api/metrics (see services/metrics.py)
+metrics.init_app(app)
+
+
+# The simulation stack (numpy/pandas/pvlib) is imported lazily by the routes and warmed
+# in a background thread once the server takes its first request (see services/warmup.py).
+# The job dispatcher starts with it (the platform health check is that first request), so
+# queued jobs resume after a restart without a client polling them (see services/jobs.py).
+@app.before_request
+def _start_background_work():
+    start_warmup()
+    start_dispatcher(app, socketio)
 
 
 @app.route("/uploads/<path:filename>")
@@ -142,6 +164,7 @@ app.register_blueprint(simulation_bp, url_prefix="/api")
 app.register_blueprint(financial_bp, url_prefix="/api")
 app.register_blueprint(consumption_bp, url_prefix="/api")
 app.register_blueprint(optimize_bp, url_prefix="/api")
+app.register_blueprint(jobs_bp, url_prefix="/api")
 app.register_blueprint(products_bp, url_prefix="/api")
 app.register_blueprint(energy_data_bp, url_prefix="/api")
 # app.register_blueprint(system_templates_bp, url_prefix='/api')
@@ -156,6 +179,8 @@ app.register_blueprint(jobcards_bp, url_prefix="/api")
 app.register_blueprint(technicians_bp, url_prefix="/api")
 app.register_blueprint(invoices_bp, url_prefix="/api")
 app.register_blueprint(notifications_bp, url_prefix="/api")
+app.register_blueprint(health_bp, url_prefix="/api")
+app.register_blueprint(metrics_bp, url_prefix="/api")
 
 
 @event.listens_for(Product, "after_insert")
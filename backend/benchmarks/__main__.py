@@ -0,0 +1,24 @@
+# benchmarks/__main__.py
+"""
+Runs every benchmark suite: `python benchmarks` (add --update to rewrite the baselines).
+
+  engines.py      simulation, tariff and financial engines against engines_baseline.json
+  importtime.py   `import app` time and lazy imports against importtime_app.txt
+  query_counts.py statements per list request (GET /api/projects) on sqlite
+"""
+import os
+import subprocess
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITES = ("engines.py", "importtime.py", "query_counts.py")
+
+if __name__ == "__main__":
+    failed = []
+    for suite in SUITES:
+        print(f"== {suite}")
+        if subprocess.run([sys.executable, os.path.join(BENCHMARK_DIR, suite), *sys.argv[1:]]).returncode != 0:
+            failed.append(suite)
+    if failed:
+        print(f"FAILED: {', '.join(failed)}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,225 @@
+# benchmarks/engines.py
+"""
+Benchmarks for the simulation, tariff and financial engines, on the synthetic fixtures in
+benchmarks/fixtures.py (no database, no network).
+
+Each benchmark is timed REPEAT times after one warm-up run (numba compilation, caches);
+the fastest run is compared with benchmarks/engines_baseline.json:
+
+  * a benchmark fails when it is more than REGRESSION_TOLERANCE slower than its baseline
+    (and at least MIN_REGRESSION_MS slower, so sub-millisecond noise does not count)
+  * a benchmark fails when its check value (a KPI of its output) differs from the
+    baseline's, i.e. the engine now computes something else
+
+    python benchmarks/engines.py                 # check; exits 1 on a regression
+    python benchmarks/engines.py --update        # rewrite the baseline after an intended change
+    python benchmarks/engines.py --only tariff   # benchmarks whose name contains "tariff"
+
+Baselines are machine-specific: regenerate them on the machine that runs the check.
+"""
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "engines_baseline.json")
+REGRESSION_TOLERANCE = 0.25
+MIN_REGRESSION_MS = 0.5
+REPEAT = 7
+
+sys.path.insert(0, BACKEND_DIR)
+# Built-in generation profiles only, compiled from the CSV into a scratch store
+os.environ["GENERATION_PROFILE_DIR"] = tempfile.mkdtemp(prefix="bench_profiles_")
+atexit.register(shutil.rmtree, os.environ["GENERATION_PROFILE_DIR"], ignore_errors=True)
+
+import fixtures  # noqa: E402
+
+BENCHMARKS = {}  # name -> setup() returning (run, check); check(result) is a number
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# ---------------------------------------------------------------------------
+#  Simulation
+# ---------------------------------------------------------------------------
+def _simulate(system_type, panel_kw, inverter_kva, battery_kwh, allow_export=False, generator=None):
+    from services.simulation_engine import simulate_arrays
+    index, demand = fixtures.year_index(), fixtures.demand_kw()
+    generation = fixtures.generation_kw(panel_kw)
+
+    def run():
+        return simulate_arrays(index, demand, generation, panel_kw, battery_kwh, system_type, inverter_kva,
+                               allow_export, generator_config=generator, include_index=True)
+    return run
+
+
+@benchmark("simulate/grid_export")
+def _simulate_grid():
+    return _simulate("grid", 40, 33, 0, allow_export=True), lambda r: sum(r["export_to_grid"]) * 0.5
+
+
+@benchmark("simulate/hybrid")
+def _simulate_hybrid():
+    return _simulate("hybrid", 40, 33, 60), lambda r: sum(r["import_from_grid"]) * 0.5
+
+
+@benchmark("simulate/offgrid_generator")
+def _simulate_offgrid_generator():
+    generator = {"enabled": True, "kva": 20, "min_loading_pct": 30, "battery_start_soc": 25, "battery_stop_soc": 80}
+    return (_simulate("off-grid", 50, 40, 120, generator=generator),
+            lambda r: r["diesel_liters_total"])
+
+
+@benchmark("simulate/quick")
+def _quick_simulation():
+    from services.simulation_engine import run_quick_simulation
+    profile = fixtures.quick_load_profile(scaler=0.6)
+
+    def run():
+        return run_quick_simulation(profile, 30, 20, "Hybrid", 25)
+    return run, lambda r: sum(r["import_from_grid"]) * 0.5
+
+
+@benchmark("generator/get_fuel_consumption")
+def _fuel_consumption():
+    from services.simulation_engine import get_fuel_consumption
+    cases = [(size, load / 100) for size in (5, 9, 17, 27, 45, 66, 110, 220, 500) for load in range(0, 121, 5)] * 40
+
+    def run():
+        return [get_fuel_consumption(size, load) for size, load in cases]
+    return run, lambda r: sum(r)
+
+
+# ---------------------------------------------------------------------------
+#  Tariffs
+# ---------------------------------------------------------------------------
+@benchmark("tariff/rate_lookup")
+def _tariff_lookup():
+    from services.tariff_engine import TariffEngine
+    engine = TariffEngine(fixtures.TOU_TARIFF)
+    timestamps = list(fixtures.year_index().tz_localize(None)[::4].to_pydatetime())
+
+    def run():
+        return [engine.get_energy_rate_r_per_kwh(ts) for ts in timestamps]
+    return run, lambda r: float(sum(r))
+
+
+@benchmark("tariff/rate_vector")
+def _tariff_vector():
+    from services.tariff_engine import TariffEngine
+    engine = TariffEngine(fixtures.TOU_TARIFF)
+    index = fixtures.year_index()
+
+    def run():
+        return engine.rate_vector(index)
+    return run, lambda r: float(r[0].sum())
+
+
+# ---------------------------------------------------------------------------
+#  Financials
+# ---------------------------------------------------------------------------
+def _financials(project, sim_response, system_cost):
+    from services.financial_calcs import run_quick_financials
+
+    def run():
+        return run_quick_financials(sim_response, system_cost, project)
+    return run, lambda r: r["annual_savings"]
+
+
+@benchmark("financials/grid")
+def _financials_grid():
+    sim = _simulate("grid", 40, 33, 0, allow_export=False)()
+    return _financials(fixtures.sample_project("grid"), sim, 650000.0)
+
+
+@benchmark("financials/offgrid")
+def _financials_offgrid():
+    sim = _simulate("off-grid", 50, 40, 120)()
+    return _financials(fixtures.sample_project("off-grid", battery_kwh=120), sim, 1200000.0)
+
+
+@benchmark("financials/offgrid_generator")
+def _financials_offgrid_generator():
+    generator = {"enabled": True, "kva": 20, "diesel_price_r_per_liter": 23.5}
+    sim = _simulate("off-grid", 50, 40, 120, generator=generator)()
+    return _financials(fixtures.sample_project("off-grid", battery_kwh=120), sim, 1350000.0)
+
+
+# ---------------------------------------------------------------------------
+#  Runner
+# ---------------------------------------------------------------------------
+def measure(setup, repeat=REPEAT):
+    run, check = setup()
+    result = run()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - started) * 1000)
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(result["error"])
+    return {"min_ms": round(min(timings), 3), "median_ms": round(statistics.median(timings), 3),
+            "check": round(float(check(result)), 3)}
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as fh:
+        return json.load(fh)
+
+
+def main(argv):
+    only = argv[argv.index("--only") + 1] if "--only" in argv else ""
+    names = [name for name in BENCHMARKS if only in name]
+    baseline = load_baseline()
+    previous = baseline.get("results", {})
+    python = ".".join(platform.python_version_tuple()[:2])
+    if baseline and (baseline.get("machine") != platform.machine()
+                     or not baseline.get("python", "").startswith(python + ".")):
+        print(f"note: baseline was recorded on {baseline.get('machine')} / Python {baseline.get('python')}")
+
+    results, failures = {}, []
+    print(f"{'benchmark':<34}{'min ms':>10}{'median ms':>11}{'baseline':>10}{'ratio':>8}  check")
+    for name in names:
+        results[name] = current = measure(BENCHMARKS[name])
+        base = previous.get(name)
+        ratio = current["min_ms"] / base["min_ms"] if base and base["min_ms"] else None
+        print(f"{name:<34}{current['min_ms']:>10.2f}{current['median_ms']:>11.2f}"
+              f"{(base['min_ms'] if base else float('nan')):>10.2f}{(ratio or float('nan')):>8.2f}  {current['check']}")
+        if base is None:
+            continue
+        if (current["min_ms"] > base["min_ms"] * (1 + REGRESSION_TOLERANCE)
+                and current["min_ms"] - base["min_ms"] > MIN_REGRESSION_MS):
+            failures.append(f"{name}: {current['min_ms']:.2f} ms vs baseline {base['min_ms']:.2f} ms")
+        if current["check"] != base["check"]:
+            failures.append(f"{name}: check value {current['check']} differs from baseline {base['check']}")
+
+    if "--update" in argv:
+        merged = {**previous, **results}
+        with open(BASELINE_PATH, "w") as fh:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "repeat": REPEAT, "results": merged}, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"wrote {BASELINE_PATH}")
+        return 0
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,74 @@
+# benchmarks/fixtures.py
+"""
+Synthetic, deterministic inputs for benchmarks/engines.py; nothing here touches the database.
+
+  demand_kw()          a year of 30-minute demand (seeded daily/weekly/seasonal shape + noise)
+  generation_kw()      a generation profile column of utils/generation_profile.csv, scaled to kWp
+  sample_project()     the handful of project fields run_quick_financials reads
+  TOU_TARIFF           the Time-of-Use tariff from the tariff_engine.py self-test
+"""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATION_CSV = os.path.join(BACKEND_DIR, "utils", "generation_profile.csv")
+YEAR = 2025
+TZ = "Africa/Johannesburg"
+SEED = 20250101
+
+TOU_TARIFF = {
+    "id": 25, "name": "Complex TOU Tariff",
+    "rates": [
+        {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "689.90", "season": "high", "time_of_use": "peak"},
+        {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "209.89", "season": "high", "time_of_use": "standard"},
+        {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "114.61", "season": "high", "time_of_use": "off_peak"},
+        {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "225.90", "season": "low", "time_of_use": "peak"},
+        {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "155.87", "season": "low", "time_of_use": "standard"},
+        {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "99.38", "season": "low", "time_of_use": "off_peak"},
+        {"charge_category": "fixed", "rate_unit": "R/POD/day", "rate_value": "9.44", "season": "all", "time_of_use": "all"},
+        {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "108.30", "season": "all", "time_of_use": "all"},
+        {"charge_category": "demand", "rate_unit": "R/kVA/month", "rate_value": "50.00", "season": "high", "time_of_use": "peak"},
+    ],
+}
+
+
+def year_index():
+    """The full-year 30-minute index load_project_demand builds (17,520 intervals)."""
+    return pd.date_range(start=f"{YEAR}-01-01", end=f"{YEAR}-12-31 23:59", freq="30min", tz=TZ)
+
+
+def demand_kw(mean_kw=12.0, seed=SEED):
+    """Commercial-looking load: daytime hump, quieter weekends, winter peak, gamma noise."""
+    index = year_index()
+    hours = index.hour.to_numpy() + index.minute.to_numpy() / 60
+    daily = 0.55 + 0.45 * np.clip(np.sin((hours - 5) / 14 * np.pi), 0, None)
+    weekly = np.where(index.dayofweek.to_numpy() >= 5, 0.7, 1.0)
+    seasonal = 1 + 0.15 * np.cos((index.dayofyear.to_numpy() - 180) / 365 * 2 * np.pi)
+    noise = np.random.default_rng(seed).gamma(8.0, 1 / 8.0, len(index))
+    shape = daily * weekly * seasonal * noise
+    return shape / shape.mean() * mean_kw
+
+
+def generation_percentages(column="midrand_ew_5"):
+    """A column of the generation profile CSV (% of kWp per interval)."""
+    return pd.read_csv(GENERATION_CSV, usecols=[column])[column].to_numpy(dtype=float)
+
+
+def generation_kw(panel_kw, column="midrand_ew_5"):
+    return generation_percentages(column) / 100 * panel_kw
+
+
+def quick_load_profile(scaler=1.0):
+    """The [{timestamp, demand_kw}] list /proposal_data builds from a LoadProfiles row."""
+    index = year_index().tz_localize(None)
+    return [{"timestamp": ts, "demand_kw": float(kw) * scaler}
+            for ts, kw in zip(index.strftime("%Y-%m-%dT%H:%M:%S"), demand_kw())]
+
+
+def sample_project(system_type="grid", custom_flat_rate=2.85, battery_kwh=0, project_value_excl_vat=650000):
+    """Stands in for a Projects row: only the attributes run_quick_financials reads."""
+    return SimpleNamespace(system_type=system_type, custom_flat_rate=custom_flat_rate, tariff_id=None,
+                           battery_kwh=battery_kwh, project_value_excl_vat=project_value_excl_vat)
@@ -0,0 +1,95 @@
+# benchmarks/importtime.py
+"""
+Import-time budget for the web app.
+
+Runs `python -X importtime -c "import app"` in fresh interpreters (best of RUNS) and
+compares it with the checked-in report, benchmarks/importtime_app.txt:
+
+  * none of LAZY_MODULES may be imported by `import app` (routes import the
+    simulation stack inside their handlers; services/warmup.py loads it later)
+  * the total may not exceed the report's total by more than REGRESSION_TOLERANCE
+
+    python benchmarks/importtime.py            # check; exits 1 on a regression
+    python benchmarks/importtime.py --update   # rewrite the report after an intended change
+
+Run from the backend directory with the production requirements installed.
+"""
+import os
+import platform
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(BACKEND_DIR, "benchmarks", "importtime_app.txt")
+LAZY_MODULES = ("numpy", "pandas", "scipy", "pvlib")
+REGRESSION_TOLERANCE = 0.25
+RUNS = 3
+REPORT_TOP = 30
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure():
+    """(total_ms, [(cumulative_ms, self_ms, depth, module)]) of the fastest of RUNS imports."""
+    best = None
+    for _ in range(RUNS):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                              cwd=BACKEND_DIR, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"`import app` failed:\n{proc.stderr[-2000:]}")
+        rows = [(int(m.group(2)) / 1000, int(m.group(1)) / 1000, (len(m.group(3)) - 1) // 2, m.group(4))
+                for m in map(_LINE.match, proc.stderr.splitlines()) if m]
+        total = next(cumulative for cumulative, _, depth, module in rows if module == "app" and depth == 0)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+def write_report(total, rows):
+    top = sorted((row for row in rows if row[2] <= 1), reverse=True)[:REPORT_TOP]
+    lines = [
+        "# python -X importtime -c 'import app' (best of %d runs; regenerate with benchmarks/importtime.py --update)" % RUNS,
+        f"# python: {platform.python_version()}",
+        f"# total_ms: {total:.1f}",
+        "# cumulative_ms  self_ms  module (top-level imports of app)",
+    ]
+    lines += [f"{cumulative:15.1f}  {self_ms:7.1f}  {module}" for cumulative, self_ms, _, module in top]
+    with open(REPORT_PATH, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+
+
+def baseline_total():
+    with open(REPORT_PATH) as fh:
+        for line in fh:
+            if line.startswith("# total_ms:"):
+                return float(line.split(":", 1)[1])
+    raise ValueError(f"{REPORT_PATH} has no total_ms line")
+
+
+def main(argv):
+    total, rows = measure()
+    eager = sorted({module for _, _, _, module in rows if module.split(".")[0] in LAZY_MODULES
+                    and module.count(".") == 0})
+    print(f"import app: {total:.1f} ms")
+
+    if "--update" in argv:
+        write_report(total, rows)
+        print(f"wrote {REPORT_PATH}")
+        return 0
+
+    failures = []
+    if eager:
+        failures.append(f"imported eagerly by `import app`: {', '.join(eager)}")
+    baseline = baseline_total()
+    limit = baseline * (1 + REGRESSION_TOLERANCE)
+    print(f"baseline: {baseline:.1f} ms, limit: {limit:.1f} ms")
+    if total > limit:
+        failures.append(f"import time {total:.1f} ms exceeds {limit:.1f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+# benchmarks/query_counts.py
+"""
+Query-count checks for list endpoints, on an in-memory sqlite database.
+
+  GET /api/projects                  PROJECT_LIST_QUERIES statements for every project count
+  GET /api/projects?view=summary     PROJECT_SUMMARY_QUERIES statements
+  GET /api/projects?limit=&cursor=   pages through every non-deleted project exactly once,
+                                     in list order, rows with a NULL updated_at included
+
+Statements are counted with a before_cursor_execute listener on the engine, so lazy
+loads that slip into the serializers show up as a count that grows with PROJECT_COUNTS.
+
+    python benchmarks/query_counts.py        # exits 1 on a failure
+    python -m benchmarks.query_counts        # the same, from the backend directory
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+PROJECT_COUNTS = (10, 60, 300)
+PROJECT_LIST_QUERIES = 3     # projects (+ client and users joined), tariffs, tariff rates
+PROJECT_SUMMARY_QUERIES = 2  # no rates
+PAGE_SIZE = 7
+
+
+def make_app():
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from sqlalchemy.dialects.postgresql import JSONB
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(JSONB, "sqlite")
+    def _jsonb_as_json(element, compiler, **kw):  # the models use Postgres JSONB columns
+        return "JSON"
+
+    from models import db
+    from routes.projects import projects_bp
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["JWT_SECRET_KEY"] = "query-counts"
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(projects_bp, url_prefix="/api")
+    return app
+
+
+def populate(count):
+    """`count` projects over a few clients, users and tariffs; every 7th has no updated_at, every 17th is deleted."""
+    from models import db, Clients, Projects, Tariffs, TariffRates, User, UserRole
+
+    db.drop_all()
+    db.create_all()
+    users = [User(email=f"user{i}@example.com", first_name="User", last_name=str(i), password_hash="x",
+                  role=list(UserRole)[0]) for i in range(5)]
+    tariffs = [Tariffs(name=f"Tariff {i}", power_user_type="SPU", tariff_category="Residential", structure="flat")
+               for i in range(8)]
+    clients = [Clients(client_name=f"Client {i}", email=f"client{i}@example.com") for i in range(max(1, count // 3))]
+    db.session.add_all(users + tariffs + clients)
+    db.session.flush()
+    for tariff in tariffs:
+        for k in range(4):
+            db.session.add(TariffRates(tariff_id=tariff.id, charge_name=f"energy {k}", charge_category="energy",
+                                       rate_unit="c/kWh", rate_value=100 + k))
+
+    updated = datetime(2025, 6, 1, 12)
+    for i in range(count):
+        db.session.add(Projects(
+            client_id=clients[i % len(clients)].id, name=f"Project {i}", design_type="detailed",
+            project_type="residential", created_by_id=users[i % 5].id,
+            updated_by_id=users[(i + 1) % 5].id if i % 4 else None,
+            tariff_id=tariffs[i % 8].id if i % 3 else None, is_deleted=(i % 17 == 0),
+            updated_at=updated - timedelta(hours=i // 3),  # ties on purpose: the id breaks them
+        ))
+    db.session.commit()
+    # The column has a Python-side default, so NULLs are set afterwards
+    db.session.execute(db.text("UPDATE projects SET updated_at = NULL WHERE id % 7 = 3"))
+    db.session.commit()
+
+
+def main():
+    from sqlalchemy import event
+    from models import db
+
+    app = make_app()
+    client = app.test_client()
+    statements = [0]
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+    def get(url):
+        statements[0] = 0
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+        return response.get_json(), statements[0]
+
+    failures = []
+    for count in PROJECT_COUNTS:
+        with app.app_context():
+            populate(count)
+        listing, list_queries = get("/api/projects")
+        _, summary_queries = get("/api/projects?view=summary")
+
+        ids, pages, cursor = [], 0, None
+        while True:
+            page, _ = get(f"/api/projects?limit={PAGE_SIZE}" + (f"&cursor={cursor}" if cursor else ""))
+            ids += [p["id"] for p in page["projects"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        null_rows = sum(1 for p in listing if p["updated_at"] is None)
+
+        print(f"{count:>4} projects  list {list_queries} queries  summary {summary_queries} queries  "
+              f"{pages} pages of {PAGE_SIZE}  ({null_rows} without updated_at)")
+        if list_queries != PROJECT_LIST_QUERIES:
+            failures.append(f"{count} projects: GET /projects took {list_queries} queries, "
+                            f"expected {PROJECT_LIST_QUERIES}")
+        if summary_queries != PROJECT_SUMMARY_QUERIES:
+            failures.append(f"{count} projects: ?view=summary took {summary_queries} queries, "
+                            f"expected {PROJECT_SUMMARY_QUERIES}")
+        if ids != [p["id"] for p in listing]:
+            failures.append(f"{count} projects: paging did not return every project once, in list order")
+        if not null_rows:
+            failures.append(f"{count} projects: no rows without updated_at to page past")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,9 +8,6 @@ env = os.environ.get("FLASK_ENV", "development")
 env_file = f".env.{env}"
 load_dotenv(dotenv_path=Path(__file__).parent / env_file)
 
-print('Loaded env file: ', env_file)
-print('FLASK_ENV:', env)
-
 def _csv(name: str, default: str):
     return [x.strip() for x in os.environ.get(name, default).split(",") if x.strip()]
 
@@ -42,6 +39,9 @@ class Config:
         "FRONTEND_URL", "http://localhost:5173"
     )
 
+    # Bearer token Prometheus scrapes GET /api/metrics with (admins may use their JWT instead)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
     ALLOWED_ORIGINS = _csv(
         "CORS_ORIGINS", "http://localhost:3000,http://localhost:5173"
     )
@@ -200,4 +200,60 @@ def import_tariffs(spu_filepath, lpu_filepath):
     except Exception as e:
         db.session.rollback()
         print(f"An error occurred: {e}")
-        print("Rolled back database changes.")
\ No newline at end of file
+        print("Rolled back database changes.")
+
+@app.cli.command("warm-weather-cache")
+@click.argument("coordinates", nargs=-1)
+@click.option("--from-projects", is_flag=True, help="Also warm every project location in the database.")
+@click.option("--csv", "csv_path", default=None, help="Fill a single coordinate from a local TMY CSV instead of PVGIS.")
+def warm_weather_cache(coordinates, from_projects, csv_path):
+    """
+    Pre-fetches PVGIS TMY weather data into the on-disk cache.
+    Coordinates are given as LAT,LON (e.g. -25.99,28.13).
+    """
+    from models import Projects
+    from services.weather_cache import fill_from_csv, warm
+
+    try:
+        coords = [tuple(float(x) for x in c.split(",")) for c in coordinates]
+    except ValueError:
+        print("Error: coordinates must be given as LAT,LON")
+        return
+
+    if csv_path:
+        if len(coords) != 1:
+            print("Error: --csv needs exactly one LAT,LON coordinate")
+            return
+        key = fill_from_csv(coords[0][0], coords[0][1], csv_path)
+        print(f"Cached {csv_path} for site {key}")
+        return
+
+    if from_projects:
+        coords += [(p.latitude, p.longitude) for p in Projects.query.all() if p.latitude and p.longitude]
+
+    if not coords:
+        print("Nothing to warm: pass LAT,LON coordinates or --from-projects")
+        return
+
+    for key, status in warm(coords).items():
+        print(f"{key}: {status}")
+
+
+@app.cli.command("pack-energy-series")
+def pack_energy_series():
+    """
+    Packs energy_series for every project whose EnergyData has no packed copy yet
+    (data written before migration 4c2d9e7a1b05 ran, or by tools outside the app).
+    """
+    from services.energy_series import rebuild_series, unpacked_project_ids
+
+    project_ids = unpacked_project_ids()
+    for project_id in project_ids:
+        try:
+            timestamps, _ = rebuild_series(project_id)
+            db.session.commit()
+            print(f"project {project_id}: packed {len(timestamps)} points")
+        except Exception as e:
+            db.session.rollback()
+            print(f"project {project_id}: failed ({e})")
+    print(f"Packed {len(project_ids)} projects")
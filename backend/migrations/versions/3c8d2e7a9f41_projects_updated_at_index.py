@@ -0,0 +1,26 @@
+"""add (updated_at, id) index on projects for keyset pagination
+
+Revision ID: 3c8d2e7a9f41
+Revises: 9a4e6c1f3b27
+Create Date: 2025-11-14 10:22:07.415390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8d2e7a9f41'
+down_revision = '9a4e6c1f3b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index('ix_projects_updated_at_id', ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_projects_updated_at_id')
@@ -0,0 +1,120 @@
+"""add energy_data index and energy_series table
+
+Revision ID: 4c2d9e7a1b05
+Revises: 3e1ae3aa341c
+Create Date: 2025-11-03 09:12:41.518203
+
+"""
+from datetime import datetime
+
+from alembic import op
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2d9e7a1b05'
+down_revision = '3e1ae3aa341c'
+branch_labels = None
+depends_on = None
+
+# Same layout as services/energy_series.pack_series (copied: migrations must not import app code)
+SERIES_DTYPE = '<f4'
+OFFSETS_DTYPE = '<i4'
+
+energy_data = sa.table(
+    'energy_data',
+    sa.column('project_id', sa.Integer),
+    sa.column('timestamp', sa.DateTime),
+    sa.column('demand_kw', sa.Float),
+)
+energy_series = sa.table(
+    'energy_series',
+    sa.column('project_id', sa.Integer),
+    sa.column('year', sa.Integer),
+    sa.column('start', sa.DateTime),
+    sa.column('step_seconds', sa.Integer),
+    sa.column('count', sa.Integer),
+    sa.column('dtype', sa.String),
+    sa.column('values', sa.LargeBinary),
+    sa.column('offsets', sa.LargeBinary),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def _pack_years(project_id, rows):
+    """One energy_series row per calendar year of sorted (timestamp, demand_kw) rows."""
+    timestamps = np.array([r[0] for r in rows], dtype='datetime64[ns]')
+    values = np.array([r[1] for r in rows], dtype=np.float64)
+    years = pd.DatetimeIndex(timestamps).year.to_numpy()
+    packed = []
+    for year in np.unique(years):
+        mask = years == year
+        ts, vals = timestamps[mask], values[mask]
+        seconds = ((ts - ts[0]) // np.timedelta64(1, 's')).astype(np.int64)
+        steps = np.diff(seconds)
+        step_seconds, offsets = None, None
+        if len(steps) and steps[0] > 0 and (steps == steps[0]).all():
+            step_seconds = int(steps[0])
+        else:
+            offsets = seconds.astype(OFFSETS_DTYPE).tobytes()
+        packed.append({
+            'project_id': project_id,
+            'year': int(year),
+            'start': pd.Timestamp(ts[0]).to_pydatetime(),
+            'step_seconds': step_seconds,
+            'count': len(vals),
+            'dtype': SERIES_DTYPE,
+            'values': vals.astype(SERIES_DTYPE).tobytes(),
+            'offsets': offsets,
+            'updated_at': datetime.now(),
+        })
+    return packed
+
+
+def upgrade():
+    with op.batch_alter_table('energy_data', schema=None) as batch_op:
+        batch_op.create_index('ix_energy_data_project_id_timestamp', ['project_id', 'timestamp'], unique=False)
+
+    op.create_table('energy_series',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('start', sa.DateTime(), nullable=False),
+    sa.Column('step_seconds', sa.Integer(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('dtype', sa.String(length=8), nullable=False),
+    sa.Column('values', sa.LargeBinary(), nullable=False),
+    sa.Column('offsets', sa.LargeBinary(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('project_id', 'year', name='uq_energy_series_project_year')
+    )
+    with op.batch_alter_table('energy_series', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_energy_series_project_id'), ['project_id'], unique=False)
+
+    # Pack existing energy data one project at a time, so reads never have to write it
+    connection = op.get_bind()
+    project_ids = connection.execute(
+        sa.select(energy_data.c.project_id).distinct().where(energy_data.c.project_id.isnot(None))
+    ).scalars().all()
+    for project_id in project_ids:
+        rows = connection.execute(
+            sa.select(energy_data.c.timestamp, energy_data.c.demand_kw)
+            .where(energy_data.c.project_id == project_id, energy_data.c.timestamp.isnot(None))
+            .order_by(energy_data.c.timestamp)
+        ).all()
+        if rows:
+            connection.execute(energy_series.insert(), _pack_years(project_id, rows))
+
+
+def downgrade():
+    with op.batch_alter_table('energy_series', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_energy_series_project_id'))
+
+    op.drop_table('energy_series')
+
+    with op.batch_alter_table('energy_data', schema=None) as batch_op:
+        batch_op.drop_index('ix_energy_data_project_id_timestamp')
@@ -0,0 +1,122 @@
+"""pack load_profiles.profile_data into start/step + float32 columns
+
+Revision ID: 5e1b7c9d2a63
+Revises: 3c8d2e7a9f41
+Create Date: 2025-11-17 08:36:19.602541
+
+"""
+from alembic import op
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1b7c9d2a63'
+down_revision = '3c8d2e7a9f41'
+branch_labels = None
+depends_on = None
+
+# Same layout as services/energy_series.pack_series (copied: migrations must not import app code)
+VALUES_DTYPE = '<f4'
+OFFSETS_DTYPE = '<i4'
+
+load_profiles = sa.table(
+    'load_profiles',
+    sa.column('id', sa.Integer),
+    sa.column('profile_data', sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), 'postgresql')),
+    sa.column('data_start', sa.DateTime),
+    sa.column('data_step_seconds', sa.Integer),
+    sa.column('data_count', sa.Integer),
+    sa.column('data_dtype', sa.String),
+    sa.column('data_values', sa.LargeBinary),
+    sa.column('data_offsets', sa.LargeBinary),
+)
+
+
+def _pack(rows):
+    first = rows[0]
+    ts_key = 'timestamp' if 'timestamp' in first else 'Timestamp'
+    kw_key = 'demand_kw' if 'demand_kw' in first else 'Demand_kW'
+    timestamps = pd.to_datetime([r.get(ts_key) for r in rows], errors='coerce')
+    values = pd.to_numeric(pd.Series([r.get(kw_key) for r in rows]), errors='coerce').fillna(0).to_numpy(dtype=float)
+    keep = ~timestamps.isna()
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_localize(None)
+    timestamps, values = timestamps[keep], values[keep]
+    order = np.argsort(timestamps.asi8, kind='stable')
+    timestamps, values = timestamps.values[order], values[order]
+    if not len(values):
+        return None
+
+    seconds = ((timestamps - timestamps[0]) // np.timedelta64(1, 's')).astype(np.int64)
+    steps = np.diff(seconds)
+    step_seconds, offsets = None, None
+    if len(steps) and steps[0] > 0 and (steps == steps[0]).all():
+        step_seconds = int(steps[0])
+    else:
+        offsets = seconds.astype(OFFSETS_DTYPE).tobytes()
+    return {
+        'data_start': pd.Timestamp(timestamps[0]).to_pydatetime(),
+        'data_step_seconds': step_seconds,
+        'data_count': len(values),
+        'data_dtype': VALUES_DTYPE,
+        'data_values': values.astype(VALUES_DTYPE).tobytes(),
+        'data_offsets': offsets,
+        'profile_data': None,
+    }
+
+
+def _unpack(row):
+    values = np.frombuffer(row.data_values, dtype=row.data_dtype or VALUES_DTYPE).astype(np.float64)
+    if row.data_step_seconds:
+        seconds = np.arange(row.data_count, dtype=np.int64) * row.data_step_seconds
+    else:
+        seconds = np.frombuffer(row.data_offsets, dtype=OFFSETS_DTYPE).astype(np.int64)
+    timestamps = pd.DatetimeIndex(np.datetime64(row.data_start, 'ns') + seconds.astype('timedelta64[s]'))
+    return [{'timestamp': ts, 'demand_kw': kw}
+            for ts, kw in zip(timestamps.strftime('%Y-%m-%dT%H:%M:%S'), values.tolist())]
+
+
+def upgrade():
+    with op.batch_alter_table('load_profiles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_start', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('data_step_seconds', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('data_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('data_dtype', sa.String(length=8), nullable=True))
+        batch_op.add_column(sa.Column('data_values', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('data_offsets', sa.LargeBinary(), nullable=True))
+        batch_op.alter_column('profile_data', existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+
+    # Convert one profile at a time so only one JSON document is in memory
+    connection = op.get_bind()
+    ids = connection.execute(sa.select(load_profiles.c.id).where(load_profiles.c.profile_data.isnot(None))).scalars().all()
+    for profile_id in ids:
+        rows = connection.execute(
+            sa.select(load_profiles.c.profile_data).where(load_profiles.c.id == profile_id)
+        ).scalar()
+        packed = _pack(rows) if rows else None
+        if packed is not None:
+            connection.execute(load_profiles.update().where(load_profiles.c.id == profile_id).values(**packed))
+
+
+def downgrade():
+    connection = op.get_bind()
+    packed_ids = connection.execute(
+        sa.select(load_profiles.c.id).where(load_profiles.c.data_values.isnot(None))
+    ).scalars().all()
+    for profile_id in packed_ids:
+        row = connection.execute(sa.select(load_profiles).where(load_profiles.c.id == profile_id)).one()
+        connection.execute(load_profiles.update().where(load_profiles.c.id == profile_id)
+                           .values(profile_data=_unpack(row)))
+    connection.execute(load_profiles.update().where(load_profiles.c.profile_data.is_(None)).values(profile_data=[]))
+
+    with op.batch_alter_table('load_profiles', schema=None) as batch_op:
+        batch_op.alter_column('profile_data', existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=False)
+        batch_op.drop_column('data_offsets')
+        batch_op.drop_column('data_values')
+        batch_op.drop_column('data_dtype')
+        batch_op.drop_column('data_count')
+        batch_op.drop_column('data_step_seconds')
+        batch_op.drop_column('data_start')
@@ -0,0 +1,26 @@
+"""add a heartbeat (updated_at) to optimization_runs
+
+Revision ID: 6d8e2f4a9c15
+Revises: 5e1b7c9d2a63
+Create Date: 2025-11-19 10:04:52.114630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d8e2f4a9c15'
+down_revision = '5e1b7c9d2a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('optimization_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('optimization_runs', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
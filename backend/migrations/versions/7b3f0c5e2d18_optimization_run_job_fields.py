@@ -0,0 +1,42 @@
+"""add job status, progress, result and timings to optimization_runs
+
+Revision ID: 7b3f0c5e2d18
+Revises: 4c2d9e7a1b05
+Create Date: 2025-11-05 14:27:09.331870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3f0c5e2d18'
+down_revision = '4c2d9e7a1b05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('optimization_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('job_type', sa.String(length=20), server_default='optimize', nullable=False))
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='succeeded', nullable=False))
+        batch_op.add_column(sa.Column('progress', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('message', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('result_json', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('error', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('started_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('finished_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_optimization_runs_status_created_at', ['status', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('optimization_runs', schema=None) as batch_op:
+        batch_op.drop_index('ix_optimization_runs_status_created_at')
+        batch_op.drop_column('finished_at')
+        batch_op.drop_column('started_at')
+        batch_op.drop_column('error')
+        batch_op.drop_column('result_json')
+        batch_op.drop_column('message')
+        batch_op.drop_column('progress')
+        batch_op.drop_column('status')
+        batch_op.drop_column('job_type')
@@ -0,0 +1,26 @@
+"""drop simulation_runs.hits (store hits are counted in /api/metrics)
+
+Revision ID: 8b5d1e3f7a29
+Revises: 6d8e2f4a9c15
+Create Date: 2025-11-20 09:12:37.408215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5d1e3f7a29'
+down_revision = '6d8e2f4a9c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('simulation_runs', schema=None) as batch_op:
+        batch_op.drop_column('hits')
+
+
+def downgrade():
+    with op.batch_alter_table('simulation_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hits', sa.Integer(), nullable=False, server_default='0'))
@@ -0,0 +1,50 @@
+"""add simulation_runs result store and project input versions
+
+Revision ID: 9a4e6c1f3b27
+Revises: 7b3f0c5e2d18
+Create Date: 2025-11-12 09:41:52.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e6c1f3b27'
+down_revision = '7b3f0c5e2d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('simulation_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('input_hash', sa.String(length=64), nullable=False),
+        sa.Column('inputs_json', sa.JSON(), nullable=True),
+        sa.Column('kpis_json', sa.JSON(), nullable=True),
+        sa.Column('arrays', sa.LargeBinary(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('hits', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('input_hash')
+    )
+    with op.batch_alter_table('simulation_runs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_simulation_runs_project_id'), ['project_id'], unique=False)
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('energy_version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('tariff_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('tariff_version')
+        batch_op.drop_column('energy_version')
+
+    with op.batch_alter_table('simulation_runs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_simulation_runs_project_id'))
+
+    op.drop_table('simulation_runs')
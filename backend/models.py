@@ -219,6 +219,10 @@ class Clients(db.Model):
 
 class Projects(db.Model):
     __tablename__ = "projects"
+    __table_args__ = (
+        # keyset pagination of the project list (GET /api/projects?limit=...)
+        db.Index('ix_projects_updated_at_id', 'updated_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -252,7 +256,7 @@ class Projects(db.Model):
     )  # Whether to use PVGIS for generation profiles
     generation_profile_name = db.Column(
         db.String(100), nullable=True, default="midrand_ew_5"
-    )
+    )  # services.generation_profiles.DEFAULT_GENERATION_PROFILE (not imported: it loads numpy)
     from_standard_template = db.Column(db.Boolean, default=False)
     template_id = db.Column(db.Integer, nullable=True)
     template_name = db.Column(db.String(100), nullable=True)
@@ -271,10 +275,16 @@ class Projects(db.Model):
     deleted_by = db.relationship("User", foreign_keys=[deleted_by_id])
     is_deleted = db.Column(db.Boolean, default=False)
     generator_config = db.Column(JSONB, nullable=True)
+    # Bumped by services/result_store.py when the project's demand data or tariff rates change
+    energy_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    tariff_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     energy_data = db.relationship(
         "EnergyData", backref="project", lazy=True, cascade="all, delete-orphan"
     )
+    energy_series = db.relationship(
+        "EnergySeries", backref="project", lazy=True, cascade="all, delete-orphan"
+    )
     quick_design_entry = db.relationship(
         "QuickDesignData",
         backref="project",
@@ -285,17 +295,54 @@ class Projects(db.Model):
     bom_components = db.relationship(
         "BOMComponent", backref="project", lazy=True, cascade="all, delete-orphan"
     )
+    simulation_runs = db.relationship(
+        "SimulationRun", backref="project", lazy=True, cascade="all, delete-orphan"
+    )
     load_profile = db.relationship("LoadProfiles", foreign_keys=[profile_id])
 
 
 class EnergyData(db.Model):
     __tablename__ = "energy_data"
+    __table_args__ = (
+        db.Index('ix_energy_data_project_id_timestamp', 'project_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=True)
     timestamp = db.Column(db.DateTime)
     demand_kw = db.Column(db.Float)
 
 
+class EnergySeries(db.Model):
+    """Packed copy of a project's EnergyData for one calendar year (see services/energy_series.py)."""
+    __tablename__ = "energy_series"
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'year', name='uq_energy_series_project_year'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False, index=True)
+    year = db.Column(db.Integer, nullable=False)
+    start = db.Column(db.DateTime, nullable=False)  # first timestamp in the year
+    step_seconds = db.Column(db.Integer, nullable=True)  # None when the timestamps are irregular
+    count = db.Column(db.Integer, nullable=False)
+    dtype = db.Column(db.String(8), nullable=False, default="<f4")
+    values = db.Column(db.LargeBinary, nullable=False)  # packed demand_kw
+    offsets = db.Column(db.LargeBinary, nullable=True)  # packed int32 seconds from start (irregular only)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(SA_TZ))
+
+
+class SimulationRun(db.Model):
+    """A stored simulation (or proposal) result, keyed by a hash of all of its inputs (see services/result_store.py)."""
+    __tablename__ = "simulation_runs"
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # simulate | proposal
+    input_hash = db.Column(db.String(64), nullable=False, unique=True)
+    inputs_json = db.Column(db.JSON)
+    kpis_json = db.Column(db.JSON)  # every non-array field of the result
+    arrays = db.Column(db.LargeBinary)  # compressed .npz of the per-interval series
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Product(db.Model):
     __tablename__ = "products"
 
@@ -529,7 +576,11 @@ class ComponentRule(db.Model):
 
 
 class OptimizationRun(db.Model):
+    """An optimization or simulation run; also the background job queue (see services/jobs.py)."""
     __tablename__ = "optimization_runs"
+    __table_args__ = (
+        db.Index('ix_optimization_runs_status_created_at', 'status', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False)
     system_type = db.Column(db.String(20))
@@ -537,6 +588,38 @@ class OptimizationRun(db.Model):
     best_json = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    job_type = db.Column(db.String(20), nullable=False, default="optimize", server_default="optimize")  # optimize | simulate
+    status = db.Column(db.String(20), nullable=False, default="succeeded", server_default="succeeded")  # queued | running | succeeded | failed
+    progress = db.Column(db.Float, default=0.0)  # 0..1
+    message = db.Column(db.String(255))
+    result_json = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)  # heartbeat of a running job (services/jobs.py)
+
+    def to_dict(self, include_result=False):
+        data = {
+            "id": self.id,
+            "project_id": self.project_id,
+            "job_type": self.job_type,
+            "system_type": self.system_type,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "queue_seconds": (self.started_at - self.created_at).total_seconds()
+                if self.started_at and self.created_at else None,
+            "run_seconds": (self.finished_at - self.started_at).total_seconds()
+                if self.finished_at and self.started_at else None,
+        }
+        if include_result:
+            data["result"] = self.result_json
+        return data
+
 
 # NEW: A temporary model for testing the import process
 class ProductTest(db.Model):
@@ -573,8 +656,15 @@ class LoadProfiles(db.Model):
         db.Float, nullable=True
     )  # Maximum peak demand in kW before normalization
     profile_data = db.Column(
-        JSONB, nullable=False
-    )  # JSONB to store the load profile data
+        JSONB(none_as_null=True), nullable=True
+    )  # legacy [{"timestamp", "demand_kw"}] rows; None once packed into the data_* columns
+    # Packed demand_kw series (see services/profile_library.py), laid out like EnergySeries
+    data_start = db.Column(db.DateTime, nullable=True)  # first timestamp
+    data_step_seconds = db.Column(db.Integer, nullable=True)  # None when the timestamps are irregular
+    data_count = db.Column(db.Integer, nullable=True)
+    data_dtype = db.Column(db.String(8), nullable=True, default="<f4")
+    data_values = db.Column(db.LargeBinary, nullable=True)  # packed float32 demand_kw
+    data_offsets = db.Column(db.LargeBinary, nullable=True)  # packed int32 seconds from start (irregular only)
 
     def __repr__(self):
         return f"<LoadProfile {self.name}>"
@@ -1,11 +1,18 @@
 # routes/consumption.py
 from flask import Blueprint, jsonify, request
-from models import Projects, EnergyData
+from models import Projects
 
 consumption_bp = Blueprint('consumption', __name__)
 
 @consumption_bp.route('/consumption_data/<int:project_id>', methods=['GET'])
 def get_consumption_data(project_id):
+    """Demand series for charts; JSON rows by default, float32 columns for Arrow/msgpack Accept headers."""
+    import numpy as np
+    import pandas as pd
+    from services.energy_series import load_project_series
+    from services.simulation_engine import isoformat_index
+    from services.columnar import negotiated_response
+
     try:
         project = Projects.query.get(project_id)
         if not project:
@@ -15,13 +22,13 @@ def get_consumption_data(project_id):
         end_date = request.args.get('end_date')
         scale_factor = float(request.args.get('scale_factor', 1.0))
 
-        query = EnergyData.query.filter_by(project_id=project_id)
+        timestamps, demand_kw = load_project_series(project)
+        mask = np.ones(len(timestamps), dtype=bool)
         if start_date:
-            query = query.filter(EnergyData.timestamp >= start_date)
+            mask &= timestamps >= pd.Timestamp(start_date)
         if end_date:
-            query = query.filter(EnergyData.timestamp <= end_date)
-
-        data = query.order_by(EnergyData.timestamp).all()
+            mask &= timestamps <= pd.Timestamp(end_date)
+        timestamps, demand_kw = timestamps[mask], demand_kw[mask]
 
         # Get profile information if it exists
         from models import LoadProfiles
@@ -40,16 +47,20 @@ def get_consumption_data(project_id):
                 }
 
         # Format response with both data and profile info
-        data_points = [
-            {
-                'timestamp': record.timestamp.isoformat(),
-                'demand_kw': record.demand_kw * scale_factor
+        # Series values are stored as float32; round away the widening noise before scaling
+        scaled = np.round(demand_kw, 4) * scale_factor
+
+        def build_json():
+            data_points = [
+                {'timestamp': ts, 'demand_kw': kw}
+                for ts, kw in zip(isoformat_index(timestamps), scaled.tolist())
+            ]
+            return {
+                "data": data_points,
+                "profile_info": profile_info
             }
-            for record in data
-        ]
-        return jsonify({
-            "data": data_points,
-            "profile_info": profile_info
-        })
+
+        return negotiated_response(build_json, {"demand_kw": scaled},
+                                   meta={"profile_info": profile_info}, timestamps=timestamps)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1,34 +1,17 @@
 # routes/energy_data.py
 from flask import Blueprint, request, jsonify, Response
 from models import db, Projects, EnergyData
-import pandas as pd
-import io
 
 from routes.projects import mark_project_activity, optional_user_id
 
 energy_data_bp = Blueprint("energy_data", __name__)
 
-# ---------- helpers -------------------------------------------------------
-def _parse_file(upload):
-    "Return a normalised DataFrame with columns ['timestamp', 'demand_kw']."
-    if upload.filename.endswith((".xlsx", ".xls")):
-        df = pd.read_excel(upload, engine="openpyxl")
-    else:                                          # default to csv
-        df = pd.read_csv(upload)
-
-    if df.shape[1] < 2:
-        raise ValueError("First two columns must be timestamp and demand_kW")
-
-    df = df.iloc[:, :2].dropna()
-    df.columns = ["timestamp", "demand_kw"]
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="raise")
-    df["demand_kw"] = df["demand_kw"].astype(float)
-    return df
-
 # ---------- POST  /projects/<id>/energy-data ------------------------------
 @energy_data_bp.route("/projects/<int:project_id>/energy-data", methods=["POST"])
 def upload_energy_data(project_id):
     """Upload (or replace) the energy‑consumption profile for one project."""
+    import time
+    from services.energy_ingest import replace_energy_data
     if "file" not in request.files:
         return jsonify({"error": "file is required"}), 400
 
@@ -36,41 +19,62 @@ def upload_energy_data(project_id):
     if not project:
         return jsonify({"error": f"Project {project_id} not found"}), 404
 
+    # replace old data in one transaction; uploaded meter data also replaces a linked load profile
+    started = time.perf_counter()
     try:
-        df = _parse_file(request.files["file"])
+        project.profile_id = None
+        rows = replace_energy_data(project_id, request.files["file"])
+        db.session.commit()
     except ValueError as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    seconds = time.perf_counter() - started
+    rows_per_second = rows / seconds if seconds > 0 else float(rows)
 
-    # replace old data
-    EnergyData.query.filter_by(project_id=project_id).delete()
-    db.session.bulk_save_objects([
-        EnergyData(project_id=project_id,
-                   timestamp=row.timestamp,
-                   demand_kw=row.demand_kw)
-        for row in df.itertuples(index=False)
-    ])
-    db.session.commit()
-    return jsonify({"message": f"Uploaded {len(df)} rows"}), 200
+    return jsonify({
+        "message": f"Uploaded {rows} rows in {seconds:.1f} s ({rows_per_second:,.0f} rows/s)",
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows_per_second),
+    }), 200
 
 # ---------- GET  /projects/<id>/energy-data -------------------------------
 @energy_data_bp.route("/projects/<int:project_id>/energy-data", methods=["GET"])
 def list_energy_data(project_id):
-    """Stream the project’s energy data back as CSV (handy for charts/exports)."""
+    """
+    The project’s energy data for charts/exports: JSON rows by default, float32 columns
+    for Arrow/msgpack Accept headers.
+    """
     project = Projects.query.get(project_id)
     if not project:
         return jsonify({"error": f"Project {project_id} not found"}), 404
 
-    q = (EnergyData.query
-                      .filter_by(project_id=project_id)
-                      .order_by(EnergyData.timestamp))
-    rows = [{"timestamp": r.timestamp.isoformat(), "demand_kw": r.demand_kw}
-            for r in q]
-    return jsonify(rows), 200
+    import numpy as np
+    from services.energy_series import load_project_series
+    from services.simulation_engine import isoformat_index
+    from services.columnar import negotiated_response
+
+    timestamps, demand_kw = load_project_series(project)
+    demand_kw = np.round(demand_kw, 4)
+
+    def build_json():
+        return [{"timestamp": ts, "demand_kw": kw}
+                for ts, kw in zip(isoformat_index(timestamps), demand_kw.tolist())]
+
+    return negotiated_response(build_json, {"demand_kw": demand_kw}, timestamps=timestamps), 200
 
 # ---------- DELETE  /projects/<id>/energy-data ----------------------------
 @energy_data_bp.route("/projects/<int:project_id>/energy-data", methods=["DELETE"])
 def delete_energy_data(project_id):
+    from services.energy_series import invalidate_series
+    project = Projects.query.get(project_id)
+    if project:
+        project.profile_id = None  # a profile-derived demand has no rows to delete
     deleted = EnergyData.query.filter_by(project_id=project_id).delete()
+    invalidate_series(project_id)
     mark_project_activity(project_id, optional_user_id())
     db.session.commit()
     return jsonify({"message": f"Deleted {deleted} rows"}), 200
@@ -79,6 +83,7 @@ def delete_energy_data(project_id):
 @energy_data_bp.route("/projects/<int:project_id>/use-profile", methods=["POST"])
 def use_profile_as_energy_data(project_id):
     """Apply a load profile as energy data for a project with optional scaling."""
+    from services.energy_series import invalidate_series
     data = request.get_json() or {}
 
     # validate inputs
@@ -101,45 +106,26 @@ def use_profile_as_energy_data(project_id):
         return jsonify({"error": f"Project {project_id} not found"}), 404
 
     from models import LoadProfiles
+    from services.profile_library import has_data, profile_arrays
     profile = LoadProfiles.query.get(profile_id)
-    if not profile or not profile.profile_data:
+    if not profile or not has_data(profile):
         return jsonify({"error": f"Profile {profile_id} not found or has no data"}), 404
     
-    # Store profile information in the Projects table
+    timestamps, _ = profile_arrays(profile)
+    if not len(timestamps):
+        return jsonify({"error": "No valid points after parsing profile"}), 400
+
+    # The project only references the profile: its demand is derived as profile x scaler
+    # when read (services/energy_series.load_project_series), nothing is copied
     project.profile_id = profile_id
     project.profile_scaler = scaler
 
-    # normalize keys
-    first = profile.profile_data[0]
-    ts_key = "timestamp" if "timestamp" in first else "Timestamp"
-    kw_key = "demand_kw" if "demand_kw" in first else "Demand_kW"
-
-    # clear existing
+    # drop uploaded data (or an older materialized copy), which would take precedence
     EnergyData.query.filter_by(project_id=project_id).delete()
-
-    # build new rows safely
-    import pandas as pd
-    rows = []
-    for r in profile.profile_data:
-        ts = pd.to_datetime(r.get(ts_key), errors="coerce")
-        if pd.isna(ts):
-            continue  # skip bad rows instead of 500
-        try:
-            kw = float(r.get(kw_key)) * scaler
-        except Exception:
-            continue
-        rows.append(EnergyData(project_id=project_id,
-                               timestamp=ts.to_pydatetime(),
-                               demand_kw=kw))
-
-    if not rows:
-        return jsonify({"error": "No valid points after parsing profile"}), 400
+    invalidate_series(project_id)
     mark_project_activity(project_id, optional_user_id())
-
-    db.session.bulk_save_objects(rows)
     db.session.commit()
 
     return jsonify({
-        "message": f"Applied profile '{profile.name}' with scaling factor {scaler}. Generated {len(rows)} data points."
+        "message": f"Applied profile '{profile.name}' with scaling factor {scaler}. Using {len(timestamps)} data points."
     }), 200
-
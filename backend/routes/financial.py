@@ -2,7 +2,6 @@
 from flask import Blueprint, request, jsonify
 from models import db, Projects, EnergyData
 from routes.projects import mark_project_activity, optional_user_id
-from services.financial_calcs import run_quick_financials
 from datetime import datetime
 import logging
 
@@ -10,6 +9,8 @@ financial_bp = Blueprint('financial', __name__)
 
 @financial_bp.route('/financial_model', methods=['POST'])
 def financial_model():
+    from services.financial_calcs import run_quick_financials
+    from services.sensitivity import OPTIONS as SENSITIVITY_OPTIONS, run_sensitivity
     try:
         data = request.get_json()
         logging.debug(f"Financial Model Input: {data}")
@@ -35,6 +36,16 @@ def financial_model():
         if result.get("error"):
             logging.error(f"Financial calculation error: {result['error']}")
             return jsonify(result), 500
+
+        # Optional risk view: {"sensitivity": true} or {"sensitivity": {scenarios, ranges, seed, discount_rate}}
+        sensitivity = data.get("sensitivity")
+        if sensitivity:
+            options = sensitivity if isinstance(sensitivity, dict) else {}
+            risk = run_sensitivity(result, system_cost, escalation_schedule=escalation_schedule,
+                                   **{key: options[key] for key in SENSITIVITY_OPTIONS if key in options})
+            if risk.get("error"):
+                return jsonify(risk), 400
+            result["sensitivity"] = risk
         
         mark_project_activity(project_id, optional_user_id())
         db.session.commit()
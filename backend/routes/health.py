@@ -0,0 +1,19 @@
+# routes/health.py
+from flask import Blueprint, jsonify
+from services.warmup import is_ready, start_warmup, warmup_status
+
+health_bp = Blueprint('health', __name__)
+
+
+# Liveness: the process is up and serving requests
+@health_bp.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok"}), 200
+
+
+# Readiness: 503 until the simulation stack has been imported and warmed
+@health_bp.route('/health/ready', methods=['GET'])
+def ready():
+    start_warmup()
+    status = warmup_status()
+    return jsonify(status), 200 if is_ready() else 503
@@ -0,0 +1,80 @@
+# routes/jobs.py
+from flask import Blueprint, request, jsonify
+from models import db, Projects, OptimizationRun
+from routes.optimize import optimize_options
+from routes.simulation import _system_params
+from services.jobs import JOB_TYPES, submit_job
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+def _job_params(job_type, data):
+    """Validated keyword arguments for the job handler; raises KeyError/ValueError on a bad payload."""
+    from services.generation_profiles import DEFAULT_GENERATION_PROFILE
+    if job_type == "optimize":
+        return {"system_type": data["system_type"], **optimize_options(data)}
+
+    system = _system_params(data["system"])
+    if system["inverter_kva"] is None:
+        raise ValueError("Inverter size (kVA) is required")
+    return {
+        "panel_kw": system["panel_kw"],
+        "battery_kwh": system["battery_kwh"],
+        "system_type": system["system_type"],
+        "inverter_kva": system["inverter_kva"],
+        "allow_export": system["allow_export"],
+        "tilt": system["tilt"],
+        "azimuth": system["azimuth"],
+        "use_pvgis": bool(data.get("use_pvgis", False)),
+        "profile_name": data.get("profile_name", DEFAULT_GENERATION_PROFILE),
+        "battery_soc_limit": system["battery_soc_limit"],
+        "generator_config": system["generator"],
+    }
+
+
+@jobs_bp.route("/jobs", methods=["POST"])
+def create_job():
+    """
+    Queues an optimization or simulation. Body: {"type": "optimize" | "simulate", "project_id", ...}
+    with the rest of the payload as for POST /api/optimize or /api/simulate.
+    Progress is pushed to the "project:<id>" room as job:progress / job:finished.
+    """
+    data = request.get_json() or {}
+    job_type = data.get("type")
+    if job_type not in JOB_TYPES:
+        return jsonify({"error": f"type must be one of: {', '.join(JOB_TYPES)}"}), 400
+
+    project = db.session.get(Projects, data.get("project_id")) if data.get("project_id") else None
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+
+    try:
+        params = _job_params(job_type, data)
+    except KeyError as e:
+        return jsonify({"error": f"Missing field: {e.args[0]}"}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = submit_job(project.id, job_type, params, system_type=params["system_type"])
+    return jsonify(job.to_dict()), 202
+
+
+@jobs_bp.route("/jobs/<int:job_id>", methods=["GET"])
+def get_job(job_id):
+    """
+    Status, progress and timings of a job, with its result once it has finished. A simulate
+    job's row keeps only the KPIs; the traces come from its stored run (services/result_store.py),
+    or are left out if that run has since been invalidated.
+    """
+    from services import result_store
+
+    job = db.session.get(OptimizationRun, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    data = job.to_dict(include_result=True)
+    run_key = (data["result"] or {}).get("simulation_run")
+    if run_key:
+        stored = result_store.load_run(run_key)
+        if stored is not None:
+            data["result"] = {**stored, "simulation_run": run_key}
+    return jsonify(data), 200
@@ -2,7 +2,6 @@
 from flask import Blueprint, request, jsonify
 from models import db, LoadProfiles, User, UserRole
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import pandas as pd
 import io
 
 load_profiles_bp = Blueprint('load_profiles', __name__)
@@ -10,8 +9,9 @@ load_profiles_bp = Blueprint('load_profiles', __name__)
 def process_profile_file(file_stream, interval_hours=0.5):
     """
     Helper function to process an uploaded file stream (CSV or XLSX)
-    and return the calculated annual kWh and the JSON data.
+    and return the calculated annual kWh and the normalized series.
     """
+    import pandas as pd
     try:
         # Determine file type and read into pandas DataFrame
         if file_stream.filename.endswith('.csv'):
@@ -58,29 +58,95 @@ def process_profile_file(file_stream, interval_hours=0.5):
         df[demand_col] = df[demand_col] * normalization_factor
         # --- Normalization complete ---
 
-        # Standardize column names for saving
-        df.rename(columns={timestamp_col: 'timestamp', demand_col: 'demand_kw'}, inplace=True)
-        
-        # Format timestamp for JSON compatibility
-        df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S')
-
         # New annual kwh for the profile is our normalized target value
         normalized_annual_kwh = target_annual_kwh
 
-        # Prepare JSONB data
-        profile_data_json = df[['timestamp', 'demand_kw']].to_dict(orient='records')
-        
+        # Arrays for services.profile_library.set_profile_data (packed float32, not JSON rows)
         return {
             "annual_kwh": normalized_annual_kwh, 
             "monthly_avg_kwh_original": monthly_avg_kwh_original,
             "max_peak_demand_kw": max_peak_demand_kw,
-            "profile_data": profile_data_json, 
+            "timestamps": pd.DatetimeIndex(df[timestamp_col]),
+            "demand_kw": df[demand_col].to_numpy(dtype=float),
             "error": None
         }
 
     except Exception as e:
         return {"error": str(e)}
 
+@load_profiles_bp.route('/load_profiles/summary', methods=['GET'])
+def get_load_profile_summaries():
+    """
+    The profile library for listings and thumbnails: metadata plus a 48-point average day
+    ("day_shape", kW) and "monthly_kwh" per profile, without the raw data. Cached in-process
+    (services/profile_library.py); revalidate with If-None-Match.
+    """
+    from services.profile_library import library_summaries
+    from services.result_store import etag_for, not_modified, with_etag
+
+    try:
+        summaries = library_summaries()
+        profile_type = request.args.get('profile_type') or request.args.get('consumer_type')
+        etag = etag_for(summaries["digest"], profile_type)
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+
+        profiles = summaries["profiles"]
+        if profile_type:
+            profiles = [p for p in profiles if p["profile_type"] == profile_type]
+        return with_etag(jsonify(profiles), etag)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@load_profiles_bp.route('/load_profiles/<int:profile_id>/data', methods=['GET'])
+def get_load_profile_data(profile_id):
+    """
+    One profile's demand series. ?resolution= 30min (default), 1h, 1d, 1w or 1mo (or hourly,
+    daily, weekly, monthly) averages it; ?scaler= multiplies it. JSON by default, float32
+    columns for Arrow/msgpack Accept headers (services/columnar.py); revalidate with If-None-Match.
+    """
+    from services.columnar import JSON_MIMETYPE, columnar_response, negotiated_mimetype
+    from services.profile_library import profile_arrays, profile_digest, profile_entry, resampled
+    from services.result_store import etag_for, not_modified, with_etag
+
+    try:
+        resolution = request.args.get('resolution', '30min')
+        scaler = request.args.get('scaler', 1.0, type=float)
+        mimetype = negotiated_mimetype()
+        variant = (resolution, scaler, mimetype)
+
+        # The digest is cached once the profile has been summarized, so a revalidation needs no query
+        digest = profile_digest(profile_id)
+        if digest and request.if_none_match.contains(etag_for(digest, *variant)):
+            return not_modified(etag_for(digest, *variant))
+
+        profile = LoadProfiles.query.get(profile_id)
+        if not profile:
+            return jsonify({"error": f"Profile {profile_id} not found"}), 404
+        etag = etag_for(profile_entry(profile)["digest"], *variant)
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+
+        timestamps, demand_kw = profile_arrays(profile)
+        if len(timestamps) == 0:
+            return jsonify({"error": f"Profile {profile_id} has no data"}), 404
+        try:
+            values, view = resampled(timestamps, demand_kw * scaler, resolution)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        meta = {"profile_id": profile.id, "name": profile.name, "scaler": scaler, **view}
+        if mimetype == JSON_MIMETYPE:
+            response = jsonify({**meta, "demand_kw": values.tolist()})
+            response.headers["Vary"] = "Accept"
+        else:
+            response = columnar_response({"demand_kw": values}, meta=meta, mimetype=mimetype)
+        return with_etag(response, etag)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @load_profiles_bp.route('/load_profiles', methods=['POST'])
 def create_load_profile():
     """ Creates a new LoadProfile from a file upload. """
@@ -91,6 +157,8 @@ def create_load_profile():
     if file.filename == '':
         return jsonify({"error": "No file selected for uploading"}), 400
 
+    from services.profile_library import set_profile_data
+
     try:
         # Process the file using the helper function
         processed_data = process_profile_file(file)
@@ -105,8 +173,8 @@ def create_load_profile():
             annual_kwh=processed_data["annual_kwh"],
             monthly_avg_kwh_original=processed_data["monthly_avg_kwh_original"],
             max_peak_demand_kw=processed_data["max_peak_demand_kw"],
-            profile_data=processed_data["profile_data"]
         )
+        set_profile_data(new_profile, processed_data["timestamps"], processed_data["demand_kw"])
         db.session.add(new_profile)
         db.session.commit()
         
@@ -0,0 +1,35 @@
+# routes/metrics.py
+import hmac
+
+from flask import Blueprint, Response, current_app, request
+from models import UserRole
+from routes.auth import require_role
+from services.metrics import PROMETHEUS_MIMETYPE, render
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def _has_metrics_token():
+    """True for a request carrying `Authorization: Bearer <METRICS_TOKEN>` (unset token: never)."""
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode())
+
+
+def _render_metrics():
+    return Response(render(), content_type=PROMETHEUS_MIMETYPE)
+
+
+@require_role(UserRole.ADMIN)
+def _render_metrics_for_admin():
+    return _render_metrics()
+
+
+# Stage and request-latency histograms of this worker process, for Prometheus to scrape
+# with the METRICS_TOKEN bearer token, or for an admin signed in with their JWT
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    if _has_metrics_token():
+        return _render_metrics()
+    return _render_metrics_for_admin()
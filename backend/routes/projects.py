@@ -1,4 +1,5 @@
 # routes/projects.py
+from collections import defaultdict
 from datetime import datetime
 
 from flask import Blueprint, request, jsonify
@@ -8,16 +9,20 @@ from models import (
     db,
     Projects,
     LoadProfiles,
+    TariffRates,
     Product,
     ComponentRule,
     User,
     UserRole,
 )
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
-from .tariffs import serialize_tariff
+from sqlalchemy.orm import joinedload, selectinload
+from .tariffs import serialize_tariff, tariff_summary
 
 projects_bp = Blueprint("projects", __name__)
 
+PROJECT_PAGE_MAX = 500  # largest ?limit= page of GET /projects
+
 
 def optional_user_id():
     verify_jwt_in_request(optional=True)
@@ -35,59 +40,128 @@ def mark_project_activity(project_id: int, user_id: int | None):
     db.session.add(proj)
 
 
+def _project_cursor(project):
+    """Opaque keyset cursor for GET /projects: the row's stored updated_at and id."""
+    updated_at = project.updated_at.isoformat() if project.updated_at else ""
+    return f"{updated_at}|{project.id}"
+
+
+def _after_cursor(query, cursor):
+    """Rows that come after `cursor` in (updated_at DESC NULLS LAST, id DESC) order."""
+    updated_at, _, project_id = cursor.rpartition("|")
+    project_id = int(project_id)
+    if not updated_at:
+        return query.filter(Projects.updated_at.is_(None), Projects.id < project_id)
+    updated_at = datetime.fromisoformat(updated_at)
+    return query.filter(
+        (Projects.updated_at < updated_at)
+        | ((Projects.updated_at == updated_at) & (Projects.id < project_id))
+        | Projects.updated_at.is_(None)
+    )
+
+
+def _list_tariff_details(projects, summary):
+    """{tariff_id: serialized tariff} for the listed projects, with all their rates in one query."""
+    tariffs = {p.tariff.id: p.tariff for p in projects if p.tariff}
+    if summary or not tariffs:
+        return {tariff_id: tariff_summary(t) for tariff_id, t in tariffs.items()}
+
+    # Tariffs.rates is a dynamic relationship (a query per access), so load them together
+    rates = defaultdict(list)
+    for rate in TariffRates.query.filter(TariffRates.tariff_id.in_(tariffs)).order_by(TariffRates.id):
+        rates[rate.tariff_id].append(rate)
+    return {tariff_id: serialize_tariff(t, rates[tariff_id]) for tariff_id, t in tariffs.items()}
+
+
+def _project_list_item(p, tariff_details):
+    return {
+        "id": p.id,
+        "name": p.name,
+        "description": p.description,
+        "client_name": p.client.client_name,
+        "client_email": p.client.email,
+        "client_phone": p.client.phone,
+        "location": p.location,
+        "latitude": p.latitude,
+        "longitude": p.longitude,
+        "system_type": p.system_type,
+        "panel_kw": p.panel_kw,
+        "panel_id": p.panel_id,
+        "inverter_kva": p.inverter_kva,
+        "inverter_ids": (
+            p.inverter_ids if p.inverter_ids is not None else []
+        ),
+        "battery_ids": p.battery_ids if p.battery_ids is not None else [],
+        "battery_kwh": p.battery_kwh,
+        "project_value_excl_vat": p.project_value_excl_vat,
+        "site_contact_person": p.site_contact_person,
+        "site_phone": p.site_phone,
+        "design_type": p.design_type,
+        "project_type": p.project_type,
+        "tariff_id": p.tariff_id,
+        "custom_flat_rate": p.custom_flat_rate,
+        "created_at": p.created_at.isoformat() if p.created_at else None,
+        "created_by": p.created_by.full_name if p.created_by else "",
+        "updated_at": p.updated_at.astimezone(SA_TZ).isoformat() if p.updated_at else None,
+        "updated_by": p.updated_by.full_name if p.updated_by else None,
+        "tariff_details": tariff_details.get(p.tariff_id),
+    }
+
+
 @projects_bp.route("/projects", methods=["GET"])
 def get_projects():
+    """
+    Non-deleted projects, most recently updated first, in a constant number of queries.
+
+    ?client_id=   only that client's projects
+    ?view=summary tariff_details without the rate components
+    ?limit=       keyset pagination: returns {"projects": [...], "next_cursor": ...};
+    ?cursor=      pass next_cursor back for the following page (null on the last page)
+
+    Without ?limit the response is the full list, as before.
+    """
     try:
         # Check for client_id filter parameter
         client_id = request.args.get("client_id", type=int)
+        summary = request.args.get("view") == "summary"
+        limit = request.args.get("limit", type=int)
+        cursor = request.args.get("cursor")
+        if limit is not None and not 1 <= limit <= PROJECT_PAGE_MAX:
+            return jsonify({"error": f"limit must be between 1 and {PROJECT_PAGE_MAX}"}), 400
+
+        # 1. Projects with their client and users joined in, tariffs in one more query
+        query = Projects.query.options(
+            joinedload(Projects.client),
+            joinedload(Projects.created_by),
+            joinedload(Projects.updated_by),
+            selectinload(Projects.tariff),
+        ).filter(
+            (Projects.is_deleted.is_(False)) | (Projects.is_deleted.is_(None))
+        )
 
         # Apply filter if client_id is provided
         if client_id:
-            projects = Projects.query.filter_by(client_id=client_id).filter(
-                (Projects.is_deleted.is_(False)) | (Projects.is_deleted.is_(None))
-            )
-        else:
-            projects = Projects.query.filter(
-                (Projects.is_deleted.is_(False)) | (Projects.is_deleted.is_(None))
-            ).all()
-
-        return jsonify(
-            [
-                {
-                    "id": p.id,
-                    "name": p.name,
-                    "description": p.description,
-                    "client_name": p.client.client_name,
-                    "client_email": p.client.email,
-                    "client_phone": p.client.phone,
-                    "location": p.location,
-                    "latitude": p.latitude,
-                    "longitude": p.longitude,
-                    "system_type": p.system_type,
-                    "panel_kw": p.panel_kw,
-                    "panel_id": p.panel_id,
-                    "inverter_kva": p.inverter_kva,
-                    "inverter_ids": (
-                        p.inverter_ids if p.inverter_ids is not None else []
-                    ),
-                    "battery_ids": p.battery_ids if p.battery_ids is not None else [],
-                    "battery_kwh": p.battery_kwh,
-                    "project_value_excl_vat": p.project_value_excl_vat,
-                    "site_contact_person": p.site_contact_person,
-                    "site_phone": p.site_phone,
-                    "design_type": p.design_type,
-                    "project_type": p.project_type,
-                    "tariff_id": p.tariff_id,
-                    "custom_flat_rate": p.custom_flat_rate,
-                    "created_at": p.created_at.isoformat() if p.created_at else None,
-                    "created_by": p.created_by.full_name if p.created_by else "",
-                    "updated_at": p.updated_at.astimezone(SA_TZ).isoformat() if p.updated_at else None,
-                    "updated_by": p.updated_by.full_name if p.updated_by else None,
-                    "tariff_details": serialize_tariff(p.tariff) if p.tariff else None,
-                }
-                for p in projects
-            ]
-        )
+            query = query.filter(Projects.client_id == client_id)
+
+        query = query.order_by(Projects.updated_at.desc().nullslast(), Projects.id.desc())
+        if cursor:
+            try:
+                query = _after_cursor(query, cursor)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
+        if limit is not None:
+            query = query.limit(limit + 1)  # one extra row tells whether there is a next page
+        projects = query.all()
+        page = projects[:limit] if limit is not None else projects
+
+        # 2. Tariff details (rates in a single query unless ?view=summary)
+        tariff_details = _list_tariff_details(page, summary)
+        items = [_project_list_item(p, tariff_details) for p in page]
+
+        if limit is None:
+            return jsonify(items)
+        next_cursor = _project_cursor(page[-1]) if len(projects) > limit else None
+        return jsonify({"projects": items, "next_cursor": next_cursor})
     except Exception as e:
         import traceback
 
@@ -360,6 +434,8 @@ def get_compatible_products():
 
 @projects_bp.route("/load_profiles", methods=["GET"])
 def get_load_profiles():
+    from services.profile_library import profile_rows
+
     try:
         consumer_type_filter = request.args.get("consumer_type")  # Optional filter
 
@@ -380,7 +456,7 @@ def get_load_profiles():
                     "annual_kwh": profile.annual_kwh,
                     "monthly_avg_kwh_original": profile.monthly_avg_kwh_original,
                     "max_peak_demand_kw": profile.max_peak_demand_kw,
-                    "profile_data": profile.profile_data,  # This is the array of data points
+                    "profile_data": profile_rows(profile),  # This is the array of data points
                 }
             )
         return jsonify(profiles_list), 200
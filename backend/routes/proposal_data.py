@@ -1,12 +1,15 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from models import db, Projects, QuickDesignData, LoadProfiles
-from services.simulation_engine import run_quick_simulation
-from services.financial_calcs import run_quick_financials
 
 proposal_data_bp = Blueprint('proposal_data', __name__)
 
 @proposal_data_bp.route('/proposal_data/<int:project_id>', methods=['GET'])
 def get_proposal_data(project_id):
+    from services.simulation_engine import run_quick_simulation, QUICK_DESIGN_PROFILE
+    from services.financial_calcs import run_quick_financials
+    from services import result_store
+    from services.profile_library import profile_arrays
+
     print(f"--- PROPOSAL DATA: Fetching all data for project {project_id} ---")
     try:
         # 1. Fetch the main project and its quick design entry
@@ -15,41 +18,54 @@ def get_proposal_data(project_id):
         if not quick_design:
             return jsonify({"error": "No Quick Design data found for this project."}), 404
 
-        # 2. Get the selected load profile data
-        profile = LoadProfiles.query.get(quick_design.selected_profile_id)
-        if not profile:
-            return jsonify({"error": "Selected load profile not found."}), 404
-        
-        # 3. Get system config and scale the profile data
         system_config = quick_design.selected_system_config_json
-        scaler = quick_design.profile_scaler or 1 # Assume you've saved the scaler
-        
-        scaled_profile_data = [{
-            'timestamp': dp.get('Timestamp') or dp.get('timestamp'),
-            'demand_kw': (dp.get('Demand_kW') or dp.get('demand_kw', 0)) * scaler
-        } for dp in profile.profile_data]
-        
-        # 4. Run the simulation
-        sim_params = {
-            "scaled_load_profile": scaled_profile_data,
-            "panel_kw": system_config.get('panel_kw', 0),
-            "inverter_kva": system_config.get('inverter_kva', 0),
-            "battery_kwh": system_config.get('battery_kwh', 0),
-            "system_type": system_config.get('system_type', 'Hybrid')
-        }
-        sim_response = run_quick_simulation(**sim_params)
-        if 'error' in sim_response: return jsonify(sim_response), 500
 
-        # 5. Run financial calculations
-        financial_params = {
-            "sim_response": sim_response,
-            "system_cost": system_config.get('total_cost', 0),
-            "project": project
-        }
-        financial_results = run_quick_financials(**financial_params)
-        if 'error' in financial_results: return jsonify(financial_results), 500
+        # 2. Reuse the stored simulation + financials when nothing they depend on has changed
+        inputs = result_store.proposal_inputs(project, quick_design, QUICK_DESIGN_PROFILE)
+        run_key = result_store.input_hash("proposal", inputs)
+        stored = result_store.load_run(run_key)
+        if stored is not None:
+            financial_results = stored.pop("financials")
+            sim_response = stored
+        else:
+            # 3. Get the selected load profile data
+            profile = LoadProfiles.query.get(quick_design.selected_profile_id)
+            if not profile:
+                return jsonify({"error": "Selected load profile not found."}), 404
+
+            # 4. Scale the profile data
+            scaler = quick_design.profile_scaler or 1 # Assume you've saved the scaler
+
+            timestamps, demand_kw = profile_arrays(profile)
+            scaled_profile_data = [{
+                'timestamp': ts,
+                'demand_kw': kw * scaler
+            } for ts, kw in zip(timestamps.strftime('%Y-%m-%dT%H:%M:%S'), demand_kw.tolist())]
+
+            # 5. Run the simulation
+            sim_params = {
+                "scaled_load_profile": scaled_profile_data,
+                "panel_kw": system_config.get('panel_kw', 0),
+                "inverter_kva": system_config.get('inverter_kva', 0),
+                "battery_kwh": system_config.get('battery_kwh', 0),
+                "system_type": system_config.get('system_type', 'Hybrid')
+            }
+            sim_response = run_quick_simulation(**sim_params)
+            if 'error' in sim_response: return jsonify(sim_response), 500
+
+            # 6. Run financial calculations
+            financial_params = {
+                "sim_response": sim_response,
+                "system_cost": system_config.get('total_cost', 0),
+                "project": project
+            }
+            financial_results = run_quick_financials(**financial_params)
+            if 'error' in financial_results: return jsonify(financial_results), 500
+
+            result_store.save_run(project_id, "proposal", run_key, inputs,
+                                  {**sim_response, "financials": financial_results})
 
-        # 6. Assemble the final payload
+        # 7. Assemble the final payload
         final_data = {
             "client_name": project.client.client_name,
             "project_name": project.name,
@@ -63,7 +79,11 @@ def get_proposal_data(project_id):
             "financials": financial_results
         }
 
-        return jsonify(final_data), 200
+        # 8. Content ETag, so an unchanged proposal revalidates with a 304
+        response = jsonify(final_data)
+        response.add_etag()
+        response.headers["Cache-Control"] = result_store.CACHE_CONTROL
+        return response.make_conditional(request)
 
     except Exception as e:
         print(f"--- ERROR in get_proposal_data: {e}")
@@ -1,41 +1,83 @@
 # routes/simulation.py
 from flask import Blueprint, current_app, request, jsonify
 from models import db, Projects, EnergyData
-import pandas as pd
-from datetime import datetime
 from routes.projects import mark_project_activity, optional_user_id
-from services.simulation_engine import simulate_system_inner
-from pvlib.location import Location
-from pvlib.pvsystem import PVSystem
-from pvlib.modelchain import ModelChain
-from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
 from services.mailer import send_email
 from markupsafe import escape
 
 simulation_bp = Blueprint('simulation', __name__)
 
+
+def _system_params(system):
+    """Normalizes the 'system' object sent by the design screens (sizes may be {capacity, quantity})."""
+    inverter_kva = system.get("inverter_kva")
+    battery_kwh = system.get("battery_kwh", 0)
+    if isinstance(inverter_kva, dict):
+        inverter_kva = inverter_kva.get('capacity', 0) * inverter_kva.get('quantity', 1)
+    if isinstance(battery_kwh, dict):
+        battery_kwh = battery_kwh.get('capacity', 0) * battery_kwh.get('quantity', 1)
+
+    return {
+        "panel_kw": system["panel_kw"],
+        "tilt": system["tilt"],
+        "azimuth": system["azimuth"],
+        "system_type": system["system_type"],
+        "inverter_kva": inverter_kva,
+        "battery_kwh": battery_kwh,
+        "allow_export": system.get("allow_export", False),
+        "battery_soc_limit": system.get("battery_soc_limit", 20),
+        "generator": system.get("generator", None),
+    }
+
+
+# Optional body keys that switch /simulate to a compact chart view (see services/timeseries.shape_series)
+VIEW_OPTIONS = ("series", "resolution", "window", "max_points")
+
+
+def _simulation_columns(result):
+    """Splits a /simulate result into float32 columns and JSON meta for columnar_response."""
+    from services.timeseries import SIMULATION_SERIES
+    if "series" in result:
+        view = result.pop("series")
+        columns = {key: view.pop(key) for key in list(view) if key in SIMULATION_SERIES}
+        return columns, {**result, "series": view}, None
+    index = result.pop("index")
+    result.pop("timestamps", None)
+    columns = {key: result.pop(key) for key in (*SIMULATION_SERIES, "generator_fuel_l") if key in result}
+    return columns, result, index
+
+
 @simulation_bp.route('/simulate', methods=['POST'])
 def simulate_system():
+    """
+    Full-year simulation of one design. Without view options the response carries every
+    30-minute trace and its timestamps; with any of VIEW_OPTIONS the traces come back as
+    "series" (start + step instead of timestamps), with the same KPIs. An Arrow or msgpack
+    Accept header returns the traces as float32 columns (services/columnar.py).
+    """
+    from services.simulation_engine import simulate_system_inner
+    from services.generation_profiles import DEFAULT_GENERATION_PROFILE
+    from services.timeseries import compact_simulation
+    from services.columnar import columnar_response, negotiated_mimetype, JSON_MIMETYPE
+    from services import result_store
+    from services.executor import call_with_app
+    from services.metrics import stage
+
     try:
         data = request.get_json()
         project_id = data.get("project_id")
         use_pvgis = data.get("use_pvgis", False)
-        panel_kw = data["system"]["panel_kw"]
-        tilt = data["system"]["tilt"]
-        azimuth = data["system"]["azimuth"]
-        system_type = data["system"]["system_type"]
-        inverter_kva = data["system"].get("inverter_kva")
-        battery_kwh = data["system"].get("battery_kwh", 0)
-        allow_export = data["system"].get("allow_export", False)
-        profile_name = data.get('profile_name', 'Midrand Azth:east-west Tilt:5')
-        battery_soc_limit = data["system"].get("battery_soc_limit", 20)  # Default to 20% if not provided
-        generator_cfg = data["system"].get("generator", None)
-
-        # If we get an object instead of number
-        if isinstance(inverter_kva, dict):
-            inverter_kva = inverter_kva.get('capacity', 0) * inverter_kva.get('quantity', 1)
-        if isinstance(battery_kwh, dict):
-            battery_kwh = battery_kwh.get('capacity', 0) * battery_kwh.get('quantity', 1)
+        profile_name = data.get('profile_name', DEFAULT_GENERATION_PROFILE)
+
+        system = _system_params(data["system"])
+        panel_kw, tilt, azimuth = system["panel_kw"], system["tilt"], system["azimuth"]
+        system_type, inverter_kva, battery_kwh = system["system_type"], system["inverter_kva"], system["battery_kwh"]
+        allow_export = system["allow_export"]
+        battery_soc_limit = system["battery_soc_limit"]  # Default to 20% if not provided
+        generator_cfg = system["generator"]
+        view_options = {key: data[key] for key in VIEW_OPTIONS if data.get(key) is not None}
+        mimetype = negotiated_mimetype()
+        binary = mimetype != JSON_MIMETYPE
 
         project = Projects.query.get(project_id)
         if not project:
@@ -43,15 +85,40 @@ def simulate_system():
 
         if inverter_kva is None:
             return jsonify({"error": "Inverter size (kVA) is required"}), 400
-        
-        mark_project_activity(project_id, optional_user_id())
-        db.session.commit()
 
-        # Pass the battery_soc_limit to the simulation function
-        result = simulate_system_inner(project_id, panel_kw, battery_kwh, system_type, inverter_kva, 
-                                      allow_export, tilt, azimuth, use_pvgis, profile_name=profile_name,
-                                      battery_soc_limit=battery_soc_limit,
-                                      generator_config=generator_cfg)
+        # Identical inputs give an identical result: revalidate by ETag, else reuse the stored run
+        inputs = result_store.simulation_inputs(project, system, use_pvgis, profile_name)
+        run_key = result_store.input_hash("simulate", inputs)
+        etag = result_store.etag_for(run_key, view_options, mimetype)
+        if request.if_none_match.contains(etag):
+            return result_store.not_modified(etag)  # no result lookup, no write
+
+        with stage("simulate.store"):
+            result = result_store.load_run(run_key, include_index=True)
+        if result is None:
+            # Runs in the simulation process pool so the other requests on this worker keep flowing
+            result = call_with_app(simulate_system_inner, project_id, panel_kw, battery_kwh, system_type, inverter_kva, 
+                                          allow_export, tilt, azimuth, use_pvgis, profile_name=profile_name,
+                                          battery_soc_limit=battery_soc_limit,
+                                          generator_config=generator_cfg,
+                                          include_index=True)
+            if "error" not in result:
+                result_store.save_run(project_id, "simulate", run_key, inputs, result)
+        if "error" not in result:
+            # Activity is recorded only when a result is served, not on a 304 revalidation
+            mark_project_activity(project_id, optional_user_id())
+            db.session.commit()
+        if not (view_options or binary):
+            result.pop("index", None)
+        if view_options and "error" not in result:
+            try:
+                result = compact_simulation(result, **view_options)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        if binary and "error" not in result:
+            with stage("simulate.encode"):
+                columns, meta, index = _simulation_columns(result)
+                return result_store.with_etag(columnar_response(columns, meta=meta, timestamps=index), etag)
         
         # try:
         #     subj = f"Simulation complete - Project #{project_id}"
@@ -71,8 +138,115 @@ def simulate_system():
         # except Exception as e:
         #     current_app.logger.exception(f"Failed to send simulation email: {e}")
 
-        return jsonify(result)
+        if "error" in result:
+            return jsonify(result)
+        with stage("simulate.encode"):
+            return result_store.with_etag(jsonify(result), etag)
     
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@simulation_bp.route('/generation-profiles', methods=['GET'])
+def list_generation_profiles():
+    """Named generation profiles with their location, orientation and specific yield."""
+    from services import generation_profiles
+    try:
+        return jsonify(generation_profiles.list_profiles())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@simulation_bp.route('/simulate/batch', methods=['POST'])
+def simulate_system_batch():
+    """Evaluates many system sizes for one project in a single pass (traces for up to MAX_TRACE_DESIGNS designs)."""
+    from services.batch_simulation import simulate_batch
+    from services.generation_profiles import DEFAULT_GENERATION_PROFILE
+    try:
+        data = request.get_json() or {}
+        project_id = data.get("project_id")
+        designs = data.get("designs")
+
+        if not isinstance(designs, list) or not designs:
+            return jsonify({"error": "designs must be a non-empty list"}), 400
+
+        project = Projects.query.get(project_id)
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        # Shared settings; any design may override them
+        defaults = {
+            key: data["system"][key]
+            for key in ("system_type", "allow_export", "battery_soc_limit", "battery_kwh", "generator")
+            if key in (data.get("system") or {})
+        }
+
+        result = simulate_batch(
+            project_id,
+            designs,
+            defaults=defaults,
+            profile_name=data.get('profile_name', DEFAULT_GENERATION_PROFILE),
+            include_traces=bool(data.get("include_traces", False)),
+        )
+        if "error" in result:
+            return jsonify(result), 400
+
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@simulation_bp.route('/projects/<int:project_id>/evaluate', methods=['POST'])
+def evaluate_project_design(project_id):
+    """
+    Runs the simulation and the financial model in one request and returns the KPIs
+    with a chart view of the traces, as /simulate shapes them (?resolution= or body
+    'resolution', plus optional 'series', 'window' and 'max_points'; default daily means).
+    Body 'sensitivity' (true or {scenarios, ranges, seed, discount_rate}) adds P10/P50/P90
+    payback, ROI and NPV and a tornado breakdown.
+    """
+    from services.evaluation import evaluate_design
+    from services.generation_profiles import DEFAULT_GENERATION_PROFILE
+    from services.executor import call_with_app
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data.get("system"), dict):
+            return jsonify({"error": "system is required"}), 400
+
+        try:
+            system = _system_params(data["system"])
+        except KeyError as e:
+            return jsonify({"error": f"system.{e.args[0]} is required"}), 400
+        if system["inverter_kva"] is None:
+            return jsonify({"error": "Inverter size (kVA) is required"}), 400
+
+        project = Projects.query.get(project_id)
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        mark_project_activity(project_id, optional_user_id())
+        db.session.commit()
+
+        result = call_with_app(
+            evaluate_design,
+            project_id,
+            system,
+            use_pvgis=data.get("use_pvgis", False),
+            profile_name=data.get('profile_name', DEFAULT_GENERATION_PROFILE),
+            escalation_schedule=data.get("escalation_schedule"),
+            system_cost=data.get("system_cost"),
+            resolution=request.args.get("resolution") or data.get("resolution", "1d"),
+            sensitivity=data.get("sensitivity"),
+            series=data.get("series"),
+            window=data.get("window"),
+            max_points=data.get("max_points"),
+        )
+        if "error" in result:
+            return jsonify(result), 400
+
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -5,18 +5,10 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 tariffs_bp = Blueprint('tariffs', __name__)
 
 # --- Helper function to format tariff data ---
-def serialize_tariff(tariff):
-    """Converts a Tariff object into a JSON-friendly dictionary."""
+def serialize_tariff(tariff, rates=None):
+    """Converts a Tariff object into a JSON-friendly dictionary (`rates` if already loaded, else tariff.rates)."""
     return {
-        'id': tariff.id,
-        'name': tariff.name,
-        'power_user_type': tariff.power_user_type,
-        'tariff_category': tariff.tariff_category,
-        'transmission_zone': tariff.transmission_zone,
-        'supply_voltage': tariff.supply_voltage,
-        'code': tariff.code,
-        'matrix_code': tariff.matrix_code,
-        'structure': tariff.structure,
+        **tariff_summary(tariff),
         'rates': [
             {
                 'id': rate.id,
@@ -27,10 +19,25 @@ def serialize_tariff(tariff):
                 'rate_unit': rate.rate_unit,
                 'rate_value': str(rate.rate_value), # Convert Decimal to string
                 'block_threshold_kwh': str(rate.block_threshold_kwh) if rate.block_threshold_kwh is not None else None
-            } for rate in tariff.rates
+            } for rate in (tariff.rates if rates is None else rates)
         ]
     }
 
+
+def tariff_summary(tariff):
+    """The tariff's descriptive fields, without its rate components."""
+    return {
+        'id': tariff.id,
+        'name': tariff.name,
+        'power_user_type': tariff.power_user_type,
+        'tariff_category': tariff.tariff_category,
+        'transmission_zone': tariff.transmission_zone,
+        'supply_voltage': tariff.supply_voltage,
+        'code': tariff.code,
+        'matrix_code': tariff.matrix_code,
+        'structure': tariff.structure,
+    }
+
 # --- GET /api/tariffs (List all tariffs with filtering) ---
 @tariffs_bp.route('/tariffs', methods=['GET'])
 def get_tariffs():
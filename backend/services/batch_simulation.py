@@ -0,0 +1,268 @@
+# services/batch_simulation.py
+"""
+Batch simulation: evaluates many (panel_kw, inverter_kva, battery_kwh) designs
+for one project in a single pass. The demand and generation series are loaded
+once and the designs are dispatched as (designs x intervals) arrays, in chunks
+spread over the simulation process pool (services/executor.py).
+"""
+import numpy as np
+
+from models import Projects
+from .dispatch import BATTERY_SYSTEM_TYPES, dispatch_batch, run_dispatch
+from .executor import SharedArrays, map_shared
+from .generation_profiles import DEFAULT_GENERATION_PROFILE
+from .simulation_engine import (
+    GeneratorController,
+    get_profile_percentages,
+    isoformat_index,
+    load_project_demand,
+)
+
+# Designs are dispatched in chunks to bound memory (each 2-D array is chunk x 17,520 floats)
+BATCH_CHUNK_SIZE = 64
+MAX_BATCH_DESIGNS = 2000
+MAX_TRACE_DESIGNS = 20  # traces are 7 x 17,520 values per design, so traced batches stay small
+TIME_INTERVAL_HOURS = 0.5
+
+TRACE_KEYS = ("import_from_grid", "export_to_grid", "generation", "battery_soc",
+              "potential_generation", "shortfall_kw", "generator_kw")
+
+
+def _size_value(value):
+    """Accepts a plain number or the {'capacity', 'quantity'} shape used by projects."""
+    if isinstance(value, dict):
+        return float(value.get('capacity', 0) or 0) * float(value.get('quantity', 1) or 1)
+    return float(value or 0)
+
+
+def _normalize_design(design, defaults):
+    if 'panel_kw' not in design:
+        raise ValueError("Each design needs 'panel_kw'")
+    if design.get('inverter_kva') is None:
+        raise ValueError("Each design needs 'inverter_kva'")
+
+    merged = {**defaults, **design}
+    battery_kwh = _size_value(merged.get('battery_kwh', 0))
+    return {
+        "panel_kw": float(merged['panel_kw']),
+        "inverter_kva": _size_value(merged['inverter_kva']),
+        "battery_kwh": battery_kwh,
+        "system_type": merged.get('system_type', 'grid'),
+        "allow_export": bool(merged.get('allow_export', False)),
+        "battery_soc_limit": float(merged.get('battery_soc_limit', 20)),
+        "generator": merged.get('generator'),
+    }
+
+
+def _has_generator(design):
+    gen = design["generator"] or {}
+    return (design["system_type"] == 'off-grid'
+            and bool(gen.get('enabled', False))
+            and float(gen.get('kva', 0) or 0) > 0)
+
+
+def _make_generator(config):
+    # Same defaults as simulate_system_inner
+    return GeneratorController(
+        size_kw=float(config.get('kva', 0) or 0),
+        min_loading_pct=max(25.0, min(100.0, float(config.get('min_loading_pct', 30)))),
+        min_run_time_hours=float(config.get('min_run_time_hours', 1.0)),
+        battery_start_soc=float(config.get('battery_start_soc', 20)),
+        battery_stop_soc=float(config.get('battery_stop_soc', 80)),
+        can_charge_battery=bool(config.get('can_charge_battery', True)),
+    )
+
+
+def _annual_metrics(demand_kw, daytime_mask, potential, usable, export, soc_pct, panel_kw, battery_kwh):
+    """KPIs for a chunk of designs; same definitions as simulate_system_inner's annual_metrics."""
+    dt = TIME_INTERVAL_HOURS
+    n = demand_kw.shape[0]
+    days_in_sim = n / 48
+
+    total_demand_kwh = float(demand_kw.sum()) * dt
+    daytime_demand_kwh = float(demand_kw[daytime_mask].sum()) * dt
+    total_potential_gen_kwh = potential.sum(axis=1) * dt
+    total_utilized_gen_kwh = usable.sum(axis=1) * dt
+    total_export_kwh = export.sum(axis=1) * dt
+    pv_used_onsite_kwh = total_utilized_gen_kwh - total_export_kwh
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        consumption_from_pv = pv_used_onsite_kwh / total_demand_kwh * 100 if total_demand_kwh > 0 else np.zeros(len(panel_kw))
+        pv_utilization = np.where(total_potential_gen_kwh > 0, total_utilized_gen_kwh / total_potential_gen_kwh * 100, 0.0)
+        potential_daily = total_potential_gen_kwh / days_in_sim
+        utilized_daily = total_utilized_gen_kwh / days_in_sim
+        yield_incl = np.where(panel_kw > 0, utilized_daily / panel_kw, 0.0)
+        yield_excl = np.where(panel_kw > 0, potential_daily / panel_kw, 0.0)
+
+    # Charging energy as a fraction of capacity = sum of SOC increases / 100
+    soc_rise = np.clip(np.diff(soc_pct, axis=1), 0, None).sum(axis=1) / 100
+    cycles = soc_rise / days_in_sim * 365
+
+    daytime_pct = (daytime_demand_kwh / total_demand_kwh * 100) if total_demand_kwh > 0 else 0
+    metrics = []
+    for d in range(len(panel_kw)):
+        metrics.append({
+            "daytime_consumption_pct": round(daytime_pct, 2),
+            "consumption_from_pv_pct": round(float(consumption_from_pv[d]), 2),
+            "pv_utilization_pct": round(float(pv_utilization[d]), 2),
+            "potential_gen_daily_kwh": round(float(potential_daily[d]), 2),
+            "utilized_gen_daily_kwh": round(float(utilized_daily[d]), 2),
+            "throttling_losses_daily_kwh": round(float(potential_daily[d] - utilized_daily[d]), 2),
+            "specific_yield_incl_losses": round(float(yield_incl[d]), 2),
+            "specific_yield_excl_losses": round(float(yield_excl[d]), 2),
+            "potential_gen_annual_kwh": round(float(potential_daily[d]) * 365, 0),
+            "utilized_gen_annual_kwh": round(float(utilized_daily[d]) * 365, 0),
+            "throttling_losses_annual_kwh": round(float(potential_daily[d] - utilized_daily[d]) * 365, 0),
+            "battery_cycles_annual": round(float(cycles[d]), 1) if battery_kwh[d] > 0 else '-',
+            "totalConsumptionAnnual": round(total_demand_kwh, 0),
+        })
+    return metrics
+
+
+def _design_result(design, metrics, flows, row, generator=None):
+    dt = TIME_INTERVAL_HOURS
+    result = {
+        "panel_kw": design["panel_kw"],
+        "inverter_kva": design["inverter_kva"],
+        "battery_kwh": design["battery_kwh"],
+        "system_type": design["system_type"],
+        "allow_export": design["allow_export"],
+        "annual_metrics": metrics,
+        "total_import_kwh": round(float(np.sum(flows["import_from_grid"][row])) * dt, 2),
+        "total_export_kwh": round(float(np.sum(flows["export_to_grid"][row])) * dt, 2),
+        "energy_shortfall_total_kwh": round(float(np.sum(flows["shortfall_kw"][row])) * dt, 2),
+    }
+    if generator is not None:
+        result.update({
+            "diesel_liters_total": round(generator.total_fuel_liters, 2),
+            "generator_energy_total_kwh": round(generator.total_energy_kwh, 2),
+            "generator_runtime_hours": round(generator.total_runtime_hours, 2),
+        })
+    return result
+
+
+def _traces(flows, row, potential_row):
+    return {
+        "import_from_grid": np.asarray(flows["import_from_grid"][row]).tolist(),
+        "export_to_grid": np.asarray(flows["export_to_grid"][row]).tolist(),
+        "generation": np.round(np.asarray(flows["usable_generation_kw"][row], dtype=float), 2).tolist(),
+        "battery_soc": np.round(np.asarray(flows["battery_soc"][row], dtype=float), 2).tolist(),
+        "potential_generation": np.round(potential_row, 2).tolist(),
+        "shortfall_kw": np.round(np.asarray(flows["shortfall_kw"][row], dtype=float), 3).tolist(),
+        "generator_kw": np.round(np.asarray(flows["generator_kw"][row], dtype=float), 3).tolist(),
+    }
+
+
+def _simulate_task(arrays, designs, include_traces):
+    """Results for one generator design, or one chunk of array-dispatched designs (runs in a pool process)."""
+    demand_kw, percentages, daytime_mask = arrays["demand_kw"], arrays["percentages"], arrays["daytime_mask"]
+
+    if len(designs) == 1 and _has_generator(designs[0]):
+        design = designs[0]
+        potential = np.minimum((percentages / 100) * design["panel_kw"], design["inverter_kva"])
+        generator = _make_generator(design["generator"])
+        battery_kwh = design["battery_kwh"]
+        flows = run_dispatch(
+            demand_kw.tolist(), potential.tolist(), design["system_type"], battery_kwh,
+            battery_kwh * design["battery_soc_limit"] / 100, design["allow_export"],
+            inverter_kva=design["inverter_kva"], generator=generator,
+            time_interval_hours=TIME_INTERVAL_HOURS
+        )
+        metrics = _annual_metrics(
+            demand_kw, daytime_mask, potential[np.newaxis, :],
+            np.asarray(flows["usable_generation_kw"])[np.newaxis, :],
+            np.asarray(flows["export_to_grid"])[np.newaxis, :],
+            np.asarray(flows["battery_soc"], dtype=float)[np.newaxis, :],
+            np.array([design["panel_kw"]]), np.array([battery_kwh]),
+        )[0]
+        result = _design_result(design, metrics, flows, slice(None), generator)
+        if include_traces:
+            result["traces"] = _traces(flows, slice(None), potential)
+        return [result]
+
+    panel_kw = np.array([d["panel_kw"] for d in designs])
+    inverter_kva = np.array([d["inverter_kva"] for d in designs])
+    battery_kwh = np.array([d["battery_kwh"] for d in designs])
+    soc_limit = np.array([d["battery_soc_limit"] for d in designs])
+    system_types = [d["system_type"] for d in designs]
+
+    potential = np.minimum((percentages / 100)[np.newaxis, :] * panel_kw[:, np.newaxis],
+                           inverter_kva[:, np.newaxis])
+    flows = dispatch_batch(
+        demand_kw,
+        potential,
+        battery_kwh,
+        battery_kwh * (soc_limit / 100),
+        [st in BATTERY_SYSTEM_TYPES and b > 0 for st, b in zip(system_types, battery_kwh)],
+        [d["allow_export"] for d in designs],
+        [st == 'off-grid' for st in system_types],
+        time_interval_hours=TIME_INTERVAL_HOURS,
+    )
+    metrics = _annual_metrics(
+        demand_kw, daytime_mask, potential, flows["usable_generation_kw"],
+        flows["export_to_grid"], flows["battery_soc"], panel_kw, battery_kwh,
+    )
+    results = []
+    for j, design in enumerate(designs):
+        result = _design_result(design, metrics[j], flows, j)
+        if include_traces:
+            result["traces"] = _traces(flows, j, potential[j])
+        results.append(result)
+    return results
+
+
+def simulate_batch(project_id, designs: list, defaults=None, profile_name=DEFAULT_GENERATION_PROFILE, include_traces=False):
+    """
+    Simulates every design in `designs` against the project's demand.
+    Each design needs panel_kw and inverter_kva; battery_kwh, system_type, allow_export,
+    battery_soc_limit and generator fall back to `defaults`. Per-design traces
+    (`include_traces`) are only returned for batches of up to MAX_TRACE_DESIGNS.
+    Returns {"results": [...]} in input order, or {"error": ...}.
+    """
+    try:
+        project = Projects.query.get(project_id)
+        if not project:
+            return {"error": "Project not found"}
+        if not designs:
+            return {"error": "At least one design is required"}
+        if len(designs) > MAX_BATCH_DESIGNS:
+            return {"error": f"A batch is limited to {MAX_BATCH_DESIGNS} designs"}
+        if include_traces and len(designs) > MAX_TRACE_DESIGNS:
+            return {"error": f"include_traces is limited to batches of {MAX_TRACE_DESIGNS} designs"}
+
+        defaults = defaults or {}
+        try:
+            normalized = [_normalize_design(d, defaults) for d in designs]
+            full_30min_index, demand_kw = load_project_demand(project)
+            percentages = get_profile_percentages(profile_name, len(full_30min_index))
+        except (ValueError, TypeError) as e:
+            return {"error": str(e)}
+
+        hours = full_30min_index.hour
+        daytime_mask = (hours >= 6) & (hours < 18)
+
+        # Off-grid designs with a generator still need the stepped controller (one task each);
+        # the rest are dispatched as arrays, BATCH_CHUNK_SIZE designs per task
+        generator_rows = [i for i, d in enumerate(normalized) if _has_generator(d)]
+        array_rows = [i for i, d in enumerate(normalized) if not _has_generator(d)]
+        tasks = [[i] for i in generator_rows] + [array_rows[start:start + BATCH_CHUNK_SIZE]
+                                                 for start in range(0, len(array_rows), BATCH_CHUNK_SIZE)]
+
+        results = [None] * len(normalized)
+        with SharedArrays(demand_kw=demand_kw, percentages=percentages, daytime_mask=daytime_mask) as shared:
+            outputs = map_shared(_simulate_task, shared, [[normalized[i] for i in rows] for rows in tasks],
+                                 include_traces)
+        for rows, output in zip(tasks, outputs):
+            for i, result in zip(rows, output):
+                results[i] = result
+
+        response = {"count": len(results), "results": results}
+        if include_traces:
+            response["timestamps"] = isoformat_index(full_30min_index)
+            response["demand"] = demand_kw.tolist()
+        return response
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
@@ -0,0 +1,291 @@
+# services/billing.py
+"""
+Monthly electricity bills for run_quick_financials.
+
+compute_monthly_bills() is the fast path: per-interval rates come from
+TariffEngine.rate_vector, energy costs and demand maxima are reduced per month
+with NumPy over float64 arrays, and only the monthly totals are turned into
+Decimal. compute_monthly_bills_reference() is the original per-interval Decimal
+loop, kept so the two can be checked against each other (run this module).
+
+Both return (monthly_costs, tariff_sample) where monthly_costs maps 'YYYY-MM' to
+the old/new energy, demand and fixed costs and total bills as Decimal.
+
+Billing modes:
+  'grid'                grid-tied: old bill on demand, new bill on imports
+  'offgrid_generator'   old grid bill vs diesel running cost
+  'offgrid'             old grid bill vs nothing
+"""
+from calendar import monthrange
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+TIME_INTERVAL_HOURS = 0.5
+TARIFF_SAMPLE_LENGTH = 366  # first week of half-hours
+COST_KEYS = ('old_energy_cost', 'new_energy_cost', 'old_demand_cost', 'new_demand_cost',
+             'old_fixed_cost', 'new_fixed_cost', 'total_old_bill', 'total_new_bill')
+
+
+def local_index(timestamps):
+    """
+    DatetimeIndex of the wall-clock times in ISO strings (the UTC offset is dropped),
+    i.e. what datetime.fromisoformat(ts).month/.hour see, without parsing each string.
+    """
+    return pd.DatetimeIndex(np.array(timestamps, dtype='U19').astype('datetime64[s]'))
+
+
+def sim_index(sim_response):
+    """The simulation's DatetimeIndex when passed in-process, else parsed from its ISO timestamps."""
+    index = sim_response.get("index")
+    return index if index is not None else local_index(sim_response["timestamps"])
+
+
+def _to_decimal(value):
+    return Decimal(str(float(value)))
+
+
+def _tariff_sample(engine, timestamps):
+    sample = []
+    for ts_str in timestamps[:TARIFF_SAMPLE_LENGTH]:
+        ts = datetime.fromisoformat(ts_str)
+        sample.append({'timestamp': ts.isoformat(), 'rate': float(round(engine.get_energy_rate_r_per_kwh(ts), 4))})
+    return sample
+
+
+def _generator_interval_costs(sim_response, n):
+    """
+    Diesel + service cost (R) per interval; zero where the generator is off. Uses the
+    simulation's per-interval fuel when it is there, else the fuel curve on generator_kw.
+    """
+    from .simulation_engine import fuel_rate_lph
+
+    generator_config = sim_response.get("generator_config", {})
+    gen_size_kw = float(generator_config.get('kva', 0) or 0)
+    diesel_price = float(generator_config.get('diesel_price_r_per_liter', 23.50))
+    service_cost = float(generator_config.get('service_cost', 1000))
+    service_interval = float(generator_config.get('service_interval_hours', 1000))
+
+    gen = np.zeros(n)
+    values = np.asarray(sim_response.get("generator_kw", [])[:n], dtype=float)
+    gen[:len(values)] = values
+
+    costs = np.zeros(n)
+    if gen_size_kw <= 0:
+        return costs
+    running = gen > 0
+    fuel_l = sim_response.get("generator_fuel_l")
+    if fuel_l is not None and len(fuel_l) >= n:
+        liters = np.asarray(fuel_l[:n], dtype=float)[running]
+    else:
+        liters = fuel_rate_lph(gen_size_kw, gen[running] / gen_size_kw) * TIME_INTERVAL_HOURS
+    costs[running] = liters * diesel_price + (TIME_INTERVAL_HOURS / service_interval) * service_cost
+    return costs
+
+
+def compute_monthly_bills(mode, engine, sim_response):
+    """Vectorized monthly bills (see module docstring)."""
+    timestamps = sim_response["timestamps"]
+    index = sim_index(sim_response)
+    n = len(index)
+    demand = np.asarray(sim_response["demand"], dtype=float)
+
+    # 1. Group intervals by month
+    keys = index.year.to_numpy() * 100 + index.month.to_numpy()
+    month_keys, codes = np.unique(keys, return_inverse=True)
+    n_months = len(month_keys)
+
+    def month_sum(values, mask=None):
+        if mask is not None:
+            return np.bincount(codes[mask], weights=values[mask], minlength=n_months)
+        return np.bincount(codes, weights=values, minlength=n_months)
+
+    def month_max(values, mask):
+        result = np.zeros(n_months)
+        np.maximum.at(result, codes[mask], values[mask])
+        return result
+
+    # 2. Per-interval rates and energy costs
+    energy_rates, demand_rates = engine.rate_vector(index)
+    demand_applies = demand_rates > 0
+
+    old_energy = month_sum(demand * TIME_INTERVAL_HOURS * energy_rates)
+    new_energy = np.zeros(n_months)
+    old_max = np.zeros(n_months)
+    new_max = np.zeros(n_months)
+    tariff_sample = []
+
+    if mode == 'grid':
+        imports = np.asarray(sim_response["import_from_grid"], dtype=float)
+        new_energy = month_sum(imports * TIME_INTERVAL_HOURS * energy_rates)
+        old_max = month_max(demand, demand_applies)
+        new_max = month_max(imports, demand_applies)
+        tariff_sample = _tariff_sample(engine, timestamps)
+    elif mode == 'offgrid_generator':
+        gen_costs = _generator_interval_costs(sim_response, n)
+        new_energy = month_sum(gen_costs)
+        old_max = month_max(demand, demand_applies)
+    else:
+        old_max = month_max(demand, np.ones(n, dtype=bool))
+        tariff_sample = _tariff_sample(engine, timestamps)
+
+    # 3. Month-end fixed and demand charges, in Decimal
+    daily_fixed_rate = engine.get_fixed_rate_r_per_day()
+    monthly_costs = {}
+    for m, key in enumerate(month_keys):
+        year, month = int(key) // 100, int(key) % 100
+        days_in_month = monthrange(year, month)[1]
+        values = {k: Decimal(0) for k in COST_KEYS}
+
+        values['old_energy_cost'] = _to_decimal(old_energy[m])
+        values['new_energy_cost'] = _to_decimal(new_energy[m])
+        values['old_fixed_cost'] = Decimal(days_in_month) * daily_fixed_rate
+
+        if mode == 'grid':
+            values['new_fixed_cost'] = values['old_fixed_cost']
+            demand_rate = engine.get_demand_rate_r_per_kva_per_month(datetime(year, month, 15, 18, 30))
+            values['old_demand_cost'] = _to_decimal(old_max[m]) * demand_rate
+            values['new_demand_cost'] = _to_decimal(new_max[m]) * demand_rate
+            values['total_new_bill'] = values['new_energy_cost'] + values['new_demand_cost'] + values['new_fixed_cost']
+        else:
+            demand_rate = engine.get_demand_rate_r_per_kva_per_month(datetime(year, month, 1))
+            values['old_demand_cost'] = demand_rate * _to_decimal(old_max[m])
+            values['total_new_bill'] = values['new_energy_cost']
+
+        values['total_old_bill'] = values['old_energy_cost'] + values['old_demand_cost'] + values['old_fixed_cost']
+        monthly_costs[f"{year:04d}-{month:02d}"] = values
+
+    return monthly_costs, tariff_sample
+
+
+def compute_monthly_bills_reference(mode, engine, sim_response):
+    """The original per-interval Decimal loop, kept as the parity reference for compute_monthly_bills."""
+    from .simulation_engine import get_fuel_consumption
+
+    demand = sim_response["demand"]
+    imports = sim_response.get("import_from_grid", [])
+    generator_kw = sim_response.get("generator_kw", [])
+    generator_config = sim_response.get("generator_config", {})
+    timestamps = [datetime.fromisoformat(ts) for ts in sim_response["timestamps"]]
+    time_interval_hours = Decimal('0.5')
+
+    monthly_costs = {}
+    monthly_max_demand = {}
+    tariff_sample = []
+
+    gen_size_kw = generator_config.get('kva', 0)
+    diesel_price_r_per_liter = generator_config.get('diesel_price_r_per_liter', 23.50)
+    service_cost = Decimal(str(generator_config.get('service_cost', 1000)))
+    service_interval = Decimal(str(generator_config.get('service_interval_hours', 1000)))
+
+    for i, ts in enumerate(timestamps):
+        month_key = ts.strftime('%Y-%m')
+        if month_key not in monthly_costs:
+            monthly_costs[month_key] = {k: Decimal(0) for k in COST_KEYS}
+        if month_key not in monthly_max_demand:
+            monthly_max_demand[month_key] = {'old': Decimal(0), 'new': Decimal(0)}
+
+        energy_rate_r_kwh = engine.get_energy_rate_r_per_kwh(ts)
+        if mode != 'offgrid_generator' and i < TARIFF_SAMPLE_LENGTH:
+            tariff_sample.append({'timestamp': ts.isoformat(), 'rate': float(round(energy_rate_r_kwh, 4))})
+
+        if mode == 'grid':
+            monthly_costs[month_key]['old_energy_cost'] += Decimal(demand[i]) * time_interval_hours * energy_rate_r_kwh
+            monthly_costs[month_key]['new_energy_cost'] += Decimal(imports[i]) * time_interval_hours * energy_rate_r_kwh
+            if engine.get_demand_rate_r_per_kva_per_month(ts) > 0:
+                monthly_max_demand[month_key]['old'] = max(monthly_max_demand[month_key]['old'], Decimal(demand[i]))
+                monthly_max_demand[month_key]['new'] = max(monthly_max_demand[month_key]['new'], Decimal(imports[i]))
+            continue
+
+        demand_kw = Decimal(str(demand[i]))
+        monthly_costs[month_key]['old_energy_cost'] += demand_kw * time_interval_hours * energy_rate_r_kwh
+        if mode == 'offgrid':
+            monthly_max_demand[month_key]['old'] = max(monthly_max_demand[month_key]['old'], demand_kw)
+            continue
+
+        if engine.get_demand_rate_r_per_kva_per_month(ts) > 0:
+            monthly_max_demand[month_key]['old'] = max(monthly_max_demand[month_key]['old'], demand_kw)
+        if i < len(generator_kw) and generator_kw[i] > 0 and gen_size_kw > 0:
+            fuel_consumption_lph = get_fuel_consumption(gen_size_kw, generator_kw[i] / gen_size_kw)
+            fuel_cost = Decimal(str(fuel_consumption_lph)) * time_interval_hours * Decimal(str(diesel_price_r_per_liter))
+            total_gen_cost = fuel_cost + (time_interval_hours / service_interval) * service_cost
+            monthly_costs[month_key]['new_energy_cost'] += total_gen_cost
+            monthly_costs[month_key]['total_new_bill'] += total_gen_cost
+
+    daily_fixed_rate = engine.get_fixed_rate_r_per_day()
+    for month_key, values in monthly_costs.items():
+        year, month = map(int, month_key.split('-'))
+        days_in_month = monthrange(year, month)[1]
+        values['old_fixed_cost'] = Decimal(days_in_month) * daily_fixed_rate
+
+        if mode == 'grid':
+            values['new_fixed_cost'] = values['old_fixed_cost']
+            demand_rate = engine.get_demand_rate_r_per_kva_per_month(datetime(year, month, 15, 18, 30))
+            values['old_demand_cost'] = monthly_max_demand[month_key]['old'] * demand_rate
+            values['new_demand_cost'] = monthly_max_demand[month_key]['new'] * demand_rate
+            values['total_new_bill'] = values['new_energy_cost'] + values['new_demand_cost'] + values['new_fixed_cost']
+        else:
+            demand_rate = engine.get_demand_rate_r_per_kva_per_month(datetime(year, month, 1))
+            values['old_demand_cost'] = demand_rate * monthly_max_demand[month_key]['old']
+            if mode == 'offgrid':
+                values['total_new_bill'] = Decimal('0')
+
+        values['total_old_bill'] = values['old_energy_cost'] + values['old_demand_cost'] + values['old_fixed_cost']
+
+    return monthly_costs, tariff_sample
+
+
+# --- Parity check: python -m services.billing (from backend/) ---
+if __name__ == '__main__':
+    import time
+    from .tariff_engine import TariffEngine
+
+    tariff = TariffEngine({
+        "name": "Parity TOU",
+        "rates": [
+            {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "689.90", "season": "high", "time_of_use": "peak"},
+            {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "209.89", "season": "high", "time_of_use": "standard"},
+            {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "114.61", "season": "high", "time_of_use": "off_peak"},
+            {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "225.90", "season": "low", "time_of_use": "peak"},
+            {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "155.87", "season": "low", "time_of_use": "standard"},
+            {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "99.38", "season": "low", "time_of_use": "off_peak"},
+            {"charge_category": "energy", "rate_unit": "c/kWh", "rate_value": "108.30", "season": "all", "time_of_use": "all"},
+            {"charge_category": "fixed", "rate_unit": "R/POD/day", "rate_value": "9.44", "season": "all", "time_of_use": "all"},
+            {"charge_category": "demand", "rate_unit": "R/kVA/month", "rate_value": "50.00", "season": "high", "time_of_use": "peak"},
+            {"charge_category": "demand", "rate_unit": "R/kVA/month", "rate_value": "35.00", "season": "low", "time_of_use": "peak"},
+        ]
+    })
+
+    rng = np.random.default_rng(7)
+    index = pd.date_range('2025-01-01', periods=17520, freq='30min', tz='Africa/Johannesburg')
+    hours = index.hour.to_numpy() + index.minute.to_numpy() / 60
+    demand = 20 + 15 * np.sin((hours - 6) / 24 * 2 * np.pi) + rng.gamma(2.0, 3.0, len(index))
+    solar = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * 40
+    generator = np.where((hours < 5) & (rng.random(len(index)) < 0.5), rng.uniform(5, 30, len(index)), 0.0)
+    sim_response = {
+        "timestamps": [ts.isoformat() for ts in index],
+        "demand": demand.tolist(),
+        "import_from_grid": np.clip(demand - solar, 0, None).tolist(),
+        "generator_kw": generator.tolist(),
+        "generator_config": {"enabled": True, "kva": 40, "diesel_price_r_per_liter": 23.5},
+    }
+
+    worst = Decimal(0)
+    for mode in ('grid', 'offgrid_generator', 'offgrid'):
+        start = time.perf_counter()
+        reference, reference_sample = compute_monthly_bills_reference(mode, tariff, sim_response)
+        reference_s = time.perf_counter() - start
+        start = time.perf_counter()
+        fast, fast_sample = compute_monthly_bills(mode, tariff, sim_response)
+        fast_s = time.perf_counter() - start
+
+        assert list(reference) == list(fast), f"{mode}: month keys differ"
+        assert reference_sample == fast_sample, f"{mode}: tariff sample differs"
+        diff = max(abs(reference[m][k] - fast[m][k]) for m in reference for k in COST_KEYS)
+        worst = max(worst, diff)
+        status = "OK" if diff <= Decimal('0.01') else "MISMATCH"
+        print(f"{mode:<18} max monthly diff R{diff:.6f}  reference {reference_s * 1000:.0f} ms  "
+              f"vectorized {fast_s * 1000:.1f} ms  {status}")
+    assert worst <= Decimal('0.01'), "Vectorized bills differ from the Decimal path by more than R0.01"
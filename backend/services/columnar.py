@@ -0,0 +1,128 @@
+# services/columnar.py
+"""
+Content negotiation for the time-series endpoints.
+
+JSON stays the default. A client that sends `Accept: application/vnd.apache.arrow.stream`
+or `Accept: application/x-msgpack` gets float32 columns packed straight from NumPy
+buffers instead of one Python object per value:
+
+  Arrow    one IPC stream with a single record batch of float32 columns (plus a
+           timestamp[s] column when the timestamps are irregular); every other field
+           is JSON in the schema metadata under "meta"
+  msgpack  {"meta": {...}, "count": n, "dtype": "<f4", "columns": {name: bin},
+            "timestamps": bin of int64 seconds (irregular only)}
+
+Regular timestamps are sent as meta "start" + "step_seconds". pyarrow and msgpack are
+optional: a format is only offered when its library is installed.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify, request
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow responses are not offered without pyarrow
+    pa = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are not offered without msgpack
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MIMETYPE = "application/x-msgpack"
+
+
+def negotiated_mimetype():
+    """Best of the formats we can produce for the request's Accept header; JSON unless asked otherwise."""
+    offered = [JSON_MIMETYPE]
+    if pa is not None:
+        offered.append(ARROW_MIMETYPE)
+    if msgpack is not None:
+        offered.append(MSGPACK_MIMETYPE)
+    return request.accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+
+
+def wants_binary():
+    return negotiated_mimetype() != JSON_MIMETYPE
+
+
+def _timestamp_fields(timestamps):
+    """({"start", "step_seconds"} or {}, explicit datetime64[s] array or None)."""
+    index = pd.DatetimeIndex(timestamps)
+    if len(index) == 0:
+        return {"start": None, "step_seconds": None}, None
+    steps = np.diff(index.asi8)
+    if len(index) == 1 or (steps == steps[0]).all():
+        step_seconds = int(steps[0] // 10**9) if len(steps) else None
+        return {"start": index[0].isoformat(), "step_seconds": step_seconds}, None
+    if index.tz is not None:
+        index = index.tz_convert(None)  # explicit timestamps go out as naive UTC
+    return {}, index.to_numpy(dtype="datetime64[s]")
+
+
+def _arrow_body(columns, meta, explicit_timestamps):
+    names, arrays = [], []
+    if explicit_timestamps is not None:
+        names.append("timestamp")
+        arrays.append(pa.array(explicit_timestamps))
+    for name, values in columns.items():
+        names.append(name)
+        arrays.append(pa.array(values))
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    batch = batch.replace_schema_metadata({"meta": json.dumps(meta, default=str)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _msgpack_body(columns, meta, explicit_timestamps, count):
+    payload = {
+        "meta": json.loads(json.dumps(meta, default=str)),
+        "count": count,
+        "dtype": "<f4",
+        "columns": {name: values.astype("<f4", copy=False).tobytes() for name, values in columns.items()},
+    }
+    if explicit_timestamps is not None:
+        payload["timestamps"] = explicit_timestamps.astype("<i8").tobytes()
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def columnar_response(columns, meta=None, timestamps=None, mimetype=None):
+    """
+    Packs equal-length numeric `columns` ({name: array-like}) as float32 in the negotiated
+    binary format. `meta` holds any other JSON-serializable fields.
+    """
+    mimetype = mimetype or negotiated_mimetype()
+    columns = {name: np.ascontiguousarray(values, dtype=np.float32) for name, values in columns.items()}
+    count = len(next(iter(columns.values()))) if columns else 0
+    meta = dict(meta or {})
+    explicit_timestamps = None
+    if timestamps is not None:
+        fields, explicit_timestamps = _timestamp_fields(timestamps)
+        meta.update(fields)
+
+    if mimetype == ARROW_MIMETYPE:
+        body = _arrow_body(columns, meta, explicit_timestamps)
+    else:
+        body = _msgpack_body(columns, meta, explicit_timestamps, count)
+    response = Response(body, mimetype=mimetype)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+def negotiated_response(build_json, columns, meta=None, timestamps=None):
+    """
+    columnar_response for binary Accept headers, else jsonify(build_json()). The JSON body
+    is only built when it is actually sent.
+    """
+    mimetype = negotiated_mimetype()
+    if mimetype == JSON_MIMETYPE:
+        response = jsonify(build_json())
+        response.headers["Vary"] = "Accept"
+        return response
+    return columnar_response(columns, meta=meta, timestamps=timestamps, mimetype=mimetype)
@@ -0,0 +1,634 @@
+# services/dispatch.py
+"""
+Energy-flow dispatch kernels used by the simulation engine.
+
+`dispatch_vectorized` works on contiguous float64 arrays: PV-to-load, export
+and import are whole-array operations and only the battery state-of-charge
+recurrence is a scalar scan (JIT-compiled when Numba is installed).
+`dispatch_generator` does the same for off-grid systems with a generator, with
+the controller's start/stop state machine inlined into the scan.
+`dispatch_reference` is the original per-interval loop, kept as the
+reference implementation.
+
+Run `python -m services.dispatch` from the backend folder for a parity check.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, the pure-Python scan is used instead
+    njit = None
+
+BATTERY_SYSTEM_TYPES = ('hybrid', 'off-grid')
+
+
+def dispatch_reference(
+        demand_kw,
+        potential_generation_kw,
+        system_type,
+        battery_capacity_kwh,
+        min_soc_limit_kwh,
+        allow_export,
+        inverter_kva=None,
+        generator=None,
+        time_interval_hours=0.5
+):
+    """
+    Per-interval dispatch loop (reference implementation).
+    Returns a dict of plain lists, one entry per interval.
+    """
+    battery_soc_kwh = battery_capacity_kwh
+
+    import_from_grid, export_to_grid = [], []
+    usable_generation_kw, battery_soc_trace = [], []
+    shortfall_kw, generator_kw = [], []
+
+    for i in range(len(demand_kw)):
+        # PV available this interval (already inverter-capped)
+        gen_kwh = potential_generation_kw[i] * time_interval_hours
+        load_kwh = demand_kw[i] * time_interval_hours
+
+        # 1) PV to load
+        pv_to_load = min(gen_kwh, load_kwh)
+        rem_load_kwh = load_kwh - pv_to_load
+        excess_pv_kwh = gen_kwh - pv_to_load
+
+        # 2) Excess PV to battery (hybrid or off-grid)
+        pv_to_batt = 0.0
+        if excess_pv_kwh > 0 and system_type in BATTERY_SYSTEM_TYPES and battery_capacity_kwh > 0:
+            # Calculate available space in battery
+            available_space_kwh = battery_capacity_kwh - battery_soc_kwh
+
+            # Battery maximum charge rate (1C rate = battery kWh capacity in kW)
+            battery_max_charge_rate_kw = battery_capacity_kwh
+            max_charge_kwh_this_interval = battery_max_charge_rate_kw * time_interval_hours
+
+            # Use minimum of: excess PV, available space, charge rate limit
+            pv_to_batt = min(excess_pv_kwh, available_space_kwh, max_charge_kwh_this_interval)
+            battery_soc_kwh += pv_to_batt
+
+        # 3) Generator operation for off-grid systems
+        gen_to_load_kw = 0.0
+        gen_to_batt_kw = 0.0
+
+        if system_type == 'off-grid' and generator:
+            gen_to_load_kw, gen_to_batt_kw, _ = generator.get_output(
+                demand_shortfall_kw=rem_load_kwh / time_interval_hours,
+                battery_soc_kwh=battery_soc_kwh,
+                battery_capacity_kwh=battery_capacity_kwh,
+                time_interval_hours=time_interval_hours,
+                min_soc_limit_kwh=min_soc_limit_kwh,
+                inverter_ac_limit_kw=inverter_kva
+            )
+
+            # Apply generator output
+            gen_to_load_kwh = gen_to_load_kw * time_interval_hours
+            gen_to_batt_kwh = gen_to_batt_kw * time_interval_hours
+
+            rem_load_kwh -= gen_to_load_kwh
+            rem_load_kwh = max(0.0, rem_load_kwh)  # Ensure non-negative
+
+            if gen_to_batt_kwh > 0 and battery_capacity_kwh > 0:
+                # Generator charges battery
+                actual_charge = min(gen_to_batt_kwh, battery_capacity_kwh - battery_soc_kwh)
+                battery_soc_kwh += actual_charge
+
+        # 4) Discharge battery to remaining load (respect min SOC)
+        if rem_load_kwh > 0 and system_type in BATTERY_SYSTEM_TYPES and battery_capacity_kwh > 0:
+            available_discharge = max(0.0, battery_soc_kwh - min_soc_limit_kwh)
+            batt_to_load = min(rem_load_kwh, available_discharge)
+            battery_soc_kwh -= batt_to_load
+            rem_load_kwh -= batt_to_load
+
+        # 5) Handle remaining load based on system type
+        if rem_load_kwh > 0:
+            if system_type == 'off-grid':
+                # Off-grid: remaining load becomes shortfall (no grid)
+                shortfall_kw.append(rem_load_kwh / time_interval_hours)
+                import_from_grid.append(0.0)
+            else:
+                # Grid-tied or hybrid: import from grid
+                import_from_grid.append(rem_load_kwh / time_interval_hours)
+                shortfall_kw.append(0.0)
+        else:
+            import_from_grid.append(0.0)
+            shortfall_kw.append(0.0)
+
+        # 6) Generator Output Tracking - get Actual Output including wasted power
+        if system_type == 'off-grid' and generator:
+            # Get the actual gen output (incl min loading)
+            actual_generator_output_kw = 0.0
+            if generator.is_running:
+                min_output_kw = generator.size_kw * (generator.min_loading_pct / 100.0)
+                useful_output_kw = gen_to_load_kw + gen_to_batt_kw
+                actual_generator_output_kw = max(min_output_kw, useful_output_kw)
+            generator_kw.append(actual_generator_output_kw)
+        else:
+            generator_kw.append(0.0)
+
+        # 7) Grid export only if allowed (surplus PV after charging battery)
+        export_kwh = 0.0
+        remaining_excess_after_batt = excess_pv_kwh - pv_to_batt
+        if remaining_excess_after_batt > 0 and allow_export and system_type != 'off-grid':
+            export_kwh = remaining_excess_after_batt
+        export_to_grid.append(export_kwh / time_interval_hours)
+
+        # 8) Usable gen (PV used + PV to batt + export) for plotting
+        usable_kwh = pv_to_load + pv_to_batt + export_kwh
+        usable_generation_kw.append(usable_kwh / time_interval_hours)
+
+        battery_soc_trace.append((battery_soc_kwh / battery_capacity_kwh * 100) if battery_capacity_kwh > 0 else 0)
+
+    return {
+        "import_from_grid": import_from_grid,
+        "export_to_grid": export_to_grid,
+        "usable_generation_kw": usable_generation_kw,
+        "battery_soc": battery_soc_trace,
+        "shortfall_kw": shortfall_kw,
+        "generator_kw": generator_kw,
+    }
+
+
+def _battery_scan(excess_kwh, rem_load_kwh, capacity_kwh, min_soc_kwh, max_charge_kwh,
+                  pv_to_batt, batt_to_load, soc_kwh):
+    """
+    State-of-charge recurrence: charge from excess PV, then discharge to the
+    remaining load. Fills the three output buffers in place.
+    """
+    soc = capacity_kwh
+    for i in range(len(excess_kwh)):
+        excess = excess_kwh[i]
+        if excess > 0:
+            charge = min(excess, capacity_kwh - soc, max_charge_kwh)
+            soc += charge
+            pv_to_batt[i] = charge
+
+        rem = rem_load_kwh[i]
+        if rem > 0:
+            discharge = min(rem, max(0.0, soc - min_soc_kwh))
+            soc -= discharge
+            batt_to_load[i] = discharge
+
+        soc_kwh[i] = soc
+
+
+_battery_scan_jit = njit(cache=True)(_battery_scan) if njit else None
+
+
+def battery_scan(excess_kwh, rem_load_kwh, capacity_kwh, min_soc_kwh, max_charge_kwh):
+    """Runs the SOC scan and returns (pv_to_batt, batt_to_load, soc_kwh) arrays."""
+    n = len(excess_kwh)
+    if _battery_scan_jit is not None:
+        pv_to_batt, batt_to_load, soc_kwh = np.zeros(n), np.zeros(n), np.zeros(n)
+        _battery_scan_jit(excess_kwh, rem_load_kwh, float(capacity_kwh), float(min_soc_kwh),
+                          float(max_charge_kwh), pv_to_batt, batt_to_load, soc_kwh)
+        return pv_to_batt, batt_to_load, soc_kwh
+
+    # Plain lists are much faster than NumPy scalar indexing in pure Python
+    pv_to_batt, batt_to_load, soc_kwh = [0.0] * n, [0.0] * n, [0.0] * n
+    _battery_scan(excess_kwh.tolist(), rem_load_kwh.tolist(), float(capacity_kwh), float(min_soc_kwh),
+                  float(max_charge_kwh), pv_to_batt, batt_to_load, soc_kwh)
+    return np.array(pv_to_batt), np.array(batt_to_load), np.array(soc_kwh)
+
+
+def dispatch_vectorized(
+        demand_kw,
+        potential_generation_kw,
+        system_type,
+        battery_capacity_kwh,
+        min_soc_limit_kwh,
+        allow_export,
+        time_interval_hours=0.5
+):
+    """
+    Array dispatch kernel for systems without a generator.
+    Produces exactly the same numbers as `dispatch_reference`, as float64 arrays.
+    """
+    demand_kw = np.ascontiguousarray(demand_kw, dtype=np.float64)
+    potential_generation_kw = np.ascontiguousarray(potential_generation_kw, dtype=np.float64)
+    n = len(demand_kw)
+
+    gen_kwh = potential_generation_kw * time_interval_hours
+    load_kwh = demand_kw * time_interval_hours
+
+    # 1) PV to load
+    pv_to_load = np.minimum(gen_kwh, load_kwh)
+    rem_load_kwh = load_kwh - pv_to_load
+    excess_pv_kwh = gen_kwh - pv_to_load
+
+    # 2) Battery charge/discharge (the only sequential part)
+    if system_type in BATTERY_SYSTEM_TYPES and battery_capacity_kwh > 0:
+        pv_to_batt, batt_to_load, soc_kwh = battery_scan(
+            excess_pv_kwh, rem_load_kwh, battery_capacity_kwh, min_soc_limit_kwh,
+            battery_capacity_kwh * time_interval_hours
+        )
+        rem_load_kwh = rem_load_kwh - batt_to_load
+    else:
+        pv_to_batt = np.zeros(n)
+        soc_kwh = np.full(n, float(battery_capacity_kwh))
+
+    # 3) Remaining load is imported (grid-tied/hybrid) or becomes shortfall (off-grid)
+    unmet_kw = np.where(rem_load_kwh > 0, rem_load_kwh / time_interval_hours, 0.0)
+    if system_type == 'off-grid':
+        import_from_grid, shortfall_kw = np.zeros(n), unmet_kw
+    else:
+        import_from_grid, shortfall_kw = unmet_kw, np.zeros(n)
+
+    # 4) Export surplus PV after charging the battery
+    remaining_excess_after_batt = excess_pv_kwh - pv_to_batt
+    if allow_export and system_type != 'off-grid':
+        export_kwh = np.where(remaining_excess_after_batt > 0, remaining_excess_after_batt, 0.0)
+    else:
+        export_kwh = np.zeros(n)
+
+    usable_kwh = pv_to_load + pv_to_batt + export_kwh
+
+    if battery_capacity_kwh > 0:
+        battery_soc = soc_kwh / battery_capacity_kwh * 100
+    else:
+        battery_soc = np.zeros(n)
+
+    return {
+        "import_from_grid": import_from_grid,
+        "export_to_grid": export_kwh / time_interval_hours,
+        "usable_generation_kw": usable_kwh / time_interval_hours,
+        "battery_soc": battery_soc,
+        "shortfall_kw": shortfall_kw,
+        "generator_kw": np.zeros(n),
+    }
+
+
+def _generator_scan(excess_kwh, rem_load_kwh, capacity_kwh, min_soc_kwh, dt,
+                    size_kw, min_output_kw, target_output_kw, min_run_time_hours,
+                    start_soc, stop_soc, can_charge_battery,
+                    pv_to_batt, soc_kwh, shortfall_kw, generator_kw, running):
+    """
+    Off-grid dispatch with a generator: the GeneratorController start/stop state machine
+    inlined into the battery recurrence (same order of operations as dispatch_reference).
+    Inputs are the load and excess PV left after PV-to-load, as in `_battery_scan`.
+    Fills the output buffers in place; returns the final (is_running, run_time_remaining).
+    """
+    soc = capacity_kwh
+    is_running = False
+    run_time_remaining = 0.0
+    for i in range(len(excess_kwh)):
+        # 2) Excess PV to battery
+        rem = rem_load_kwh[i]
+        excess = excess_kwh[i]
+        charge = 0.0
+        if excess > 0 and capacity_kwh > 0:
+            charge = min(excess, capacity_kwh - soc, capacity_kwh * dt)
+            soc += charge
+        pv_to_batt[i] = charge
+
+        # 3) Generator start/stop (GeneratorController.should_start / should_stop)
+        demand_shortfall_kw = rem / dt
+        soc_pct = (soc / capacity_kwh * 100) if capacity_kwh > 0 else 0.0
+        if not is_running:
+            if capacity_kwh <= 0:
+                start = demand_shortfall_kw > 0
+            elif soc_pct > 50.0:
+                start = False
+            else:
+                potential_discharge = min(max(0.0, soc - min_soc_kwh), capacity_kwh * dt)
+                start = max(0.0, demand_shortfall_kw * dt - potential_discharge) > 0 or soc_pct <= start_soc
+            if start:
+                is_running = True
+                run_time_remaining = min_run_time_hours
+        else:
+            if can_charge_battery:
+                stop = soc_pct >= stop_soc
+            else:
+                stop = run_time_remaining <= 0 and demand_shortfall_kw <= size_kw * 0.1
+            if stop:
+                is_running = False
+                run_time_remaining = 0.0
+            else:
+                run_time_remaining = max(0.0, run_time_remaining - dt)
+
+        gen_to_load_kw = 0.0
+        gen_to_batt_kw = 0.0
+        if is_running:
+            gen_to_load_kw = min(demand_shortfall_kw, target_output_kw)
+            if can_charge_battery and capacity_kwh > 0:
+                spare_kw = target_output_kw - gen_to_load_kw
+                if spare_kw > 0:
+                    to_stop_soc_kwh = max(0.0, (stop_soc - soc_pct) * capacity_kwh / 100)
+                    gen_to_batt_kw = max(0.0, min(spare_kw, capacity_kwh, to_stop_soc_kwh / dt))
+            generator_kw[i] = max(gen_to_load_kw + gen_to_batt_kw, min_output_kw)
+            running[i] = True
+        else:
+            generator_kw[i] = 0.0
+
+        # Apply generator output
+        rem = max(0.0, rem - gen_to_load_kw * dt)
+        gen_to_batt_kwh = gen_to_batt_kw * dt
+        if gen_to_batt_kwh > 0 and capacity_kwh > 0:
+            soc += min(gen_to_batt_kwh, capacity_kwh - soc)
+
+        # 4) Battery to remaining load, 5) the rest is shortfall
+        if rem > 0 and capacity_kwh > 0:
+            discharge = min(rem, max(0.0, soc - min_soc_kwh))
+            soc -= discharge
+            rem -= discharge
+        shortfall_kw[i] = rem / dt if rem > 0 else 0.0
+        soc_kwh[i] = soc
+
+    return is_running, run_time_remaining
+
+
+_generator_scan_jit = njit(cache=True)(_generator_scan) if njit else None
+
+
+def dispatch_generator(
+        demand_kw,
+        potential_generation_kw,
+        battery_capacity_kwh,
+        min_soc_limit_kwh,
+        generator,
+        inverter_kva=None,
+        time_interval_hours=0.5
+):
+    """
+    Off-grid dispatch with a GeneratorController in one pass over the year.
+    Same numbers as `dispatch_reference`, as arrays, plus a "generator_running" mask.
+    Leaves the controller's is_running/run_time_remaining as the reference loop would.
+    """
+    dt = time_interval_hours
+    demand_kw = np.ascontiguousarray(demand_kw, dtype=np.float64)
+    potential_generation_kw = np.ascontiguousarray(potential_generation_kw, dtype=np.float64)
+    n = len(demand_kw)
+
+    # 1) PV to load
+    gen_kwh = potential_generation_kw * dt
+    load_kwh = demand_kw * dt
+    pv_to_load = np.minimum(gen_kwh, load_kwh)
+    rem_load_kwh = load_kwh - pv_to_load
+    excess_pv_kwh = gen_kwh - pv_to_load
+
+    min_output_kw = generator.size_kw * (generator.min_loading_pct / 100.0)
+    target_output_kw = generator.size_kw if inverter_kva is None else min(generator.size_kw, inverter_kva)
+    target_output_kw = max(min_output_kw, target_output_kw)
+    params = (float(battery_capacity_kwh), float(min_soc_limit_kwh), float(dt),
+              float(generator.size_kw), float(min_output_kw), float(target_output_kw),
+              float(generator.min_run_time_hours), float(generator.battery_start_soc),
+              float(generator.battery_stop_soc), bool(generator.can_charge_battery))
+
+    if _generator_scan_jit is not None:
+        pv_to_batt, soc_kwh, shortfall_kw, generator_kw = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+        running = np.zeros(n, dtype=np.bool_)
+        state = _generator_scan_jit(excess_pv_kwh, rem_load_kwh, *params,
+                                    pv_to_batt, soc_kwh, shortfall_kw, generator_kw, running)
+    else:
+        # Plain lists are much faster than NumPy scalar indexing in pure Python
+        pv_to_batt, soc_kwh, shortfall_kw, generator_kw = [0.0] * n, [0.0] * n, [0.0] * n, [0.0] * n
+        running = [False] * n
+        state = _generator_scan(excess_pv_kwh.tolist(), rem_load_kwh.tolist(), *params,
+                                pv_to_batt, soc_kwh, shortfall_kw, generator_kw, running)
+        pv_to_batt, soc_kwh, shortfall_kw = np.array(pv_to_batt), np.array(soc_kwh), np.array(shortfall_kw)
+        generator_kw, running = np.array(generator_kw), np.array(running, dtype=bool)
+
+    generator.is_running, generator.run_time_remaining = bool(state[0]), float(state[1])
+
+    if battery_capacity_kwh > 0:
+        battery_soc = soc_kwh / battery_capacity_kwh * 100
+    else:
+        battery_soc = np.zeros(n)
+
+    return {
+        "import_from_grid": np.zeros(n),
+        "export_to_grid": np.zeros(n),
+        "usable_generation_kw": (pv_to_load + pv_to_batt) / dt,
+        "battery_soc": battery_soc,
+        "shortfall_kw": shortfall_kw,
+        "generator_kw": generator_kw,
+        "generator_running": running,
+    }
+
+
+def battery_scan_batch(excess_kwh, rem_load_kwh, capacity_kwh, min_soc_kwh, max_charge_kwh):
+    """
+    SOC scan for many designs at once. Inputs are (designs, intervals) arrays and
+    per-design capacity/limit vectors; returns (pv_to_batt, batt_to_load, soc_kwh).
+    """
+    n_designs, n = excess_kwh.shape
+    pv_to_batt = np.zeros((n_designs, n))
+    batt_to_load = np.zeros((n_designs, n))
+    soc_kwh = np.zeros((n_designs, n))
+
+    if _battery_scan_jit is not None:
+        for d in range(n_designs):
+            _battery_scan_jit(excess_kwh[d], rem_load_kwh[d], float(capacity_kwh[d]), float(min_soc_kwh[d]),
+                              float(max_charge_kwh[d]), pv_to_batt[d], batt_to_load[d], soc_kwh[d])
+        return pv_to_batt, batt_to_load, soc_kwh
+
+    # Step through time once, updating every design's SOC as a vector
+    excess_t = np.ascontiguousarray(excess_kwh.T)
+    rem_t = np.ascontiguousarray(rem_load_kwh.T)
+    charge_t, discharge_t, soc_t = np.zeros((n, n_designs)), np.zeros((n, n_designs)), np.zeros((n, n_designs))
+    soc = np.array(capacity_kwh, dtype=np.float64)
+    for i in range(n):
+        excess = excess_t[i]
+        charge = np.minimum(np.minimum(excess, capacity_kwh - soc), max_charge_kwh)
+        charge[~(excess > 0)] = 0.0
+        soc += charge
+
+        rem = rem_t[i]
+        discharge = np.minimum(rem, np.maximum(0.0, soc - min_soc_kwh))
+        discharge[~(rem > 0)] = 0.0
+        soc -= discharge
+
+        charge_t[i], discharge_t[i], soc_t[i] = charge, discharge, soc
+
+    return charge_t.T, discharge_t.T, soc_t.T
+
+
+def dispatch_batch(
+        demand_kw,
+        potential_generation_kw,
+        battery_capacity_kwh,
+        min_soc_limit_kwh,
+        uses_battery,
+        allow_export,
+        off_grid,
+        time_interval_hours=0.5
+):
+    """
+    Array dispatch for a batch of designs sharing one demand series.
+    `potential_generation_kw` is (designs, intervals); the other design inputs are
+    per-design vectors. Returns the `dispatch_vectorized` keys as 2-D arrays.
+    """
+    demand_kw = np.asarray(demand_kw, dtype=np.float64)
+    potential_generation_kw = np.asarray(potential_generation_kw, dtype=np.float64)
+    battery_capacity_kwh = np.asarray(battery_capacity_kwh, dtype=np.float64)
+    min_soc_limit_kwh = np.asarray(min_soc_limit_kwh, dtype=np.float64)
+    uses_battery = np.asarray(uses_battery, dtype=bool)
+    allow_export = np.asarray(allow_export, dtype=bool)
+    off_grid = np.asarray(off_grid, dtype=bool)
+    shape = potential_generation_kw.shape
+
+    gen_kwh = potential_generation_kw * time_interval_hours
+    load_kwh = (demand_kw * time_interval_hours)[np.newaxis, :]
+
+    pv_to_load = np.minimum(gen_kwh, load_kwh)
+    rem_load_kwh = load_kwh - pv_to_load
+    excess_pv_kwh = gen_kwh - pv_to_load
+
+    pv_to_batt = np.zeros(shape)
+    soc_kwh = np.repeat(battery_capacity_kwh[:, np.newaxis], shape[1], axis=1)
+    if uses_battery.any():
+        rows = np.flatnonzero(uses_battery)
+        charge, discharge, soc = battery_scan_batch(
+            excess_pv_kwh[rows], rem_load_kwh[rows], battery_capacity_kwh[rows],
+            min_soc_limit_kwh[rows], battery_capacity_kwh[rows] * time_interval_hours
+        )
+        pv_to_batt[rows] = charge
+        rem_load_kwh[rows] -= discharge
+        soc_kwh[rows] = soc
+
+    unmet_kw = np.where(rem_load_kwh > 0, rem_load_kwh / time_interval_hours, 0.0)
+    import_from_grid = np.where(off_grid[:, np.newaxis], 0.0, unmet_kw)
+    shortfall_kw = np.where(off_grid[:, np.newaxis], unmet_kw, 0.0)
+
+    remaining_excess_after_batt = excess_pv_kwh - pv_to_batt
+    can_export = (allow_export & ~off_grid)[:, np.newaxis] & (remaining_excess_after_batt > 0)
+    export_kwh = np.where(can_export, remaining_excess_after_batt, 0.0)
+
+    usable_kwh = pv_to_load + pv_to_batt + export_kwh
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        battery_soc = np.where(battery_capacity_kwh[:, np.newaxis] > 0,
+                               soc_kwh / battery_capacity_kwh[:, np.newaxis] * 100, 0.0)
+
+    return {
+        "import_from_grid": import_from_grid,
+        "export_to_grid": export_kwh / time_interval_hours,
+        "usable_generation_kw": usable_kwh / time_interval_hours,
+        "battery_soc": battery_soc,
+        "shortfall_kw": shortfall_kw,
+        "generator_kw": np.zeros(shape),
+    }
+
+
+def run_dispatch(
+        demand_kw,
+        potential_generation_kw,
+        system_type,
+        battery_capacity_kwh,
+        min_soc_limit_kwh,
+        allow_export,
+        inverter_kva=None,
+        generator=None,
+        time_interval_hours=0.5
+):
+    """
+    Dispatches one design and returns plain lists (same shape as `dispatch_reference`).
+    Off-grid runs with a generator also return "generator_fuel_l" (litres per interval)
+    and leave the controller's runtime, energy and fuel totals filled in.
+    """
+    if generator is not None and system_type == 'off-grid':
+        flows = dispatch_generator(
+            demand_kw, potential_generation_kw, battery_capacity_kwh, min_soc_limit_kwh,
+            generator, inverter_kva=inverter_kva, time_interval_hours=time_interval_hours
+        )
+        running = flows.pop("generator_running")
+        flows["generator_fuel_l"] = generator.fuel_liters(flows["generator_kw"], time_interval_hours)
+        generator.total_runtime_hours = float(np.count_nonzero(running)) * time_interval_hours
+        generator.total_energy_kwh = float(flows["generator_kw"].sum()) * time_interval_hours
+        generator.total_fuel_liters = float(flows["generator_fuel_l"].sum())
+    else:
+        flows = dispatch_vectorized(
+            demand_kw, potential_generation_kw, system_type, battery_capacity_kwh,
+            min_soc_limit_kwh, allow_export, time_interval_hours=time_interval_hours
+        )
+    result = {key: values.tolist() for key, values in flows.items()}
+    if battery_capacity_kwh <= 0:
+        result["battery_soc"] = [0] * len(result["battery_soc"])
+    return result
+
+
+# --- Parity check against the reference loop ---
+if __name__ == '__main__':
+    import os
+    import time
+    import pandas as pd
+
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils', 'generation_profile.csv')
+    profile = pd.read_csv(csv_path)
+
+    rng = np.random.default_rng(42)
+    n = len(profile)
+    hours = (np.arange(n) % 48) / 2
+    demand = (8 + 6 * np.sin((hours - 6) / 24 * 2 * np.pi) + rng.gamma(2.0, 1.5, n)).tolist()
+
+    cases = [
+        ('grid', 0, False),
+        ('grid', 0, True),
+        ('hybrid', 40, False),
+        ('hybrid', 40, True),
+        ('off-grid', 60, False),
+        ('off-grid', 0, False),
+    ]
+
+    print("--- Dispatch parity: reference loop vs array kernel ---")
+    print(f"Numba JIT: {'enabled' if _battery_scan_jit is not None else 'not installed'}")
+    failures = 0
+    for column in profile.columns:
+        generation = (profile[column].to_numpy() / 100) * 50.0
+        potential = np.minimum(generation, 40.0).tolist()
+        for system_type, battery_kwh, allow_export in cases:
+            min_soc = battery_kwh * 0.2
+            t0 = time.perf_counter()
+            expected = dispatch_reference(demand, potential, system_type, battery_kwh, min_soc, allow_export)
+            t1 = time.perf_counter()
+            actual = run_dispatch(demand, potential, system_type, battery_kwh, min_soc, allow_export)
+            t2 = time.perf_counter()
+
+            mismatched = [key for key in expected if expected[key] != actual[key]]
+            failures += bool(mismatched)
+            status = 'OK' if not mismatched else f"MISMATCH in {', '.join(mismatched)}"
+            print(f"{column:<28} {system_type:<9} batt={battery_kwh:<3} export={allow_export!s:<5} "
+                  f"loop={(t1 - t0) * 1000:7.1f} ms  kernel={(t2 - t1) * 1000:6.1f} ms  {status}")
+
+    print("\n--- Off-grid with generator: reference loop + GeneratorController vs generator kernel ---")
+    from services.simulation_engine import GeneratorController
+
+    generator_cases = [
+        # battery kWh, generator kVA, min run hours, can charge battery, start/stop SOC
+        (60, 20, 1.0, True, 20, 80),
+        (60, 20, 2.0, False, 30, 90),
+        (20, 40, 0.0, True, 40, 100),
+        (0, 30, 1.0, True, 20, 80),
+    ]
+    generation = (profile[profile.columns[0]].to_numpy() / 100) * 30.0
+    potential = np.minimum(generation, 25.0).tolist()
+    for battery_kwh, gen_kva, min_run, can_charge, start_soc, stop_soc in generator_cases:
+        def controller():
+            return GeneratorController(gen_kva, min_loading_pct=30, min_run_time_hours=min_run,
+                                       battery_start_soc=start_soc, battery_stop_soc=stop_soc,
+                                       can_charge_battery=can_charge)
+        min_soc = battery_kwh * 0.2
+        reference_gen, kernel_gen = controller(), controller()
+        t0 = time.perf_counter()
+        expected = dispatch_reference(demand, potential, 'off-grid', battery_kwh, min_soc, False,
+                                      inverter_kva=25.0, generator=reference_gen)
+        t1 = time.perf_counter()
+        actual = run_dispatch(demand, potential, 'off-grid', battery_kwh, min_soc, False,
+                              inverter_kva=25.0, generator=kernel_gen)
+        t2 = time.perf_counter()
+
+        mismatched = [key for key in expected if expected[key] != actual[key]]
+        for attr in ('total_fuel_liters', 'total_energy_kwh', 'total_runtime_hours'):
+            if not np.isclose(getattr(reference_gen, attr), getattr(kernel_gen, attr), rtol=1e-9):
+                mismatched.append(attr)
+        if (reference_gen.is_running, reference_gen.run_time_remaining) != \
+                (kernel_gen.is_running, kernel_gen.run_time_remaining):
+            mismatched.append('final state')
+        failures += bool(mismatched)
+        status = 'OK' if not mismatched else f"MISMATCH in {', '.join(mismatched)}"
+        print(f"batt={battery_kwh:<3} gen={gen_kva:<3} min_run={min_run} charge={can_charge!s:<5} "
+              f"fuel={kernel_gen.total_fuel_liters:9.1f} L  "
+              f"loop={(t1 - t0) * 1000:7.1f} ms  kernel={(t2 - t1) * 1000:6.1f} ms  {status}")
+
+    print(f"\n{failures} mismatching case(s)")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,141 @@
+# services/energy_ingest.py
+"""
+Bulk ingest of uploaded meter data (POST /api/projects/<id>/energy-data).
+
+  replace_energy_data(project_id, upload)   parses the file and swaps it in as the
+                                            project's EnergyData; returns the row count
+
+The file is read INGEST_CHUNK_ROWS rows at a time (CSV streams from the upload; Excel
+has no streaming reader in pandas, so the sheet is read whole and then chunked). Each
+chunk is validated and normalised with vectorised pandas and written straight away:
+PostgreSQL (psycopg2) gets one COPY ... FROM STDIN per chunk, other databases a Core
+executemany. No ORM objects are built.
+
+Everything happens in the session's transaction: the old rows are deleted first and the
+caller commits once the last chunk and the packed series are written, so a file that
+fails validation halfway leaves the previous data in place (the caller rolls back).
+"""
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from models import db, EnergyData
+from . import metrics
+from .energy_series import save_series
+
+INGEST_CHUNK_ROWS = 50_000
+COPY_SQL = "COPY energy_data (project_id, timestamp, demand_kw) FROM STDIN WITH (FORMAT csv)"
+COPY_DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def read_chunks(upload, chunk_rows=INGEST_CHUNK_ROWS):
+    """Yields the upload as DataFrames of at most `chunk_rows` rows (raw columns, header row consumed)."""
+    if upload.filename.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(upload, engine="openpyxl")
+        for start in range(0, max(len(df), 1), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+
+    with pd.read_csv(upload, chunksize=chunk_rows) as reader:  # default to csv
+        yield from reader
+
+
+def normalise_chunk(df):
+    """
+    (timestamps, demand_kw) of one raw chunk: the first two columns, rows with a blank
+    in either dropped, timestamps naive (wall clock) and demand float64.
+    Raises ValueError naming the first file row (header = row 1) that does not parse.
+    """
+    if df.shape[1] < 2:
+        raise ValueError("First two columns must be timestamp and demand_kW")
+
+    df = df.iloc[:, :2].dropna()
+    raw_ts, raw_kw = df.iloc[:, 0], df.iloc[:, 1]
+
+    # One inferred format for the whole chunk; files that mix formats take the per-row parser
+    timestamps = pd.to_datetime(raw_ts, errors="coerce")
+    if timestamps.isna().any():
+        timestamps = pd.to_datetime(raw_ts, errors="coerce", format="mixed")
+    if isinstance(timestamps.dtype, pd.DatetimeTZDtype):
+        timestamps = timestamps.dt.tz_localize(None)  # EnergyData stores naive wall-clock timestamps
+    _check(timestamps.isna().to_numpy(), raw_ts, "cannot read timestamp")
+
+    demand_kw = pd.to_numeric(raw_kw, errors="coerce")
+    _check(demand_kw.isna().to_numpy(), raw_kw, "demand_kW is not a number")
+
+    return pd.DatetimeIndex(timestamps), demand_kw.to_numpy(dtype=np.float64)
+
+
+def _check(bad, raw, message):
+    if bad.any():
+        position = int(np.argmax(bad))
+        # chunks keep the reader's running row index, so this is the row in the whole file
+        raise ValueError(f"Row {int(raw.index[position]) + 2}: {message} ({raw.iloc[position]!r})")
+
+
+def _copy_rows(connection, project_id, timestamps, demand_kw):
+    """One COPY FROM STDIN of the chunk, as CSV, on the session's own DBAPI connection."""
+    buffer = io.StringIO()
+    pd.DataFrame({"project_id": project_id, "timestamp": timestamps, "demand_kw": demand_kw}) \
+        .to_csv(buffer, header=False, index=False, date_format=COPY_DATE_FORMAT, float_format="%.17g")
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(COPY_SQL, buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_rows(connection, project_id, timestamps, demand_kw):
+    """The same rows as a Core executemany, for databases without COPY (e.g. sqlite)."""
+    connection.execute(EnergyData.__table__.insert(), [
+        {"project_id": project_id, "timestamp": ts, "demand_kw": kw}
+        for ts, kw in zip(timestamps.to_pydatetime(), demand_kw.tolist())
+    ])
+
+
+def replace_energy_data(project_id, upload):
+    """
+    Deletes the project's EnergyData and writes the upload's rows and packed series in
+    their place, inside the current transaction (the caller commits, or rolls back on
+    error). Returns the number of rows written. Raises ValueError for an unusable file.
+    """
+    connection = db.session.connection()
+    copy = connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+    write_rows = _copy_rows if copy else _insert_rows
+
+    EnergyData.query.filter_by(project_id=project_id).delete()
+
+    parse_seconds = write_seconds = 0.0
+    all_timestamps, all_demand = [], []
+    chunks = read_chunks(upload)
+    while True:
+        # 1. read + normalise the next chunk
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        timestamps, demand_kw = normalise_chunk(chunk)
+        parse_seconds += time.perf_counter() - started
+
+        # 2. write it
+        started = time.perf_counter()
+        if len(timestamps):
+            write_rows(connection, project_id, timestamps, demand_kw)
+        write_seconds += time.perf_counter() - started
+
+        all_timestamps.append(timestamps.values)
+        all_demand.append(demand_kw)
+
+    written = sum(len(values) for values in all_demand)
+    if not written:
+        raise ValueError("The file has no data rows")
+
+    # 3. the packed copy every reader loads (services/energy_series.py)
+    started = time.perf_counter()
+    save_series(project_id, np.concatenate(all_timestamps), np.concatenate(all_demand))
+    metrics.record([("ingest.parse", parse_seconds), ("ingest.write", write_seconds),
+                    ("ingest.pack", time.perf_counter() - started)])
+    return written
@@ -0,0 +1,187 @@
+# services/energy_series.py
+"""
+Packed per-project demand series.
+
+EnergyData keeps one ORM row per interval. EnergySeries keeps one row per
+project and calendar year with the demand values packed as float32, so a year
+loads as a single row and decodes straight into a NumPy array.
+
+EnergyData stays the source of truth: series rows are written alongside it (and
+backfilled for older data by migration 4c2d9e7a1b05 or `flask pack-energy-series`),
+replaced when new data is written and dropped when the data is deleted. Reads never
+write: a project without a packed series is read from EnergyData directly.
+
+Only uploaded meter data is stored this way. A project that uses a library profile
+keeps just (profile_id, profile_scaler) and its demand is derived on read, so every
+consumer should load demand through load_project_series(project).
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+
+from models import db, EnergyData, EnergySeries
+
+SERIES_DTYPE = '<f4'
+OFFSETS_DTYPE = '<i4'
+
+
+def pack_series(timestamps, values):
+    """
+    Packs sorted datetime64[ns] timestamps and float values as {"start", "step_seconds",
+    "count", "dtype", "values", "offsets"}: float32 values, and int32 second offsets from
+    start only when the timestamps are irregular.
+    """
+    start = timestamps[0]
+    seconds = ((timestamps - start) // np.timedelta64(1, 's')).astype(np.int64)
+    steps = np.diff(seconds)
+
+    step_seconds, offsets = None, None
+    if len(steps) and steps[0] > 0 and (steps == steps[0]).all():
+        step_seconds = int(steps[0])
+    else:
+        offsets = seconds.astype(OFFSETS_DTYPE).tobytes()
+
+    return {
+        "start": pd.Timestamp(start).to_pydatetime(),
+        "step_seconds": step_seconds,
+        "count": len(values),
+        "dtype": SERIES_DTYPE,
+        "values": np.asarray(values, dtype=SERIES_DTYPE).tobytes(),
+        "offsets": offsets,
+    }
+
+
+def unpack_series(start, step_seconds, count, dtype, values, offsets):
+    """Returns (datetime64[ns] timestamps, float64 values) for pack_series fields."""
+    values = np.frombuffer(values, dtype=dtype or SERIES_DTYPE).astype(np.float64)
+    if step_seconds:
+        seconds = np.arange(count, dtype=np.int64) * step_seconds
+    else:
+        seconds = np.frombuffer(offsets, dtype=OFFSETS_DTYPE).astype(np.int64)
+    timestamps = np.datetime64(start, 'ns') + seconds.astype('timedelta64[s]')
+    return timestamps, values
+
+
+def _pack_year(project_id, year, timestamps, values):
+    """Builds one EnergySeries row from sorted datetime64[ns] timestamps and float values."""
+    return EnergySeries(project_id=project_id, year=int(year), **pack_series(timestamps, values))
+
+
+def _unpack(series):
+    """Returns (datetime64[ns] timestamps, float64 values) for one EnergySeries row."""
+    return unpack_series(series.start, series.step_seconds, series.count, series.dtype,
+                         series.values, series.offsets)
+
+
+def save_series(project_id, timestamps, values, rebuild=False):
+    """
+    Replaces a project's packed series with the given data.
+    The caller owns the transaction (add rows, then commit alongside EnergyData).
+    rebuild=True marks a repack of unchanged EnergyData, which leaves stored results valid.
+    Returns (DatetimeIndex, float64 values) exactly as a later load would see them.
+    """
+    invalidate_series(project_id)
+
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is not None:
+        index = index.tz_localize(None)  # EnergyData stores naive wall-clock timestamps
+    values = np.asarray(values, dtype=np.float64)
+
+    order = np.argsort(index.values, kind='stable')
+    timestamps = index.values[order]
+    values = values[order]
+    if not len(values):
+        return pd.DatetimeIndex([]), values
+
+    years = pd.DatetimeIndex(timestamps).year.to_numpy()
+    for year in np.unique(years):
+        mask = years == year
+        series = _pack_year(project_id, year, timestamps[mask], values[mask])
+        series.is_rebuild = rebuild  # read by the result store's after_insert event
+        db.session.add(series)
+
+    return pd.DatetimeIndex(timestamps), values.astype(SERIES_DTYPE).astype(np.float64)
+
+
+def invalidate_series(project_id):
+    """
+    Drops the packed series (until the caller saves a new one). Rows are deleted through
+    the ORM (ids only) so the result store's after_delete event sees them.
+    """
+    for series in EnergySeries.query.options(load_only(EnergySeries.id, EnergySeries.project_id)) \
+            .filter_by(project_id=project_id):
+        db.session.delete(series)
+    db.session.flush()  # before any replacement rows: the unit of work inserts ahead of deletes
+
+
+def _energy_data_arrays(project_id):
+    """(datetime64[ns] timestamps, float64 values) of the project's EnergyData rows (column query, no ORM objects)."""
+    rows = db.session.execute(
+        select(EnergyData.timestamp, EnergyData.demand_kw)
+        .where(EnergyData.project_id == project_id, EnergyData.timestamp.isnot(None))
+        .order_by(EnergyData.timestamp)
+    ).all()
+    if not rows:
+        return np.array([], dtype='datetime64[ns]'), np.array([], dtype=np.float64)
+    timestamps, values = zip(*rows)
+    return np.array(timestamps, dtype='datetime64[ns]'), np.array(values, dtype=np.float64)
+
+
+def rebuild_series(project_id):
+    """
+    Packs the project's EnergyData rows into its series, in the caller's transaction.
+    Used by `flask pack-energy-series`; the caller commits.
+    """
+    timestamps, values = _energy_data_arrays(project_id)
+    return save_series(project_id, timestamps, values, rebuild=True)
+
+
+def unpacked_project_ids():
+    """Ids of projects that have EnergyData rows but no packed series."""
+    return db.session.execute(
+        select(EnergyData.project_id).distinct()
+        .where(EnergyData.project_id.isnot(None),
+               EnergyData.project_id.not_in(select(EnergySeries.project_id)))
+        .order_by(EnergyData.project_id)
+    ).scalars().all()
+
+
+def load_demand_series(project_id):
+    """
+    Returns (DatetimeIndex, float64 demand_kw array) for a project, sorted by time.
+    Both are empty when the project has no energy data.
+    """
+    series = (EnergySeries.query
+              .filter_by(project_id=project_id)
+              .order_by(EnergySeries.year)
+              .all())
+    if not series:
+        # Not packed yet: read EnergyData as is (rounded like a packed series), without writing
+        timestamps, values = _energy_data_arrays(project_id)
+        return pd.DatetimeIndex(timestamps), values.astype(SERIES_DTYPE).astype(np.float64)
+
+    parts = [_unpack(s) for s in series]
+    timestamps = np.concatenate([p[0] for p in parts])
+    values = np.concatenate([p[1] for p in parts])
+    return pd.DatetimeIndex(timestamps), values
+
+
+def load_project_series(project):
+    """
+    The demand of a project, as (DatetimeIndex, float64 demand_kw array) sorted by time:
+    its uploaded energy data if it has any, otherwise its load profile x profile_scaler.
+    Both are empty when the project has neither.
+    """
+    timestamps, values = load_demand_series(project.id)
+    if len(timestamps) or not project.profile_id:
+        return timestamps, values
+
+    from .profile_library import profile_arrays
+    profile = project.load_profile
+    if profile is None:
+        return timestamps, values
+    timestamps, values = profile_arrays(profile)
+    # Rounded through float32 like a stored series, so it matches what a materialized copy returned
+    values = (values * (project.profile_scaler or 1.0)).astype(SERIES_DTYPE).astype(np.float64)
+    return timestamps, values
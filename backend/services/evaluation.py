@@ -0,0 +1,82 @@
+# services/evaluation.py
+"""
+Simulate-and-bill in one call: runs simulate_system_inner and run_quick_financials
+in-process on the same result (including the DatetimeIndex, so nothing is
+re-parsed) and returns the KPIs with a chart view of the traces (the same
+services/timeseries.shape_series view /simulate returns) instead of the full 30-minute
+traces, optionally with the risk distributions of services/sensitivity.py.
+"""
+from models import Projects
+from .financial_calcs import run_quick_financials
+from .generation_profiles import DEFAULT_GENERATION_PROFILE
+from .sensitivity import OPTIONS as SENSITIVITY_OPTIONS, run_sensitivity
+from .simulation_engine import simulate_system_inner
+from .timeseries import check_view_options, shape_series
+
+SERIES_KEYS = ("demand", "generation", "potential_generation", "import_from_grid",
+               "export_to_grid", "battery_soc", "generator_kw")
+SIMULATION_SUMMARY_KEYS = ("panel_kw", "inverter_kva", "battery_kwh", "annual_metrics",
+                           "diesel_liters_total", "diesel_cost_total", "energy_shortfall_total_kwh",
+                           "generator_energy_total_kwh", "generator_runtime_hours", "generator_config")
+
+
+def evaluate_design(project_id, system, use_pvgis=False, profile_name=DEFAULT_GENERATION_PROFILE,
+                    escalation_schedule=None, system_cost=None, resolution='1d', sensitivity=None,
+                    series=None, window=None, max_points=None):
+    """
+    `system` holds the /simulate parameters (panel_kw, inverter_kva, battery_kwh, system_type,
+    allow_export, tilt, azimuth, battery_soc_limit, generator), already normalized to numbers.
+    `resolution`, `series` (default SERIES_KEYS), `window` and `max_points` shape "series"
+    as in services/timeseries.shape_series.
+    `sensitivity` (True or a dict of SENSITIVITY_OPTIONS) adds a "sensitivity" entry.
+    Returns {"simulation", "financials", "series"} or {"error": ...}.
+    """
+    project = Projects.query.get(project_id)
+    if not project:
+        return {"error": "Project not found"}
+
+    try:
+        check_view_options(series, resolution, max_points)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    if system_cost is None:
+        system_cost = project.project_value_excl_vat
+    if system_cost is None:
+        return {"error": "A system cost is required: set the project value or pass system_cost"}
+
+    sim_result = simulate_system_inner(
+        project_id, system["panel_kw"], system["battery_kwh"], system["system_type"],
+        system["inverter_kva"], system["allow_export"], system["tilt"], system["azimuth"],
+        use_pvgis, profile_name=profile_name,
+        battery_soc_limit=system["battery_soc_limit"],
+        generator_config=system["generator"],
+        include_index=True,
+    )
+    if "error" in sim_result:
+        return sim_result
+
+    financials = run_quick_financials(sim_result, float(system_cost), project,
+                                      escalation_schedule=escalation_schedule)
+    if "error" in financials:
+        return financials
+
+    try:
+        view = shape_series(sim_result, sim_result["index"], series=series or list(SERIES_KEYS),
+                            resolution=resolution, window=window, max_points=max_points)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    result = {
+        "simulation": {key: sim_result[key] for key in SIMULATION_SUMMARY_KEYS},
+        "financials": financials,
+        "series": view,
+    }
+    if sensitivity:
+        options = {key: sensitivity[key] for key in SENSITIVITY_OPTIONS
+                   if isinstance(sensitivity, dict) and key in sensitivity}
+        risk = run_sensitivity(financials, float(system_cost), escalation_schedule=escalation_schedule, **options)
+        if "error" in risk:
+            return risk
+        result["sensitivity"] = risk
+    return result
@@ -0,0 +1,197 @@
+# services/executor.py
+"""
+Process-pool execution of CPU-bound simulation work from the web process.
+
+The web process runs on eventlet green threads, so a simulation computed in the request
+stalls every other request on the worker, socket traffic included. This module hands
+the work to a ProcessPoolExecutor (SIMULATION_WORKERS processes, spawned on first use)
+and waits for it cooperatively: from a green thread the blocking future.result() runs
+in eventlet's OS thread pool (eventlet.tpool), so the hub keeps serving while the
+workers compute.
+
+  call_with_app(fn, *args)            one call in a worker with an app/database context
+  SharedArrays(name=array, ...)       places arrays in multiprocessing.shared_memory once
+  map_shared(fn, shared, items, ...)  fn(arrays, item, ...) per item, fanned out across workers
+
+SIMULATION_WORKERS=0 runs everything inline. Code already running in a child process
+(e.g. a services/jobs.py worker) also runs inline instead of nesting pools.
+"""
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import metrics
+
+try:
+    import greenlet
+    from eventlet import tpool as _tpool
+except ImportError:
+    greenlet = _tpool = None
+
+SIMULATION_WORKERS = int(os.environ.get("SIMULATION_WORKERS", max(1, (os.cpu_count() or 1) - 1)))
+ATTACHED_LIMIT = 16  # shared-memory blocks a worker keeps mapped between tasks
+
+_pool = {"executor": None}
+_worker_app = None
+_attached = OrderedDict()  # worker side: block name -> SharedMemory
+
+
+def enabled():
+    """False when work should run inline (disabled, or already inside a child process)."""
+    return SIMULATION_WORKERS > 0 and multiprocessing.parent_process() is None
+
+
+def _executor():
+    if _pool["executor"] is None:
+        from flask import current_app, has_app_context
+        database_uri = current_app.config["SQLALCHEMY_DATABASE_URI"] if has_app_context() else None
+        _pool["executor"] = ProcessPoolExecutor(
+            max_workers=SIMULATION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(database_uri,),
+        )
+    return _pool["executor"]
+
+
+def _in_green_thread():
+    return greenlet is not None and greenlet.getcurrent().parent is not None
+
+
+def _wait_all(futures):
+    """Results of `futures` in order, yielding to the eventlet hub while they run."""
+    def collect():
+        return [future.result() for future in futures]
+
+    try:
+        if _tpool is not None and _in_green_thread():
+            return _tpool.execute(collect)
+        return collect()
+    except BrokenProcessPool:
+        _pool["executor"] = None  # a worker died; start a fresh pool next time
+        raise
+
+
+def _unwrap(outputs):
+    """Records the stage timings each task collected (services/metrics.py) and returns the results."""
+    results = []
+    for result, timings in outputs:
+        metrics.record(timings)
+        results.append(result)
+    return results
+
+
+def call_with_app(fn, *args, **kwargs):
+    """fn(*args, **kwargs) in a worker process inside an app context (for code that queries the database)."""
+    if not enabled():
+        return fn(*args, **kwargs)
+    return _unwrap(_wait_all([_executor().submit(_run_with_app, fn, args, kwargs)]))[0]
+
+
+def map_shared(fn, shared, items, *args):
+    """[fn(arrays, item, *args) for item in items], one task per item, results in order."""
+    if not enabled():
+        arrays = shared.arrays
+        return [fn(arrays, item, *args) for item in items]
+    executor = _executor()
+    return _unwrap(_wait_all([executor.submit(_run_shared, fn, shared.spec, item, args) for item in items]))
+
+
+class SharedArrays:
+    """
+    Copies numpy arrays into shared-memory blocks once; workers map them read-only by name.
+    Use as a context manager (or call close()) to free the blocks.
+    """
+
+    def __init__(self, **arrays):
+        self.arrays = {}
+        self.spec = {}
+        self._blocks = []
+        if not enabled():
+            self.arrays = {name: np.asarray(array) for name, array in arrays.items()}
+            return
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+                view[...] = array
+                self.arrays[name] = view
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        self.arrays = {}
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+#  Worker processes
+# ---------------------------------------------------------------------------
+def _init_worker(database_uri):
+    """Gives each pool process its own minimal app and database engine (as services/jobs.py does)."""
+    global _worker_app
+    if database_uri is None:
+        return
+    from flask import Flask
+    from models import db
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    _worker_app = app
+
+
+def _run_with_app(fn, args, kwargs):
+    with metrics.collect() as timings:
+        if _worker_app is None:
+            result = fn(*args, **kwargs)
+        else:
+            with _worker_app.app_context():
+                result = fn(*args, **kwargs)
+    return result, timings
+
+
+def _attach(spec):
+    """Read-only views of the parent's shared arrays, keeping recent blocks mapped."""
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = _attached.get(block_name)
+        if block is None:
+            block = shared_memory.SharedMemory(name=block_name)
+            _attached[block_name] = block
+        _attached.move_to_end(block_name)
+        view = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        view.flags.writeable = False
+        arrays[name] = view
+
+    while len(_attached) > ATTACHED_LIMIT:
+        _, block = _attached.popitem(last=False)
+        try:
+            block.close()
+        except BufferError:
+            pass  # still viewed; unmapped when the process exits
+    return arrays
+
+
+def _run_shared(fn, spec, item, args):
+    with metrics.collect() as timings:
+        result = fn(_attach(spec), item, *args)
+    return result, timings
@@ -5,7 +5,13 @@ import logging
 from datetime import datetime
 from calendar import monthrange
 from .tariff_engine import TariffEngine
+from .billing import compute_monthly_bills, sim_index
+from .metrics import stage
 from decimal import Decimal
+import numpy as np
+
+DEFAULT_ESCALATION = 0.12  # yearly tariff escalation when no schedule is given
+DEGRADATION_RATE = 0.005   # yearly PV degradation
 
 def _serialize_tariff_for_engine(tariff: Tariffs) -> dict:
     if not tariff:
@@ -23,6 +29,22 @@ def _serialize_tariff_for_engine(tariff: Tariffs) -> dict:
         ]
     }
 
+def project_tariff_data(project) -> dict:
+    """Tariff data for TariffEngine from the project's custom flat rate or linked tariff ({} if neither)."""
+    if project.custom_flat_rate is not None:
+        return {
+            'name': 'Custom Flat Rate',
+            'rates': [{
+                'charge_category': 'energy', 'rate_value': str(project.custom_flat_rate * 100),
+                'rate_unit': 'c/kWh', 'season': 'all', 'time_of_use': 'all'
+            }]
+        }
+    if project.tariff_id is not None:
+        tariff_obj = db.session.get(Tariffs, project.tariff_id)
+        if tariff_obj:
+            return _serialize_tariff_for_engine(tariff_obj)
+    return {}
+
 # def calculate_financial_model(project, sim_response, eskom_tariff, export_enabled, feed_in_tariff):
 #     try:
 #         demand = sim_response["demand"]
@@ -87,6 +109,7 @@ def _serialize_tariff_for_engine(tariff: Tariffs) -> dict:
 #     except Exception as e:
 #         return {"error": str(e)}
 
+@stage("financials")
 def run_quick_financials(sim_response: dict, system_cost: float, project: 'Projects', escalation_schedule=None) -> dict:
     try:
         # Check if this is an off-grid system with generator
@@ -101,25 +124,11 @@ def run_quick_financials(sim_response: dict, system_cost: float, project: 'Proje
         )
         
         # 1 Initialize the tariff engine 
-        tariff_data = {}
         engine = None
         
         # For both grid-tied and off-grid systems, we need tariff data
         # Off-grid systems use it to calculate what they would have paid on grid
-        if project.custom_flat_rate is not None:
-            tariff_data = {
-                'name': 'Custom Flat Rate',
-                'rates': [{
-                    'charge_category': 'energy', 'rate_value': str(project.custom_flat_rate * 100),
-                    'rate_unit': 'c/kWh', 'season': 'all', 'time_of_use': 'all'
-                }]
-            }
-        elif project.tariff_id is not None:
-            # Load the tariff from the database
-            from sqlalchemy.orm import sessionmaker
-            tariff_obj = db.session.get(Tariffs, project.tariff_id)
-            if tariff_obj:
-                tariff_data = _serialize_tariff_for_engine(tariff_obj)
+        tariff_data = project_tariff_data(project)
 
         # For grid-tied systems, tariff is required. For off-grid, it will be handled in the off-grid section
         if not is_offgrid_with_generator and not is_offgrid_without_generator:
@@ -128,237 +137,39 @@ def run_quick_financials(sim_response: dict, system_cost: float, project: 'Proje
             
             engine = TariffEngine(tariff_data)
 
-        # 2 Prepare for loop
+        # 2 Prepare inputs
         imports = sim_response["import_from_grid"]
         demand = sim_response["demand"]
         generation = sim_response["generation"]
         potential_generation = sim_response["potential_generation"]
         panel_kw = sim_response.get("panel_kw", 1)
-        timestamps = [datetime.fromisoformat(ts) for ts in sim_response["timestamps"]]
-
-        # Generator data (for off-grid systems)
-        generator_kw = sim_response.get("generator_kw", [])
-        generator_config = sim_response.get("generator_config", {})
+        index = sim_index(sim_response)
 
         # Use passed escalation schedule or fallback to hardcoded
         if escalation_schedule and isinstance(escalation_schedule, list):
             escalation_rates = [Decimal(str(r)) for r in escalation_schedule]
         else:
-            escalation_rates = [Decimal('0.12')] * 20  # Default to 12% for 20 years
+            escalation_rates = [Decimal(str(DEFAULT_ESCALATION))] * 20  # Default to 12% for 20 years
 
         time_interval_hours = Decimal('0.5')
-        degradation_rate = Decimal('0.005')
+        degradation_rate = Decimal(str(DEGRADATION_RATE))
 
-        # Dictionaries to store monthly aggregated data
-        monthly_costs = {}
-        monthly_max_demand = {}
-        tariff_sample = []
-
-        if is_offgrid_with_generator:
-            # Off-grid generator financial modeling
-            # Calculate what they would have paid on the grid (using their tariff) 
-            # vs what they pay now with generator only (no grid costs)
-            # This models customers moving FROM grid TO off-grid
-            
-            # Verify we have tariff data for off-grid calculations
+        # 3 Monthly bills (vectorized over the year, Decimal per month)
+        if is_offgrid_with_generator or is_offgrid_without_generator:
+            # Off-grid: what they would have paid on the grid (using their tariff)
+            # vs the generator running cost, or nothing without a generator
             if not tariff_data.get('rates'):
                 return {"error": "Off-grid financial modeling requires tariff information to calculate grid savings"}
-            
-            # Initialize tariff engine for grid cost calculations
             engine = TariffEngine(tariff_data)
-            
-            # Get generator configuration
-            from .simulation_engine import get_fuel_consumption
-            gen_size_kw = generator_config.get('kva', 0)
-            diesel_price_r_per_liter = generator_config.get('diesel_price_r_per_liter', 23.50)
-            service_cost = Decimal(str(generator_config.get('service_cost', 1000)))
-            service_interval = Decimal(str(generator_config.get('service_interval_hours', 1000)))
-            
-            # Calculate what they would pay on grid vs what they pay with generator
-            for i, ts in enumerate(timestamps):
-                month_key = ts.strftime('%Y-%m')
-                
-                if month_key not in monthly_costs:
-                    monthly_costs[month_key] = {
-                        'old_energy_cost': Decimal(0),  # Grid energy cost
-                        'new_energy_cost': Decimal(0),  # Generator cost
-                        'old_demand_cost': Decimal(0), # Grid demand cost
-                        'new_demand_cost': Decimal(0), # No demand cost for off-grid
-                        'old_fixed_cost': Decimal(0),  # Grid fixed cost
-                        'new_fixed_cost': Decimal(0),  # No fixed cost for off-grid
-                        'total_old_bill': Decimal(0),  # Total grid bill
-                        'total_new_bill': Decimal(0)   # Total generator cost
-                    }
-                if month_key not in monthly_max_demand:
-                    monthly_max_demand[month_key] = {'old': Decimal(0), 'new': Decimal(0)}
-                
-                # OLD BILL: What they would have paid on the grid
-                demand_kw = Decimal(str(demand[i]))
-                
-                # Energy cost using tariff
-                energy_rate_r_kwh = engine.get_energy_rate_r_per_kwh(ts)
-                energy_kwh = demand_kw * time_interval_hours
-                energy_cost = energy_rate_r_kwh * energy_kwh
-                monthly_costs[month_key]['old_energy_cost'] += energy_cost
-                
-                # Track max demand for demand charges
-                demand_rate_r_kva = engine.get_demand_rate_r_per_kva_per_month(ts)
-                if demand_rate_r_kva > 0:
-                    monthly_max_demand[month_key]['old'] = max(monthly_max_demand[month_key]['old'], demand_kw)
-                
-                # NEW BILL: Only generator costs (no grid costs)
-                if i < len(generator_kw) and generator_kw[i] > 0 and gen_size_kw > 0:
-                    gen_output_kw = generator_kw[i]
-                    load_factor = gen_output_kw / gen_size_kw
-                    fuel_consumption_lph = get_fuel_consumption(gen_size_kw, load_factor)
-                    
-                    fuel_cost_this_interval = Decimal(str(fuel_consumption_lph)) * time_interval_hours * Decimal(str(diesel_price_r_per_liter))
-                    service_cost_this_interval = (time_interval_hours / service_interval) * service_cost
-                    total_gen_cost = fuel_cost_this_interval + service_cost_this_interval
-                    
-                    monthly_costs[month_key]['new_energy_cost'] += total_gen_cost
-                    monthly_costs[month_key]['total_new_bill'] += total_gen_cost
-            
-            # Calculate fixed and demand charges for old bill (grid)
-            daily_fixed_rate = engine.get_fixed_rate_r_per_day()
-            
-            for month_key, values in monthly_costs.items():
-                year, month = int(month_key.split('-')[0]), int(month_key.split('-')[1])
-                days_in_month = monthrange(year, month)[1]
-                
-                # Grid fixed costs (old bill only)
-                monthly_fixed_cost = Decimal(days_in_month) * daily_fixed_rate
-                values['old_fixed_cost'] = monthly_fixed_cost
-                
-                # Grid demand charges (old bill only)
-                if monthly_max_demand[month_key]['old'] > 0:
-                    # Use first day of month to determine season for demand charge
-                    month_start = datetime(year, month, 1)
-                    demand_rate = engine.get_demand_rate_r_per_kva_per_month(month_start)
-                    demand_cost = demand_rate * monthly_max_demand[month_key]['old']
-                    values['old_demand_cost'] = demand_cost
-                
-                # Calculate total old bill (grid costs)
-                values['total_old_bill'] = values['old_energy_cost'] + values['old_fixed_cost'] + values['old_demand_cost']
-
-        elif is_offgrid_without_generator:
-            # Off-Grid without generator
-            # 
-            # # setup monthly costs with all zeros for billing components
-
-            if not tariff_data.get('rates'):
-                return {"error": "Off-grid financial modeling requires tariff information to calculate grid savings"}
-            
-            engine = TariffEngine(tariff_data)
-            
-            for i, ts in enumerate(timestamps):
-                month_key = ts.strftime('%Y-%m')
-
-                if month_key not in monthly_costs:
-                    monthly_costs[month_key] = {
-                        'old_energy_cost': Decimal(0), 
-                        'new_energy_cost': Decimal(0),
-                        'old_demand_cost': Decimal(0),
-                        'new_demand_cost': Decimal(0),
-                        'old_fixed_cost': Decimal(0),
-                        'new_fixed_cost': Decimal(0),
-                        'total_old_bill': Decimal(0),
-                        'total_new_bill': Decimal(0)
-                    }
-                
-                if month_key not in monthly_max_demand:
-                    monthly_max_demand[month_key] = {'old': Decimal(0), 'new': Decimal(0)}
-
-                # OLD energy = demand_kwh * energy_rate
-                demand_kw = Decimal(str(demand[i]))
-                energy_rate_r_kwh = engine.get_energy_rate_r_per_kwh(ts)
-                monthly_costs[month_key]['old_energy_cost'] += demand_kw * time_interval_hours * energy_rate_r_kwh
-
-                # Track OLD monthly max demand for demand charges
-                monthly_max_demand[month_key]['old'] = max(monthly_max_demand[month_key]['old'], demand_kw)
-
-                # Populate a small tariff sample for the first week (366 half-hours)
-                if i < 366:
-                    tariff_sample.append({
-                        'timestamp': ts.isoformat(),
-                        'rate': float(round(energy_rate_r_kwh, 4))
-                    })
-
-            # 2. Month end: add old Fixed + old demand charges
-            daily_fixed_rate = engine.get_fixed_rate_r_per_day()
-            for month_key, values in monthly_costs.items():
-                year, month = map(int, month_key.split('-'))
-                days_in_month = monthrange(year, month)[1]
-
-                # Fixed charge (old)
-                values['old_fixed_cost'] = Decimal(days_in_month) * daily_fixed_rate
-
-                # Demand charge (old) — use first day of month to determine season
-                month_start = datetime(year, month, 1)
-                demand_rate = engine.get_demand_rate_r_per_kva_per_month(month_start)
-                values['old_demand_cost'] = demand_rate * monthly_max_demand[month_key]['old']
-
-                # Totals: old bill is grid costs; new bill is zero (no grid, no diesel)
-                values['total_old_bill'] = values['old_energy_cost'] + values['old_fixed_cost'] + values['old_demand_cost']
-                values['total_new_bill'] = Decimal('0')  
-        
+            mode = 'offgrid_generator' if is_offgrid_with_generator else 'offgrid'
         else:
-            # 3B) Grid-tied system: Calculate tariff costs
+            # Grid-tied system: tariff costs on demand vs imports
             if not engine:
                 return {"error": "No tariff engine available for grid-tied system calculations."}
-                
-            for i, ts in enumerate(timestamps):
-                month_key = ts.strftime('%Y-%m')
-
-                if month_key not in monthly_costs:
-                    monthly_costs[month_key] = {
-                        'old_energy_cost': Decimal(0), 'new_energy_cost': Decimal(0),
-                        'old_demand_cost': Decimal(0), 'new_demand_cost': Decimal(0),
-                        'old_fixed_cost': Decimal(0), 'new_fixed_cost': Decimal(0),
-                        'total_old_bill': Decimal(0), 'total_new_bill': Decimal(0)
-                    }
-                if month_key not in monthly_max_demand:
-                    monthly_max_demand[month_key] = {'old': Decimal(0), 'new': Decimal(0)}
-
-                # Get the correct energy rate for the timestamp (ts)
-                energy_rate_r_kwh = engine.get_energy_rate_r_per_kwh(ts)
-
-                ## TESTING -> Populate the tariff sample for the first week (366 half-hours)
-                if i < 366:
-                    tariff_sample.append({'timestamp': ts.isoformat(), 'rate': float(round(energy_rate_r_kwh, 4))})
+            mode = 'grid'
 
-                # Calculate energy costs for this interval
-                monthly_costs[month_key]['old_energy_cost'] += Decimal(demand[i]) * (time_interval_hours) * energy_rate_r_kwh
-                monthly_costs[month_key]['new_energy_cost'] += Decimal(imports[i]) * (time_interval_hours) * energy_rate_r_kwh
-
-                # Check if a demand charge applies in this ts and update the monthly max demand
-                demand_rate_r_kva = engine.get_demand_rate_r_per_kva_per_month(ts)
-                if demand_rate_r_kva > 0:
-                    monthly_max_demand[month_key]['old'] = max(monthly_max_demand[month_key]['old'], Decimal(demand[i]))
-                    monthly_max_demand[month_key]['new'] = max(monthly_max_demand[month_key]['new'], Decimal(imports[i]))
-
-            # 4 Calculate monthly fixed and demand charges (only for grid-tied)
-            daily_fixed_rate = engine.get_fixed_rate_r_per_day()
-
-            for month_key, values in monthly_costs.items():
-                year, month = int(month_key.split('-')[0]), int(month_key.split('-')[1])
-                days_in_month = monthrange(year, month)[1]
-
-                # Calculate fixed costs for the month
-                monthly_fixed_cost = Decimal(days_in_month) * daily_fixed_rate
-                values['old_fixed_cost'] = monthly_fixed_cost
-                values['new_fixed_cost'] = monthly_fixed_cost
-
-                # Calculate demand costs for the month
-                demand_ts = datetime(year, month, 15, 18, 30)
-                demand_rate = engine.get_demand_rate_r_per_kva_per_month(demand_ts)
-
-                values['old_demand_cost'] = monthly_max_demand[month_key]['old'] * demand_rate
-                values['new_demand_cost'] = monthly_max_demand[month_key]['new'] * demand_rate
-
-                # Calculate total monthly bills
-                values['total_old_bill'] = values['old_energy_cost'] + values['old_demand_cost'] + values['old_fixed_cost']
-                values['total_new_bill'] = values['new_energy_cost'] + values['new_demand_cost'] + values['new_fixed_cost']
+        with stage("financials.bills"):
+            monthly_costs, tariff_sample = compute_monthly_bills(mode, engine, sim_response)
 
         # 5 Calculate annual savings and ROI
         original_annual_cost = sum(v['total_old_bill'] for v in monthly_costs.values())
@@ -386,10 +197,7 @@ def run_quick_financials(sim_response: dict, system_cost: float, project: 'Proje
         self_consumption_rate = (pv_used_on_site_kwh / potential_generation_kwh) * 100 if total_generation_kwh > 0 else 0
         grid_independence_rate = (pv_used_on_site_kwh / total_demand_kwh) * 100 if total_demand_kwh > 0 else 0
 
-        daytime_indices = [
-            i for i, ts in enumerate(sim_response['timestamps'])
-            if 7 <= datetime.fromisoformat(ts).hour < 18
-        ]
+        daytime_indices = np.flatnonzero((index.hour >= 7) & (index.hour < 18))
         daytime_demand_kwh = sum(demand[i] * float(time_interval_hours) for i in daytime_indices)
         daytime_consumption_pct = (daytime_demand_kwh / total_demand_kwh) * 100 if total_demand_kwh > 0 else 0
 
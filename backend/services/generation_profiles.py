@@ -0,0 +1,206 @@
+# services/generation_profiles.py
+"""
+Generation profile registry.
+
+A generation profile is a year of 30-minute output as % of panel kWp. Each profile is
+stored once on disk as a float32 .npy (17,520 values, ~70 KB) plus a .json sidecar with
+its metadata, and is memory-mapped read-only on first use, so every worker process
+shares the same page-cache copy instead of parsing a CSV at import time.
+
+The built-in profiles are compiled from utils/generation_profile.csv the first time
+they are needed (and again whenever the CSV is newer than the store). New profiles,
+such as the pvlib profiles the PVGIS simulation produces, are added with add_profile()
+and are visible to every process without a restart. Profiles are looked up by key
+("midrand_ew_5") or by label ("Midrand Azth:east-west Tilt:5"). Requests that name no
+profile use DEFAULT_GENERATION_PROFILE.
+"""
+import glob
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+GENERATION_PROFILE_DIR = os.environ.get(
+    'GENERATION_PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'generation_profiles')
+)
+GENERATION_PROFILE_CSV = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils', 'generation_profile.csv'
+)
+TIME_INTERVAL_HOURS = 0.5
+
+# Metadata for the columns of utils/generation_profile.csv (labels as shown on the design screen)
+BUILTIN_PROFILES = {
+    "hopetown_14_15": {"label": "Hopetown Azth:14 Tilt:15", "location": "Hopetown",
+                       "azimuth": 14, "tilt": 15, "source": "measured"},
+    "midrand_ew_5": {"label": "Midrand Azth:east-west Tilt:5", "location": "Midrand",
+                     "azimuth": "east-west", "tilt": 5, "source": "measured"},
+    "pvlib_hopetown_0_15": {"label": "Pvlib Hopetown Azth:0 Tilt:15", "location": "Hopetown",
+                            "azimuth": 0, "tilt": 15, "source": "pvlib"},
+    "pvlib_hopetown_0_15_0.9": {"label": "Pvlib Hopetown (x0.9) Azth:0 Tilt:15", "location": "Hopetown",
+                                "azimuth": 0, "tilt": 15, "source": "pvlib", "derate": 0.9},
+}
+DEFAULT_GENERATION_PROFILE = "midrand_ew_5"  # simulate, evaluate, batch, optimize and jobs alike
+
+_KEY_PATTERN = re.compile(r"[^A-Za-z0-9_.-]+")
+_lock = threading.Lock()
+_mapped = {}              # key -> (mtime_ns, read-only memmap)
+_labels = {"mtime": None, "keys": {}}  # label -> key, rebuilt when the store directory changes
+_builtins_checked = False
+
+
+def profile_key(name):
+    """A filesystem-safe registry key for a free-form profile name."""
+    key = re.sub(r"\.{2,}", "_", _KEY_PATTERN.sub("_", str(name).strip())).strip("._")
+    if not key:
+        raise ValueError("Profile name must contain letters or digits")
+    return key
+
+
+def _paths(key):
+    return (os.path.join(GENERATION_PROFILE_DIR, f"{key}.npy"),
+            os.path.join(GENERATION_PROFILE_DIR, f"{key}.json"))
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+def _store(key, percentages, metadata):
+    values = np.ascontiguousarray(percentages, dtype=np.float32)
+    if values.ndim != 1 or not len(values):
+        raise ValueError("A generation profile must be a non-empty 1-D series")
+    if not np.isfinite(values).all():
+        raise ValueError("A generation profile must not contain NaN or infinite values")
+
+    metadata = {
+        **metadata,
+        "key": key,
+        "label": metadata.get("label") or key,
+        "intervals": int(len(values)),
+        "specific_yield_kwh_per_kwp": round(float(values.sum(dtype=np.float64)) / 100 * TIME_INTERVAL_HOURS, 1),
+        "peak_pct": round(float(values.max()), 2),
+    }
+    npy_path, json_path = _paths(key)
+    os.makedirs(GENERATION_PROFILE_DIR, exist_ok=True)
+    _write_atomic(npy_path, lambda fh: np.save(fh, values))
+    _write_atomic(json_path, lambda fh: fh.write(json.dumps(metadata, indent=2).encode()))
+    return metadata
+
+
+def compile_builtin_profiles(csv_path=GENERATION_PROFILE_CSV):
+    """Compiles every column of the generation profile CSV into the store. Returns the keys written."""
+    import pandas as pd
+    frame = pd.read_csv(csv_path)
+    for column in frame.columns:
+        _store(profile_key(column), frame[column].to_numpy(dtype=float), BUILTIN_PROFILES.get(column, {}))
+    return [profile_key(column) for column in frame.columns]
+
+
+def _ensure_builtins():
+    """Compiles the CSV once per process if the store is missing a built-in profile or is stale."""
+    global _builtins_checked
+    if _builtins_checked:
+        return
+    with _lock:
+        if _builtins_checked:
+            return
+        if os.path.exists(GENERATION_PROFILE_CSV):
+            csv_mtime = os.stat(GENERATION_PROFILE_CSV).st_mtime_ns
+            stale = any(
+                not os.path.exists(path) or os.stat(path).st_mtime_ns < csv_mtime
+                for key in BUILTIN_PROFILES for path in _paths(key)
+            )
+            if stale:
+                compile_builtin_profiles()
+        _builtins_checked = True
+
+
+def list_profiles():
+    """Metadata of every stored profile, sorted by key."""
+    _ensure_builtins()
+    profiles = []
+    for json_path in sorted(glob.glob(os.path.join(GENERATION_PROFILE_DIR, "*.json"))):
+        with open(json_path) as fh:
+            profiles.append(json.load(fh))
+    return profiles
+
+
+def resolve(name):
+    """Registry key for a profile key or label. Raises KeyError if there is no such profile."""
+    _ensure_builtins()
+    try:
+        key = profile_key(name)
+    except ValueError:
+        raise KeyError(name)
+    if os.path.exists(_paths(key)[0]):
+        return key
+    mtime = os.stat(GENERATION_PROFILE_DIR).st_mtime_ns if os.path.isdir(GENERATION_PROFILE_DIR) else None
+    if _labels["mtime"] != mtime:
+        _labels["keys"] = {metadata.get("label"): metadata["key"] for metadata in list_profiles()}
+        _labels["mtime"] = mtime
+    if name in _labels["keys"]:
+        return _labels["keys"][name]
+    raise KeyError(name)
+
+
+def profile_metadata(name):
+    with open(_paths(resolve(name))[1]) as fh:
+        return json.load(fh)
+
+
+def get_profile(name):
+    """
+    The profile's % of kWp per interval as a read-only float32 memmap (zero-copy; shared
+    between processes through the page cache). Raises KeyError for unknown profiles.
+    """
+    key = resolve(name)
+    npy_path = _paths(key)[0]
+    mtime = os.stat(npy_path).st_mtime_ns
+    cached = _mapped.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    values = np.load(npy_path, mmap_mode="r")
+    with _lock:
+        _mapped[key] = (mtime, values)
+    return values
+
+
+def add_profile(name, percentages, **metadata):
+    """
+    Adds (or replaces) a profile at runtime and returns its metadata. `percentages` is %
+    of panel kWp per 30-minute interval; metadata such as location, latitude, longitude,
+    tilt, azimuth and source is stored alongside it.
+    """
+    key = profile_key(name)
+    with _lock:
+        _mapped.pop(key, None)
+    return _store(key, percentages, metadata)
+
+
+def has_profile(name):
+    try:
+        resolve(name)
+        return True
+    except KeyError:
+        return False
+
+
+if __name__ == '__main__':
+    import time
+
+    started = time.perf_counter()
+    keys = compile_builtin_profiles()
+    print(f"Compiled {len(keys)} profiles into {GENERATION_PROFILE_DIR} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for metadata in list_profiles():
+        print(f"  {metadata['key']:<26} {metadata['label']:<38} {metadata['specific_yield_kwh_per_kwp']:>7.1f} kWh/kWp")
+
+    started = time.perf_counter()
+    for metadata in list_profiles():
+        get_profile(metadata["key"])
+    print(f"Mapped every profile in {(time.perf_counter() - started) * 1000:.2f} ms")
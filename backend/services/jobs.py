@@ -0,0 +1,281 @@
+# services/jobs.py
+"""
+Background jobs for optimizations and PVGIS simulations that are too slow for a request.
+
+The optimization_runs table is the queue: submit_job() inserts a 'queued' row, and a
+dispatcher green thread in each web process (started with the server, see app.py)
+claims rows and runs them in a local process pool (JOB_WORKERS processes). Workers
+write progress, status, result and timings back to the row; the dispatcher relays them
+to the project's socket room ("project:<id>") as "job:progress" and "job:finished" events.
+
+A row is claimed with a conditional UPDATE (status still 'queued'), so two processes
+never run the same job. Running rows carry a heartbeat in updated_at, bumped by every
+progress update and every HEARTBEAT_SECONDS by the dispatcher that owns the job; a
+'running' row whose heartbeat is older than STALE_AFTER belonged to a process that died,
+and is requeued. A pool that loses a worker (e.g. out of memory) is replaced: the jobs it
+was running fail, and a job it refused is put back in the queue.
+"""
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, update
+
+from models import db, OptimizationRun, Projects
+
+JOB_TYPES = ("optimize", "simulate")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 30.0
+STALE_AFTER = timedelta(minutes=5)  # 'running' rows without a heartbeat for this long are requeued
+
+_dispatcher = {"started": False}
+_worker_app = None
+
+
+def submit_job(project_id, job_type, params, system_type=None):
+    """Queues a job and returns its OptimizationRun row (committed). `params` must be JSON-serializable."""
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"job type must be one of: {', '.join(JOB_TYPES)}")
+    job = OptimizationRun(project_id=project_id, job_type=job_type, system_type=system_type,
+                          inputs_json=params, status="queued", progress=0.0, message="Queued")
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+# ---------------------------------------------------------------------------
+#  Web process: dispatcher
+# ---------------------------------------------------------------------------
+def start_dispatcher(app, socketio):
+    """Starts the dispatcher once per process; safe to call on every request."""
+    if _dispatcher["started"]:
+        return
+    _dispatcher["started"] = True
+    socketio.start_background_task(_dispatch_loop, app, socketio)
+
+
+def _claim(limit):
+    """
+    Marks up to `limit` queued jobs as running and returns them, oldest first. Each row is
+    taken with UPDATE ... WHERE status = 'queued', so a job another process claimed first
+    (rowcount 0) is skipped on every database, not only where rows can be locked.
+    """
+    query = (db.session.query(OptimizationRun.id).filter_by(status="queued")
+             .order_by(OptimizationRun.created_at, OptimizationRun.id).limit(limit))
+    if db.engine.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    candidates = [job_id for (job_id,) in query.all()]
+
+    claimed = []
+    now = datetime.utcnow()
+    for job_id in candidates:
+        taken = db.session.execute(
+            update(OptimizationRun)
+            .where(OptimizationRun.id == job_id, OptimizationRun.status == "queued")
+            .values(status="running", started_at=now, updated_at=now, message="Starting")
+            .execution_options(synchronize_session=False)
+        )
+        if taken.rowcount == 1:
+            claimed.append(job_id)
+    db.session.commit()
+    if not claimed:
+        return []
+    return (OptimizationRun.query.filter(OptimizationRun.id.in_(claimed))
+            .order_by(OptimizationRun.created_at, OptimizationRun.id).all())
+
+
+def _heartbeat(job_ids):
+    """Bumps updated_at on the running jobs this process owns."""
+    db.session.execute(
+        update(OptimizationRun)
+        .where(OptimizationRun.id.in_(job_ids), OptimizationRun.status == "running")
+        .values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _requeue_stale():
+    """Requeues 'running' jobs whose heartbeat stopped (their process died)."""
+    cutoff = datetime.utcnow() - STALE_AFTER
+    db.session.execute(
+        update(OptimizationRun)
+        .where(OptimizationRun.status == "running",
+               or_(OptimizationRun.updated_at < cutoff,
+                   and_(OptimizationRun.updated_at.is_(None), OptimizationRun.started_at < cutoff)))
+        .values(status="queued", started_at=None, updated_at=datetime.utcnow(), message="Requeued")
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _release(job_id):
+    """Puts a job this process claimed but could not start back in the queue."""
+    db.session.execute(
+        update(OptimizationRun)
+        .where(OptimizationRun.id == job_id, OptimizationRun.status == "running")
+        .values(status="queued", started_at=None, updated_at=datetime.utcnow(), message="Queued")
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _worker_pool(app):
+    return ProcessPoolExecutor(
+        max_workers=JOB_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(app.config["SQLALCHEMY_DATABASE_URI"],),
+    )
+
+
+def _dispatch_loop(app, socketio):
+    executor = _worker_pool(app)
+    running = {}        # job id -> future
+    last_progress = {}  # job id -> progress last pushed to the room
+    last_heartbeat = 0.0
+
+    while True:
+        try:
+            with app.app_context():
+                # 0 Heartbeat for our jobs; requeue jobs of processes that stopped beating
+                if time.monotonic() - last_heartbeat >= HEARTBEAT_SECONDS:
+                    last_heartbeat = time.monotonic()
+                    if running:
+                        _heartbeat(list(running))
+                    _requeue_stale()
+
+                # 1 Report progress and completions of running jobs
+                broken = False
+                if running:
+                    for job in OptimizationRun.query.filter(OptimizationRun.id.in_(list(running))).all():
+                        future = running[job.id]
+                        if future.done():
+                            error = future.exception()
+                            if isinstance(error, BrokenProcessPool):
+                                broken = True  # a worker died (e.g. out of memory); every future fails
+                            if error is not None and job.status == "running":
+                                # the worker process died before it could record the failure
+                                job.status, job.error = "failed", str(error)
+                                job.finished_at = datetime.utcnow()
+                                db.session.commit()
+                            socketio.emit("job:finished", job.to_dict(), to=f"project:{job.project_id}")
+                            del running[job.id]
+                            last_progress.pop(job.id, None)
+                        elif job.progress != last_progress.get(job.id):
+                            last_progress[job.id] = job.progress
+                            socketio.emit("job:progress", job.to_dict(), to=f"project:{job.project_id}")
+
+                # 2 Replace a pool that lost a worker: it refuses every later submit
+                if broken:
+                    app.logger.warning("job worker pool broken; starting a new one")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = _worker_pool(app)
+
+                # 3 Hand queued jobs to free workers; a job that cannot be submitted goes back to the queue
+                free = JOB_WORKERS - len(running)
+                if free > 0:
+                    for job in _claim(free):
+                        try:
+                            running[job.id] = executor.submit(_run_job, job.id)
+                        except BrokenProcessPool:
+                            app.logger.warning(f"job worker pool broken; job {job.id} requeued, starting a new pool")
+                            _release(job.id)
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            executor = _worker_pool(app)
+                            continue
+                        last_progress[job.id] = job.progress
+                        socketio.emit("job:progress", job.to_dict(), to=f"project:{job.project_id}")
+        except Exception as e:
+            app.logger.warning(f"job dispatcher error: {e}")
+        socketio.sleep(POLL_SECONDS)
+
+
+# ---------------------------------------------------------------------------
+#  Worker processes
+# ---------------------------------------------------------------------------
+def _init_worker(database_uri):
+    """Gives each pool process its own minimal app and database engine."""
+    global _worker_app
+    from flask import Flask
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    _worker_app = app
+
+
+def _report_progress(job_id, fraction, message):
+    OptimizationRun.query.filter_by(id=job_id).update(
+        {"progress": round(float(fraction), 3), "message": message[:255], "updated_at": datetime.utcnow()},
+        synchronize_session=False)
+    db.session.commit()
+
+
+def _run_optimize(job, progress):
+    from .optimizer import optimize_project
+    params = dict(job.inputs_json)
+    project = db.session.get(Projects, job.project_id)
+    result = optimize_project(project, params.pop("system_type"), progress=progress, **params)
+    if "error" not in result:
+        job.best_json = result["best"]
+    return result
+
+
+def _run_simulate(job, progress):
+    """
+    Runs the simulation through the result store (the same run /simulate would reuse) and
+    returns its KPIs with the "simulation_run" key; GET /api/jobs/<id> loads the traces from there.
+    """
+    from . import result_store
+    from .simulation_engine import simulate_system_inner
+
+    params = job.inputs_json
+    system = {key: params[key] for key in ("panel_kw", "tilt", "azimuth", "system_type", "inverter_kva",
+                                           "battery_kwh", "allow_export", "battery_soc_limit")}
+    system["generator"] = params["generator_config"]
+    project = db.session.get(Projects, job.project_id)
+    inputs = result_store.simulation_inputs(project, system, params["use_pvgis"], params["profile_name"])
+    key = result_store.input_hash("simulate", inputs)
+
+    result = result_store.load_run(key)
+    if result is None:
+        progress(0.1, "Simulating")
+        result = simulate_system_inner(job.project_id, **params, include_index=True)
+        if "error" in result:
+            return result
+        result_store.save_run(job.project_id, "simulate", key, inputs, result)
+    return {**result_store.result_kpis(result), "simulation_run": key}
+
+
+HANDLERS = {"optimize": _run_optimize, "simulate": _run_simulate}
+
+
+def _run_job(job_id):
+    """Runs one claimed job in a pool process and records the outcome on its row."""
+    with _worker_app.app_context():
+        job = db.session.get(OptimizationRun, job_id)
+        started = time.perf_counter()
+
+        def progress(fraction, message):
+            _report_progress(job_id, fraction, message)
+
+        try:
+            result = HANDLERS[job.job_type](job, progress)
+        except Exception as e:
+            traceback.print_exc()
+            result = {"error": str(e)}
+
+        job = db.session.get(OptimizationRun, job_id)
+        job.finished_at = job.updated_at = datetime.utcnow()
+        if "error" in result:
+            job.status, job.error, job.message = "failed", result["error"], "Failed"
+        else:
+            job.status, job.result_json, job.progress = "succeeded", result, 1.0
+            job.message = f"Finished in {time.perf_counter() - started:.1f} s"
+        db.session.commit()
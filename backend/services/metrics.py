@@ -0,0 +1,148 @@
+# services/metrics.py
+"""
+Lightweight timing instrumentation, exposed in Prometheus text format at GET /api/metrics
+(METRICS_TOKEN bearer or an admin JWT, see routes/metrics.py).
+
+  with stage("simulate.dispatch"):   times a block into solar_stage_seconds{stage=...}
+  init_app(app)                      times every request into solar_http_request_seconds
+                                     {method, endpoint, status}
+
+Both are cumulative histograms (BUCKETS, in seconds) held in process memory, so each
+web worker reports its own. Stages that run in the simulation process pool are collected
+there and recorded in the web process when the result comes back (services/executor.py).
+
+A request sent with an `X-Debug-Timings` header gets the per-stage breakdown of that
+request back in an `X-Debug-Timings` response header, in Server-Timing syntax:
+"simulate.load_demand;dur=12.4, simulate.dispatch;dur=31.0, request;dur=58.2" (ms).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    # A real lock even when eventlet has monkey-patched threading (the critical sections never yield)
+    from eventlet.patcher import original as _original
+    _threading = _original("threading")
+except ImportError:
+    _threading = threading
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEBUG_HEADER = "X-Debug-Timings"
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_METRIC = "solar_stage_seconds"
+REQUEST_METRIC = "solar_http_request_seconds"
+METRICS = {
+    STAGE_METRIC: ("Time spent in an instrumented stage (simulation, financials, optimizer).", ("stage",)),
+    REQUEST_METRIC: ("Time to handle an HTTP request, by route.", ("method", "endpoint", "status")),
+}
+
+_lock = _threading.Lock()
+_series = {name: {} for name in METRICS}  # metric -> {label values: [bucket counts..., +Inf count, sum]}
+_timings = ContextVar("stage_timings", default=None)  # [(stage, seconds)] of the current request/task
+
+
+def observe(metric, seconds, *label_values):
+    with _lock:
+        series = _series[metric].get(label_values)
+        if series is None:
+            series = _series[metric][label_values] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                series[i] += 1
+        series[len(BUCKETS)] += 1
+        series[-1] += seconds
+
+
+def record(timings):
+    """Adds [(stage, seconds)] to the stage histogram and to the current request's breakdown."""
+    current = _timings.get()
+    for name, seconds in timings:
+        observe(STAGE_METRIC, seconds, name)
+        if current is not None:
+            current.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record([(name, time.perf_counter() - started)])
+
+
+@contextmanager
+def collect():
+    """Collects the stages run inside the block (and only those) into the yielded list."""
+    timings = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def render():
+    """Every histogram in Prometheus text exposition format (0.0.4)."""
+    lines = []
+    with _lock:
+        snapshot = {name: {labels: list(values) for labels, values in series.items()}
+                    for name, series in _series.items()}
+    for name, (help_text, label_names) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for label_values, values in sorted(snapshot[name].items()):
+            labels = ",".join(f'{key}="{_escape(value)}"' for key, value in zip(label_names, label_values))
+            for bound, count in zip((*BUCKETS, "+Inf"), values[:-1]):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {values[-1]:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {values[len(BUCKETS)]}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def reset():
+    with _lock:
+        for series in _series.values():
+            series.clear()
+
+
+# ---------------------------------------------------------------------------
+#  Request middleware
+# ---------------------------------------------------------------------------
+def init_app(app):
+    """Times every request; answers X-Debug-Timings with the request's stage breakdown."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_timings = []
+        g.metrics_token = _timings.set(g.metrics_timings)
+
+    @app.after_request
+    def _finish_request_timer(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        observe(REQUEST_METRIC, elapsed, request.method, endpoint, str(response.status_code))
+
+        if request.headers.get(DEBUG_HEADER):
+            breakdown = [*g.get("metrics_timings", []), ("request", elapsed)]
+            response.headers[DEBUG_HEADER] = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in breakdown)
+        return response
+
+    @app.teardown_request
+    def _reset_request_timings(exc):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            try:
+                _timings.reset(token)
+            except (ValueError, RuntimeError):
+                pass  # set in a different context (e.g. a streamed response)
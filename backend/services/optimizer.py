@@ -0,0 +1,351 @@
+# services/optimizer.py
+"""
+System optimizer: searches panel kWp x inverter x battery from the product catalog.
+
+1. Demand, generation percentages and per-interval tariff rates are loaded once.
+2. Inverters and batteries of the same rating are deduplicated to the cheapest one
+   before the search (a bigger product is never a substitute: inverters must fit the
+   kWp band, see DesignSpace.inverters_for).
+3. The search is coarse-to-fine: a coarse grid over roof kWp, battery size and
+   inverter size, then ever finer neighbourhoods of the best designs.
+4. Designs are evaluated in chunks with the batch dispatch kernel, keeping only
+   annual totals; the chunks run in parallel on the simulation process pool.
+Returns the lowest-payback design and the Pareto front of capex vs payback.
+"""
+import math
+import time
+
+import numpy as np
+
+from models import Product
+from .dispatch import dispatch_batch
+from .executor import SharedArrays, map_shared
+from .financial_calcs import project_tariff_data
+from .generation_profiles import DEFAULT_GENERATION_PROFILE
+from .metrics import stage
+from .simulation_engine import get_profile_percentages, load_project_demand
+from .tariff_engine import TariffEngine
+
+TIME_INTERVAL_HOURS = 0.5
+PANEL_KW_STEP = 2            # finest kWp resolution
+COARSE_KW_SAMPLES = 8        # kWp values in the first pass
+COARSE_BATTERY_SAMPLES = 6   # battery sizes in the first pass
+INVERTER_SAMPLES = 4         # inverters tried per kWp before the final sweep
+REFINE_SEEDS = 6             # best designs whose neighbourhood is refined each round
+PARETO_SEEDS = 4             # Pareto-front designs refined alongside them
+INVERTER_RATIO = (0.85, 1.3)  # inverter kVA as a multiple of kWp
+EVAL_CHUNK = 128             # designs per dispatch call (each array is chunk x 17,520 floats)
+BOS_FACTOR = 1.79            # ~20% extra for mounting, wiring, consumables, etc.
+MAX_UNMET_PCT = 1.0          # off-grid designs may leave at most this share of demand unmet
+TARIFF_NOW = 2.2             # R / kWh, used when neither the request nor the project has a tariff
+FALLBACK_PANEL_PRICE_PER_KW = 3500  # R / kWp (≈ R 3.50 / W) if no panel in DB
+BAT_EFF = 0.92
+BAT_DOD = 0.90               # usable depth-of-discharge
+AUTONOMY_DAYS = 2            # off-grid battery sizing
+BACKUP_HOURS = 2             # hybrid: 2 h critical load at 40% of peak
+
+
+def cheapest_per_size(candidates):
+    """
+    The cheapest candidate of each size, by size. Candidates are dicts with 'size' and 'price';
+    a product of the same rating at a higher price can never win, a bigger one can be out of band.
+    """
+    cheapest = {}
+    for c in sorted(candidates, key=lambda c: (c["size"], c["price"])):
+        cheapest.setdefault(c["size"], c)
+    return list(cheapest.values())
+
+
+def pareto_front(results):
+    """Designs not beaten on both capex and payback (lower is better for both), by capex."""
+    front, best_payback = [], math.inf
+    for r in sorted(results, key=lambda r: (r["capex"], r["payback_years"])):
+        if r["payback_years"] < best_payback:
+            front.append(r)
+            best_payback = r["payback_years"]
+    return front
+
+
+def _evaluate_chunk(arrays, chunk, settings):
+    """DesignSpace.evaluate for one chunk of designs (runs in a pool process)."""
+    dt = TIME_INTERVAL_HOURS
+    kwp = np.array([d[0] for d in chunk], dtype=float)
+    inverter_kva = np.array([d[1]["size"] for d in chunk], dtype=float)
+    battery_kwh = np.array([d[2]["size"] if d[2] else 0.0 for d in chunk], dtype=float)
+
+    potential = np.minimum(arrays["generation_per_kwp"][np.newaxis, :] * kwp[:, np.newaxis],
+                           inverter_kva[:, np.newaxis])
+    flows = dispatch_batch(
+        arrays["demand_kw"], potential, battery_kwh, battery_kwh * (settings["battery_soc_limit"] / 100),
+        battery_kwh > 0,
+        np.full(len(chunk), settings["allow_export"]),
+        np.full(len(chunk), settings["system_type"] == 'off-grid'),
+        time_interval_hours=dt,
+    )
+    import_kwh = flows["import_from_grid"].sum(axis=1) * dt
+    export_kwh = flows["export_to_grid"].sum(axis=1) * dt
+    unmet_kwh = flows["shortfall_kw"].sum(axis=1) * dt
+    import_cost = (flows["import_from_grid"] @ arrays["energy_rates"]) * dt
+    savings = settings["baseline_cost"] - import_cost + export_kwh * settings["feed_in_tariff"]
+    del flows, potential
+
+    results = []
+    for j, (kw, inv, bat) in enumerate(chunk):
+        equipment_capex = kw * settings["panel_price_per_kw"] + inv["price"] + (bat["price"] if bat else 0)
+        capex = equipment_capex * (1 + BOS_FACTOR)
+        annual_savings = float(savings[j])
+        results.append({
+            "kwp": kw,
+            "inv_id": inv["id"],
+            "inv_model": inv["name"],
+            "inverter_kva": inv["size"],
+            "bat_id": bat["id"] if bat else None,
+            "bat_model": bat["name"] if bat else None,
+            "bat_kwh": bat["size"] if bat else 0,
+            "capex": round(capex, 2),
+            "annual_savings": round(annual_savings, 2),
+            "payback_years": round(capex / annual_savings, 2) if annual_savings > 0 else math.inf,
+            "import_kwh": round(float(import_kwh[j]), 1),
+            "export_kwh": round(float(export_kwh[j]), 1),
+            "unmet_kwh": round(float(unmet_kwh[j]), 1),
+        })
+    return results
+
+
+class DesignSpace:
+    """Everything that stays fixed while designs are evaluated."""
+
+    def __init__(self, demand_kw, percentages, energy_rates, system_type, allow_export,
+                 feed_in_tariff, panel_price_per_kw, inverters, batteries, battery_soc_limit=20):
+        self.demand_kw = np.asarray(demand_kw, dtype=float)
+        self.generation_per_kwp = np.asarray(percentages, dtype=float) / 100
+        self.energy_rates = np.asarray(energy_rates, dtype=float)
+        self.system_type = system_type
+        self.allow_export = allow_export and system_type != 'off-grid'
+        self.feed_in_tariff = feed_in_tariff
+        self.panel_price_per_kw = panel_price_per_kw
+        self.inverters = inverters
+        self.batteries = batteries
+        self.battery_soc_limit = battery_soc_limit
+
+        dt = TIME_INTERVAL_HOURS
+        self.total_demand_kwh = float(self.demand_kw.sum()) * dt
+        self.baseline_cost = float(np.dot(self.demand_kw, self.energy_rates)) * dt
+        self.shared = None
+
+    def inverters_for(self, kwp, limit=None):
+        """Inverters sized 0.85-1.3 x kWp, optionally thinned to `limit` evenly spread sizes."""
+        low, high = INVERTER_RATIO
+        in_band = [inv for inv in self.inverters if low * kwp <= inv["size"] <= high * kwp]
+        return _spread(in_band, limit) if limit else in_band
+
+    def evaluate(self, designs):
+        """
+        Annual totals, capex and payback for each (kwp, inverter, battery) design.
+        Chunks are fanned out across the simulation process pool (services/executor.py);
+        the demand, generation and rate arrays go to shared memory once per design space.
+        """
+        chunks = [designs[start:start + EVAL_CHUNK] for start in range(0, len(designs), EVAL_CHUNK)]
+        if not chunks:
+            return []
+        if self.shared is None:
+            self.shared = SharedArrays(demand_kw=self.demand_kw, generation_per_kwp=self.generation_per_kwp,
+                                       energy_rates=self.energy_rates)
+        settings = {key: getattr(self, key) for key in
+                    ("system_type", "allow_export", "feed_in_tariff", "panel_price_per_kw",
+                     "battery_soc_limit", "baseline_cost")}
+        return [result for chunk_results in map_shared(_evaluate_chunk, self.shared, chunks, settings)
+                for result in chunk_results]
+
+    def close(self):
+        """Frees the shared-memory copies of the arrays."""
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+    def feasible(self, result):
+        if result["payback_years"] == math.inf:
+            return False
+        if self.system_type == 'off-grid':
+            return result["unmet_kwh"] <= self.total_demand_kwh * MAX_UNMET_PCT / 100
+        return True
+
+
+def _spread(items, n):
+    """Up to n items evenly spaced over a sorted list, always including both ends."""
+    if len(items) <= n:
+        return list(items)
+    positions = sorted(set(np.linspace(0, len(items) - 1, n).round().astype(int)))
+    return [items[i] for i in positions]
+
+
+def _design_key(design):
+    kwp, inv, bat = design
+    return (kwp, inv["id"], bat["id"] if bat else None)
+
+
+def search(space, roof_kw_max, progress=None):
+    """
+    Coarse-to-fine search. kWp and battery size are walked on strided grids whose
+    strides halve each round around the best designs and the Pareto front; inverters
+    are thinned to INVERTER_SAMPLES per kWp until a final full sweep at the seeds.
+    `progress(fraction, message)` is called after each round.
+    Returns (evaluated results, feasible results, elapsed seconds).
+    """
+    started = time.perf_counter()
+    step = PANEL_KW_STEP
+    kwp_grid = list(range(step, max(step, int(roof_kw_max)) + 1, step))
+    batteries = space.batteries if space.system_type != 'grid' else [None]
+    kwp_pos = {kwp: i for i, kwp in enumerate(kwp_grid)}
+    battery_pos = {(b["id"] if b else None): j for j, b in enumerate(batteries)}
+    evaluated = {}
+
+    def run(designs):
+        fresh = []
+        for design in designs:
+            key = _design_key(design)
+            if key not in evaluated:
+                evaluated[key] = None
+                fresh.append(design)
+        for design, result in zip(fresh, space.evaluate(fresh)):
+            evaluated[_design_key(design)] = result
+
+    def seeds():
+        feasible = [r for r in evaluated.values() if space.feasible(r)]
+        best = sorted(feasible, key=lambda r: r["payback_years"])[:REFINE_SEEDS]
+        return best + _spread(pareto_front(feasible), PARETO_SEEDS)
+
+    # 1. Coarse pass over the whole roof and battery range
+    kwp_stride = max(1, math.ceil(len(kwp_grid) / COARSE_KW_SAMPLES))
+    battery_stride = max(1, math.ceil(len(batteries) / COARSE_BATTERY_SAMPLES))
+    total_rounds = 2 + math.ceil(math.log2(max(kwp_stride, battery_stride)))
+    completed = 0
+
+    def round_done(message):
+        nonlocal completed
+        completed += 1
+        if progress:
+            progress(completed / total_rounds, f"{message}: {len(evaluated)} designs evaluated")
+
+    run([(kwp_grid[i], inv, batteries[j])
+         for i in range(kwp_stride - 1, len(kwp_grid), kwp_stride)
+         for j in range(0, len(batteries), battery_stride)
+         for inv in space.inverters_for(kwp_grid[i], INVERTER_SAMPLES)])
+    round_done("Coarse pass")
+
+    # 2. Halve the strides around the seeds until both are 1
+    while kwp_stride > 1 or battery_stride > 1:
+        kwp_stride, battery_stride = (kwp_stride + 1) // 2, (battery_stride + 1) // 2
+        designs = []
+        for seed in seeds():
+            i, j = kwp_pos[seed["kwp"]], battery_pos[seed["bat_id"]]
+            for ni in (i - kwp_stride, i, i + kwp_stride):
+                for nj in (j - battery_stride, j, j + battery_stride):
+                    if 0 <= ni < len(kwp_grid) and 0 <= nj < len(batteries):
+                        designs += [(kwp_grid[ni], inv, batteries[nj])
+                                    for inv in space.inverters_for(kwp_grid[ni], INVERTER_SAMPLES)]
+        run(designs)
+        round_done("Refining")
+
+    # 3. Every suitable inverter at the final seeds
+    run([(seed["kwp"], inv, batteries[battery_pos[seed["bat_id"]]])
+         for seed in seeds() for inv in space.inverters_for(seed["kwp"])])
+    round_done("Inverter sweep")
+
+    results = list(evaluated.values())
+    feasible = [r for r in results if space.feasible(r)]
+    return results, feasible, time.perf_counter() - started
+
+
+# ---------------------------------------------------------------------------
+#  Loading the design space for a project
+# ---------------------------------------------------------------------------
+def panel_price_per_kw():
+    panel = Product.query.filter_by(category="panel").first()
+    if panel and panel.price and panel.power_w:
+        return panel.price / panel.power_w * 1000   # R / kWp
+    return FALLBACK_PANEL_PRICE_PER_KW
+
+
+def _catalog(category, size_attr):
+    """Priced products of a category with a usable size, as plain dicts (the cheapest of each size)."""
+    candidates = []
+    for p in Product.query.filter_by(category=category).all():
+        size = getattr(p, size_attr)
+        if size and size > 0 and p.price is not None:
+            candidates.append({"id": p.id, "name": f"{p.brand} {p.model}",
+                               "size": float(size), "price": float(p.price)})
+    return cheapest_per_size(candidates)
+
+
+def required_battery_kwh(system_type, demand_kw):
+    """Minimum battery size worth considering, from autonomy (off-grid) or backup (hybrid) needs."""
+    if system_type == "off-grid":
+        avg_daily_kwh = float(np.sum(demand_kw)) * TIME_INTERVAL_HOURS / (len(demand_kw) / 48)
+        return avg_daily_kwh * AUTONOMY_DAYS / (BAT_EFF * BAT_DOD)
+    if system_type == "hybrid":
+        critical_kw = float(np.max(demand_kw)) * 0.4
+        return critical_kw * BACKUP_HOURS / (BAT_EFF * BAT_DOD)
+    return 0.0
+
+
+def _energy_rates(project, index, flat_tariff):
+    if flat_tariff is not None:
+        return np.full(len(index), float(flat_tariff))
+    tariff_data = project_tariff_data(project)
+    if tariff_data.get('rates'):
+        return TariffEngine(tariff_data).rate_vector(index)[0]
+    return np.full(len(index), TARIFF_NOW)
+
+
+@stage("optimize")
+def optimize_project(project, system_type, roof_kw_max=100, allow_export=False, tariff=None,
+                     feed_in_tariff=None, profile_name=DEFAULT_GENERATION_PROFILE, sample_size=10,
+                     progress=None):
+    """
+    Searches the catalog for the project. `tariff` is a flat R/kWh override; without it the
+    project's own tariff is used. `progress(fraction, message)` reports search rounds.
+    Returns {"best", "samples", "pareto", "stats"} or {"error": ...}.
+    """
+    try:
+        with stage("optimize.load"):
+            index, demand_kw = load_project_demand(project)
+            percentages = get_profile_percentages(profile_name, len(index))
+    except ValueError as e:
+        return {"error": str(e)}
+
+    with stage("optimize.rates"):
+        energy_rates = _energy_rates(project, index, tariff)
+    if feed_in_tariff is None:
+        feed_in_tariff = float(np.mean(energy_rates)) * 0.45
+
+    inverters = _catalog("inverter", "rating_kva")
+    batteries = []
+    if system_type != "grid":
+        min_kwh = required_battery_kwh(system_type, demand_kw)
+        batteries = [b for b in _catalog("battery", "capacity_kwh") if b["size"] >= min_kwh]
+        if not batteries:
+            return {"error": "No battery large enough for required autonomy"
+                    if system_type == "off-grid" else "No battery large enough for required backup"}
+
+    space = DesignSpace(demand_kw, percentages, energy_rates, system_type, allow_export,
+                        feed_in_tariff, panel_price_per_kw(), inverters, batteries)
+    try:
+        with stage("optimize.search"):
+            results, feasible, elapsed = search(space, roof_kw_max, progress)
+    finally:
+        space.close()
+
+    best = min(feasible, key=lambda r: r["payback_years"]) if feasible else None
+    return {
+        "best": best,
+        "samples": sorted(feasible, key=lambda r: r["payback_years"])[:sample_size],
+        "pareto": pareto_front(feasible),
+        "stats": {
+            "evaluated": len(results),
+            "feasible": len(feasible),
+            "inverters": len(inverters),
+            "batteries": len(batteries),
+            "elapsed_s": round(elapsed, 3),
+        },
+    }
@@ -0,0 +1,224 @@
+# services/profile_library.py
+"""
+The load profile library (LoadProfiles) as arrays and as compact summaries.
+
+A profile's demand is stored packed, like EnergySeries: data_start, data_step_seconds and
+float32 data_values (~70 KB a year instead of ~1 MB of JSON rows). Rows written before the
+packing migration, or by tools that still write profile_data, are read from the JSON.
+
+  profile_arrays(profile)        (DatetimeIndex, float64 demand_kw), packed or legacy JSON
+  set_profile_data(profile, ...) packs a series into the row (and clears profile_data)
+  profile_rows(profile)          the legacy [{"timestamp", "demand_kw"}] rows, for old clients
+  library_summaries()            {"profiles", "digest"}: every profile's metadata plus a 48-point
+                                 average day and 12 monthly totals for thumbnails (~1 KB each)
+  resampled(timestamps, demand)  the series averaged to a chart resolution
+  profile_digest(profile_id)     content hash of a profile's data, for ETags
+
+Summaries are computed once per profile and kept in this process. The mapper events at
+the bottom drop a profile's entry (and the assembled listing) when it is inserted,
+updated or deleted, and again when that session commits, so a listing rebuilt by another
+request between the flush and the commit cannot keep the old data.
+"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.orm import Session, load_only, object_session
+
+from models import LoadProfiles
+from .energy_series import pack_series, unpack_series
+from .timeseries import MONTHLY, RESOLUTION_ALIASES, RESOLUTIONS, STEP_SECONDS, downsample_mean, monthly_mean
+
+SHAPE_POINTS = 48  # half-hour slots in the average day
+_CHANGED = "profile_library_changed"  # session.info key: ids written in the open transaction
+
+_entries = {}                # profile_id -> {"digest", "day_shape", "monthly_kwh", ...}
+_listing = {"value": None}   # every summary, in id order
+
+
+# Everything but the data, for listings
+METADATA_COLUMNS = (LoadProfiles.id, LoadProfiles.name, LoadProfiles.description, LoadProfiles.profile_type,
+                    LoadProfiles.annual_kwh, LoadProfiles.monthly_avg_kwh_original, LoadProfiles.max_peak_demand_kw)
+
+
+def has_data(profile):
+    return profile.data_values is not None or bool(profile.profile_data)
+
+
+def profile_arrays(profile):
+    """(timestamps, demand_kw) of a LoadProfiles row, sorted; empty when it has no data."""
+    if profile.data_values is not None:
+        timestamps, values = unpack_series(profile.data_start, profile.data_step_seconds, profile.data_count,
+                                           profile.data_dtype, profile.data_values, profile.data_offsets)
+        return pd.DatetimeIndex(timestamps), values
+    return _json_arrays(profile.profile_data)
+
+
+def _json_arrays(rows):
+    """(timestamps, demand_kw) of legacy profile_data rows, sorted; bad timestamps are dropped, bad values read as 0."""
+    rows = rows or []
+    if not rows:
+        return pd.DatetimeIndex([]), np.zeros(0)
+    first = rows[0]
+    ts_key = "timestamp" if "timestamp" in first else "Timestamp"
+    kw_key = "demand_kw" if "demand_kw" in first else "Demand_kW"
+
+    timestamps = pd.to_datetime([r.get(ts_key) for r in rows], errors="coerce")
+    demand = pd.to_numeric(pd.Series([r.get(kw_key) for r in rows]), errors="coerce").fillna(0).to_numpy(dtype=float)
+    keep = ~timestamps.isna()
+    timestamps, demand = timestamps[keep], demand[keep]
+    order = np.argsort(timestamps.asi8, kind="stable")
+    return timestamps[order], demand[order]
+
+
+def set_profile_data(profile, timestamps, values):
+    """Packs a demand series into the row's data_* columns and drops the legacy JSON."""
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is not None:
+        index = index.tz_localize(None)  # profiles hold naive wall-clock timestamps
+    values = np.asarray(values, dtype=np.float64)
+    order = np.argsort(index.asi8, kind="stable")
+    packed = pack_series(index.values[order], values[order])
+    for key, value in packed.items():
+        setattr(profile, f"data_{key}", value)
+    profile.profile_data = None
+
+
+def profile_rows(profile):
+    """The profile as legacy [{"timestamp", "demand_kw"}] rows (for clients of GET /api/load_profiles)."""
+    if profile.data_values is None:
+        return profile.profile_data
+    timestamps, values = profile_arrays(profile)
+    return [{"timestamp": ts, "demand_kw": kw}
+            for ts, kw in zip(timestamps.strftime("%Y-%m-%dT%H:%M:%S"), values.tolist())]
+
+
+def resampled(timestamps, demand, resolution="30min"):
+    """
+    (values, view) of a 30-minute profile averaged to `resolution` (services/timeseries.py
+    RESOLUTIONS, '1mo' or an alias such as 'daily'). `view` holds "resolution", "start",
+    "step_seconds" and "count", plus "periods" for monthly buckets. Raises ValueError.
+    """
+    resolution = RESOLUTION_ALIASES.get(resolution, resolution)
+    view = {"resolution": resolution, "start": timestamps[0].isoformat()}
+    if resolution == MONTHLY:
+        values, view["periods"] = monthly_mean(demand, timestamps)
+        view["step_seconds"] = None
+    else:
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of: {', '.join([*RESOLUTIONS, MONTHLY])}")
+        values = downsample_mean(demand, RESOLUTIONS[resolution])
+        view["step_seconds"] = RESOLUTIONS[resolution] * STEP_SECONDS
+    view["count"] = len(values)
+    return values, view
+
+
+def _digest(timestamps, demand):
+    h = hashlib.sha256(timestamps.asi8.tobytes())
+    h.update(np.ascontiguousarray(demand, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def _entry(profile):
+    """Digest, average-day shape and monthly totals of one profile."""
+    timestamps, demand = profile_arrays(profile)
+    if len(timestamps) == 0:
+        return {"digest": _digest(timestamps, demand), "points": 0, "start": None, "end": None,
+                "day_shape": [], "monthly_kwh": []}
+
+    steps = np.diff(timestamps.asi8)
+    step_hours = float(np.median(steps)) / 3.6e12 if len(steps) else 0.5
+
+    slots = timestamps.hour.to_numpy() * 2 + timestamps.minute.to_numpy() // 30
+    counts = np.bincount(slots, minlength=SHAPE_POINTS)
+    day_shape = np.bincount(slots, weights=demand, minlength=SHAPE_POINTS) / np.maximum(counts, 1)
+    monthly_kwh = np.bincount(timestamps.month.to_numpy() - 1, weights=demand, minlength=12) * step_hours
+
+    return {
+        "digest": _digest(timestamps, demand),
+        "points": len(timestamps),
+        "start": timestamps[0].isoformat(),
+        "end": timestamps[-1].isoformat(),
+        "step_seconds": int(round(step_hours * 3600)),
+        "day_shape": np.round(day_shape, 6).tolist(),
+        "monthly_kwh": np.round(monthly_kwh, 6).tolist(),
+    }
+
+
+def profile_entry(profile):
+    """The cached summary entry of a loaded LoadProfiles row."""
+    entry = _entries.get(profile.id)
+    if entry is None:
+        entry = _entries[profile.id] = _entry(profile)
+    return entry
+
+
+def profile_digest(profile_id):
+    """Cached data digest of a profile, or None until its summary has been computed."""
+    entry = _entries.get(profile_id)
+    return entry["digest"] if entry else None
+
+
+def library_summaries():
+    """{"profiles": [metadata + summary entry], "digest": hash of the listing}, assembled once per change."""
+    listing = _listing["value"]
+    if listing is not None:
+        return listing
+
+    # Metadata only; the data is read just for profiles not summarized yet
+    profiles = LoadProfiles.query.options(load_only(*METADATA_COLUMNS)).order_by(LoadProfiles.id).all()
+    missing = [p.id for p in profiles if p.id not in _entries]
+    if missing:
+        for profile in LoadProfiles.query.filter(LoadProfiles.id.in_(missing)):
+            profile_entry(profile)
+
+    listing = []
+    for p in profiles:
+        entry = _entries.get(p.id) or {}
+        listing.append({
+            "id": p.id,
+            "name": p.name,
+            "description": p.description,
+            "profile_type": p.profile_type,
+            "annual_kwh": p.annual_kwh,
+            "monthly_avg_kwh_original": p.monthly_avg_kwh_original,
+            "max_peak_demand_kw": p.max_peak_demand_kw,
+            **{key: value for key, value in entry.items() if key != "digest"},
+        })
+    digest = hashlib.sha256(json.dumps(listing, sort_keys=True, default=str).encode()).hexdigest()
+    _listing["value"] = {"profiles": listing, "digest": digest}
+    return _listing["value"]
+
+
+def forget(profile_ids):
+    """Drops the given profiles' summaries and the assembled listing."""
+    _listing["value"] = None
+    for profile_id in profile_ids:
+        _entries.pop(profile_id, None)
+
+
+# ---------------------------------------------------------------------------
+#  Invalidation
+# ---------------------------------------------------------------------------
+@event.listens_for(LoadProfiles, "after_insert")
+@event.listens_for(LoadProfiles, "after_update")
+@event.listens_for(LoadProfiles, "after_delete")
+def _load_profile_written(mapper, connection, target):
+    forget([target.id])
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed(session):
+    changed = session.info.pop(_CHANGED, None)
+    if changed:
+        forget(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed(session, previous_transaction):
+    session.info.pop(_CHANGED, None)
@@ -0,0 +1,135 @@
+# services/pv_profile_cache.py
+"""
+Memoized pvlib ModelChain output.
+
+For a given site, year, orientation and temperature model the ModelChain result is
+deterministic, and with the PVWatts DC model it is linear in pdc0. So the chain is
+run once at 1 kWp and kept as per-kWp DC and AC series; a design's generation is
+then the DC series scaled by panel size and passed through the PVWatts inverter
+(the same inverter model ModelChain applies), which is cheap.
+
+Every lookup is timed into the stage histogram as "pvlib.unit_profile.hit" or
+"pvlib.unit_profile.miss", so GET /api/metrics reports the hit and miss counts (the
+_count series), including lookups made in the simulation process pool.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pvlib import inverter
+from pvlib.location import Location
+from pvlib.modelchain import ModelChain
+from pvlib.pvsystem import PVSystem
+from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
+
+from .metrics import record, stage
+from .weather_cache import get_tmy, site_key
+
+PV_PROFILE_CACHE_SIZE = 64  # ~280 KB per entry (two float64 series)
+DEFAULT_TEMPERATURE_MODEL = ('sapm', 'open_rack_glass_glass')
+GAMMA_PDC = -0.350 / 100  # Temperature coefficient of DC power (%/°C)
+
+logger = logging.getLogger(__name__)
+
+
+class UnitProfile:
+    """Per-kWp generation for one site/orientation: DC and AC (inverter sized 1:1) in kW per kWp."""
+
+    def __init__(self, index, dc_per_kwp, ac_per_kwp):
+        self.index = index
+        self.dc_per_kwp = dc_per_kwp
+        self.ac_per_kwp = ac_per_kwp
+
+    def ac_kw(self, panel_kw, inverter_kva):
+        """AC output in kW for a panel/inverter size, clipped by the PVWatts inverter model."""
+        if panel_kw <= 0 or inverter_kva <= 0:
+            return np.zeros(len(self.index))
+        ac_w = inverter.pvwatts(self.dc_per_kwp * (panel_kw * 1000), inverter_kva * 1000)
+        return np.nan_to_num(ac_w, nan=0.0) / 1000
+
+
+class ProfileCache:
+    """Size-bounded LRU; hits and misses are recorded as "<stage>.hit" / "<stage>.miss" stages."""
+
+    def __init__(self, maxsize, stage):
+        self.maxsize = maxsize
+        self.stage = stage
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        started = time.perf_counter()
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        if value is not None:
+            record([(f"{self.stage}.hit", time.perf_counter() - started)])
+            return value
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        record([(f"{self.stage}.miss", time.perf_counter() - started)])
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+PROFILE_CACHE = ProfileCache(PV_PROFILE_CACHE_SIZE, "pvlib.unit_profile")
+
+
+def weather_for_year(latitude, longitude, sim_year):
+    """Cached TMY laid onto `sim_year` and interpolated to 30 minutes."""
+    weather_data = get_tmy(latitude, longitude)
+
+    new_hourly_index = pd.date_range(start=f"{sim_year}-01-01", periods=8760, freq='h', tz='Africa/Johannesburg')
+    weather_data.set_index(new_hourly_index, inplace=True)
+
+    # Resample to 30 minutes and interpolate to create smooth transitions
+    full_30min_index = pd.date_range(start=f"{sim_year}-01-01", end=f"{sim_year}-12-31 23:30", freq='30min', tz='Africa/Johannesburg')
+    return weather_data.reindex(full_30min_index).interpolate(method='linear')
+
+
+def _run_unit_model(latitude, longitude, sim_year, tilt, azimuth, temperature_model):
+    weather_data_30min = weather_for_year(latitude, longitude, sim_year)
+
+    site = Location(latitude, longitude, tz='Africa/Johannesburg')
+    system = PVSystem(
+        surface_tilt=tilt,
+        surface_azimuth=azimuth,
+        module_parameters={'pdc0': 1000, 'gamma_pdc': GAMMA_PDC},  # 1 kWp
+        inverter_parameters={'pdc0': 1000},
+        temperature_model_parameters=TEMPERATURE_MODEL_PARAMETERS[temperature_model[0]][temperature_model[1]],
+    )
+    mc = ModelChain(system, site, aoi_model="no_loss")
+    with stage("pvlib.model"):
+        mc.run_model(weather_data_30min)
+
+    if mc.results is None or mc.results.ac is None:
+        raise ValueError("PVLib ModelChain did not produce AC generation results.")
+
+    dc = mc.results.dc['p_mp'] if isinstance(mc.results.dc, pd.DataFrame) else mc.results.dc
+    logger.debug("computed 1 kWp profile for %s,%s tilt %s azimuth %s (%s)", latitude, longitude, tilt, azimuth, sim_year)
+    return UnitProfile(
+        weather_data_30min.index,
+        dc.fillna(0).to_numpy(dtype=float) / 1000,
+        mc.results.ac.fillna(0).to_numpy(dtype=float) / 1000,
+    )
+
+
+def get_unit_profile(latitude, longitude, tilt, azimuth, sim_year, temperature_model=DEFAULT_TEMPERATURE_MODEL):
+    """Returns the cached UnitProfile, running pvlib only on a miss."""
+    lat, lon = site_key(latitude, longitude)
+    key = (lat, lon, int(sim_year), float(tilt), float(azimuth), tuple(temperature_model))
+    return PROFILE_CACHE.get(
+        key, lambda: _run_unit_model(lat, lon, int(sim_year), float(tilt), float(azimuth), tuple(temperature_model))
+    )
@@ -0,0 +1,247 @@
+# services/result_store.py
+"""
+Persistent simulation result store.
+
+A result is stored once per distinct set of inputs in simulation_runs, keyed by a
+SHA-256 of the canonical JSON of those inputs: the system parameters (generator config
+included), the generation profile and its file version, the project's site and tariff
+fields, and the project's energy_version / tariff_version counters. Per-interval series
+are kept as a compressed .npz and everything else as JSON, so a repeat request is one
+indexed lookup on input_hash, and with a matching If-None-Match no lookup at all.
+
+The version counters are bumped, and the project's stored runs dropped, by the SQLAlchemy
+mapper events at the bottom of this module whenever EnergySeries rows are written or
+removed, a project is linked to another load profile or scaler, a linked load profile
+changes, or a tariff or its rates change.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+from flask import Response, current_app
+from sqlalchemy import event, inspect, or_, select, update
+
+from models import db, EnergySeries, LoadProfiles, Projects, QuickDesignData, SimulationRun, TariffRates, Tariffs
+from . import metrics
+
+RESULT_STORE_VERSION = 1  # bump when the simulation or financial code changes what a run returns
+MIN_ARRAY_LENGTH = 48     # top-level lists at least this long are stored as arrays
+INDEX_KEY = "index"
+CACHE_CONTROL = "private, no-cache"  # clients may keep a copy but must revalidate with If-None-Match
+
+
+def _json_default(value):
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return str(value)
+
+
+def input_hash(kind, inputs):
+    """Hex SHA-256 of the canonical JSON of a run's inputs."""
+    canonical = json.dumps({"kind": kind, "store_version": RESULT_STORE_VERSION, **inputs},
+                           sort_keys=True, separators=(",", ":"), default=_json_default)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _profile_version(profile_name):
+    from . import generation_profiles
+    try:
+        key = generation_profiles.resolve(profile_name)
+    except KeyError:
+        return [profile_name, None]
+    return [key, os.stat(os.path.join(generation_profiles.GENERATION_PROFILE_DIR, f"{key}.npy")).st_mtime_ns]
+
+
+def simulation_inputs(project, system, use_pvgis, profile_name):
+    """Everything a /simulate result depends on, from the request and the already-loaded project."""
+    inputs = {
+        "project_id": project.id,
+        "system": system,
+        "use_pvgis": bool(use_pvgis),
+        "energy_version": project.energy_version or 0,
+        "energy_scale_factor": getattr(project, "energy_scale_factor", 1.0) or 1.0,
+    }
+    if use_pvgis:
+        inputs["site"] = [project.latitude, project.longitude]
+    else:
+        inputs["profile"] = _profile_version(profile_name)
+    return inputs
+
+
+def proposal_inputs(project, quick_design, profile_name):
+    """Everything a /proposal_data quick simulation + financials depend on."""
+    return {
+        "project_id": project.id,
+        "load_profile_id": quick_design.selected_profile_id,
+        "profile_scaler": quick_design.profile_scaler,
+        "system_config": quick_design.selected_system_config_json,
+        "profile": _profile_version(profile_name),
+        "system_type": project.system_type,
+        "battery_kwh": project.battery_kwh,
+        "project_value_excl_vat": project.project_value_excl_vat,
+        "tariff": [project.tariff_id, project.custom_flat_rate],
+        "energy_version": project.energy_version or 0,
+        "tariff_version": project.tariff_version or 0,
+    }
+
+
+def etag_for(key, *variant):
+    """Strong ETag for one representation (view options, media type, ...) of a stored run."""
+    if not variant:
+        return key[:40]
+    suffix = hashlib.sha1(json.dumps(variant, sort_keys=True, default=str).encode()).hexdigest()[:8]
+    return f"{key[:32]}-{suffix}"
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+def not_modified(etag):
+    return with_etag(Response(status=304), etag)
+
+
+# ---------------------------------------------------------------------------
+#  Save / load
+# ---------------------------------------------------------------------------
+def _is_array(value):
+    return isinstance(value, list) and len(value) >= MIN_ARRAY_LENGTH and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in value[:MIN_ARRAY_LENGTH])
+
+
+def result_kpis(result):
+    """The result without its index and per-interval series, as plain JSON (what a job row keeps)."""
+    kpis = {key: value for key, value in result.items()
+            if key not in (INDEX_KEY, "timestamps") and not _is_array(value)}
+    return json.loads(json.dumps(kpis, default=_json_default))
+
+
+def _pack(result):
+    """(kpis dict, compressed .npz bytes) for a result dict."""
+    import numpy as np
+    import pandas as pd
+
+    kpis, arrays = {}, {}
+    has_index = isinstance(result.get(INDEX_KEY), pd.DatetimeIndex)
+    for key, value in result.items():
+        if key == INDEX_KEY and has_index:
+            arrays["__index__"] = value.asi8
+            kpis["__index_tz__"] = str(value.tz) if value.tz is not None else None
+        elif key == "timestamps" and has_index:
+            continue  # rebuilt from the index
+        elif _is_array(value):
+            arrays[key] = np.asarray(value)
+        else:
+            kpis[key] = value
+    kpis["__has_timestamps__"] = has_index and "timestamps" in result
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return json.loads(json.dumps(kpis, default=_json_default)), buffer.getvalue()
+
+
+def _unpack(run, include_index):
+    import numpy as np
+    import pandas as pd
+
+    result = dict(run.kpis_json)
+    tz = result.pop("__index_tz__", None)
+    has_timestamps = result.pop("__has_timestamps__", False)
+    with np.load(io.BytesIO(run.arrays)) as arrays:
+        index = None
+        if "__index__" in arrays.files:
+            index = pd.DatetimeIndex(arrays["__index__"])
+            index = index.tz_localize("UTC").tz_convert(tz) if tz else index
+        for key in arrays.files:
+            if key != "__index__":
+                result[key] = arrays[key].tolist()
+    if has_timestamps and index is not None:
+        from .simulation_engine import isoformat_index
+        result["timestamps"] = isoformat_index(index)
+    if include_index and index is not None:
+        result[INDEX_KEY] = index
+    return result
+
+
+def load_run(key, include_index=False):
+    """
+    The stored result for an input hash, or None: one indexed SELECT of the two data
+    columns, no write. Hits and misses are counted in /api/metrics (result_store.hit/.miss).
+    """
+    started = time.perf_counter()
+    run = (db.session.query(SimulationRun.kpis_json, SimulationRun.arrays)
+           .filter(SimulationRun.input_hash == key).first())
+    if run is None:
+        metrics.record([("result_store.miss", time.perf_counter() - started)])
+        return None
+    result = _unpack(run, include_index)
+    metrics.record([("result_store.hit", time.perf_counter() - started)])
+    return result
+
+
+def save_run(project_id, kind, key, inputs, result):
+    """
+    Stores a result under its input hash and commits. Failures (e.g. a concurrent request
+    stored the same hash first) are logged and otherwise ignored.
+    """
+    try:
+        kpis, arrays = _pack(result)
+        db.session.add(SimulationRun(project_id=project_id, kind=kind, input_hash=key,
+                                     inputs_json=json.loads(json.dumps(inputs, default=_json_default)),
+                                     kpis_json=kpis, arrays=arrays, created_at=datetime.utcnow()))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception(f"result store: run {key[:12]} not saved")
+
+
+# ---------------------------------------------------------------------------
+#  Invalidation (SQLAlchemy events)
+# ---------------------------------------------------------------------------
+def _invalidate(connection, project_filter, counter):
+    """Bumps `counter` on the matching projects and drops their stored runs."""
+    connection.execute(update(Projects).where(project_filter)
+                       .values({counter: getattr(Projects, counter) + 1}))
+    connection.execute(SimulationRun.__table__.delete().where(
+        SimulationRun.project_id.in_(select(Projects.id).where(project_filter))))
+
+
+@event.listens_for(EnergySeries, "after_insert")
+@event.listens_for(EnergySeries, "after_delete")
+def _energy_series_changed(mapper, connection, target):
+    if getattr(target, "is_rebuild", False):
+        return  # repacked from unchanged EnergyData
+    _invalidate(connection, Projects.id == target.project_id, "energy_version")
+
+
+@event.listens_for(Projects, "after_update")
+def _project_profile_changed(mapper, connection, target):
+    # A profile-linked project's demand is derived from (profile_id, profile_scaler)
+    state = inspect(target)
+    if state.attrs.profile_id.history.has_changes() or state.attrs.profile_scaler.history.has_changes():
+        _invalidate(connection, Projects.id == target.id, "energy_version")
+
+
+@event.listens_for(LoadProfiles, "after_update")
+@event.listens_for(LoadProfiles, "after_delete")
+def _load_profile_changed(mapper, connection, target):
+    quick_designs = select(QuickDesignData.project_id).where(QuickDesignData.selected_profile_id == target.id)
+    _invalidate(connection, or_(Projects.profile_id == target.id, Projects.id.in_(quick_designs)),
+                "energy_version")
+
+
+@event.listens_for(TariffRates, "after_insert")
+@event.listens_for(TariffRates, "after_update")
+@event.listens_for(TariffRates, "after_delete")
+def _tariff_rate_changed(mapper, connection, target):
+    _invalidate(connection, Projects.tariff_id == target.tariff_id, "tariff_version")
+
+
+@event.listens_for(Tariffs, "after_update")
+def _tariff_changed(mapper, connection, target):
+    _invalidate(connection, Projects.tariff_id == target.id, "tariff_version")
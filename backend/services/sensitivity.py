@@ -0,0 +1,199 @@
+# services/sensitivity.py
+"""
+Financial risk for one design: samples thousands of 20-year cashflows at once and
+returns payback, ROI and NPV distributions (P10 / P50 / P90) plus a tornado breakdown.
+
+Starts from the deterministic result of run_quick_financials (year-1 savings and the
+energy totals), so the tariff engine runs once per design, not once per scenario. Each
+scenario draws, from triangular (low, mode, high) distributions in RANGES:
+
+  escalation    offset added to every year of the escalation schedule
+  degradation   yearly PV degradation (run_quick_financials uses 0.005)
+  load_growth   yearly growth of daytime demand; extra demand is served from PV that was
+                being throttled (or, when negative, gives up PV used on site) at the
+                year-1 average tariff
+  capex         relative change of the system cost
+
+and the (scenarios x years) savings matrix is built with NumPy broadcasting. With every
+range collapsed to its mode the base case reproduces run_quick_financials' payback and ROI.
+"""
+import numpy as np
+
+from .financial_calcs import DEFAULT_ESCALATION, DEGRADATION_RATE
+
+HORIZON_YEARS = 20
+DEFAULT_SCENARIOS = 5000
+MAX_SCENARIOS = 50000
+DISCOUNT_RATE = 0.10
+PERCENTILES = (10, 50, 90)
+HISTOGRAM_BINS = 20
+OPTIONS = ("scenarios", "ranges", "seed", "discount_rate")  # request keys passed to run_sensitivity
+
+# (low, mode, high) of each sampled driver
+RANGES = {
+    "escalation": (-0.04, 0.0, 0.04),
+    "degradation": (0.003, DEGRADATION_RATE, 0.008),
+    "load_growth": (-0.02, 0.0, 0.04),
+    "capex": (-0.05, 0.0, 0.15),
+}
+
+
+def _ranges(overrides):
+    ranges = dict(RANGES)
+    for name, bounds in (overrides or {}).items():
+        if name not in RANGES:
+            raise ValueError(f"Unknown sensitivity driver '{name}' (expected one of: {', '.join(RANGES)})")
+        low, mode, high = (float(b) for b in bounds)
+        if not low <= mode <= high:
+            raise ValueError(f"Range for '{name}' must satisfy low <= mode <= high")
+        ranges[name] = (low, mode, high)
+    return ranges
+
+
+def _sample(rng, ranges, scenarios):
+    """{driver: (scenarios,) array}; a collapsed range (low == high) gives a constant."""
+    samples = {}
+    for name, (low, mode, high) in ranges.items():
+        if low == high:
+            samples[name] = np.full(scenarios, low)
+        else:
+            samples[name] = rng.triangular(low, mode, high, scenarios)
+    return samples
+
+
+def _base_inputs(financials, system_cost, escalation_schedule):
+    schedule = [float(r) for r in escalation_schedule] if escalation_schedule else [DEFAULT_ESCALATION] * HORIZON_YEARS
+    schedule = (schedule + schedule[-1:] * HORIZON_YEARS)[:HORIZON_YEARS]
+
+    total_demand_kwh = float(financials.get("total_demand_kwh") or 0)
+    total_import_kwh = float(financials.get("total_import_kwh") or 0)
+    potential_kwh = float(financials.get("potential_generation_kwh") or 0)
+    generation_kwh = float(financials.get("total_generation_kwh") or 0)
+    return {
+        "annual_savings": float(financials["annual_savings"]),
+        "system_cost": float(system_cost),
+        "schedule": np.asarray(schedule),
+        "energy_rate": float(financials.get("original_annual_cost") or 0) / total_demand_kwh if total_demand_kwh > 0 else 0.0,
+        "daytime_kwh": total_demand_kwh * float(financials.get("daytime_consumption_perc") or 0) / 100,
+        "throttled_kwh": max(potential_kwh - generation_kwh, 0.0),
+        "on_site_kwh": max(total_demand_kwh - total_import_kwh, 0.0),
+    }
+
+
+def cashflows(base, escalation, degradation, load_growth, capex):
+    """
+    Yearly savings (scenarios x HORIZON_YEARS) and capex (scenarios,) for arrays of drivers.
+    Year i (0-based) follows run_quick_financials: savings * (1 + esc_i) ** i * (1 - deg) ** i.
+    """
+    years = np.arange(HORIZON_YEARS)
+    esc = base["schedule"][None, :] + escalation[:, None]
+    escalation_factor = (1 + esc) ** years
+    degradation_factor = (1 - degradation[:, None]) ** years
+
+    # Daytime demand added (or lost) by load growth, limited by the PV available to serve it
+    extra_kwh = base["daytime_kwh"] * ((1 + load_growth[:, None]) ** years - 1)
+    extra_kwh = np.clip(extra_kwh, -base["on_site_kwh"] * degradation_factor, base["throttled_kwh"] * degradation_factor)
+
+    savings = (base["annual_savings"] * degradation_factor + extra_kwh * base["energy_rate"]) * escalation_factor
+    return savings, base["system_cost"] * (1 + capex)
+
+
+def metrics(savings, capex, discount_rate=DISCOUNT_RATE):
+    """(payback_years, roi_pct, npv) per scenario; payback is inf when it never pays back."""
+    cumulative = np.cumsum(savings, axis=1) - capex[:, None]
+    cumulative = np.hstack([-capex[:, None], cumulative])
+
+    crossed = (cumulative[:, :-1] < 0) & (cumulative[:, 1:] >= 0)
+    has_payback = crossed.any(axis=1)
+    year = crossed.argmax(axis=1)
+    rows = np.arange(len(capex))
+    prev, curr = cumulative[rows, year], cumulative[rows, year + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(curr != prev, -prev / (curr - prev), 0.0)
+        payback = np.where(has_payback, year + fraction, np.inf)
+        roi = np.where(capex > 0, (savings.sum(axis=1) - capex) / capex * 100, np.inf)
+
+    discount = (1 + discount_rate) ** -np.arange(1, savings.shape[1] + 1)
+    npv = savings @ discount - capex
+    return payback, roi, npv
+
+
+def _summary(values, decimals):
+    finite = values[np.isfinite(values)]
+    summary = {
+        f"p{p}": (round(float(v), decimals) if np.isfinite(v) else "N/A")
+        for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES, method="nearest"))
+    }
+    summary["mean"] = round(float(finite.mean()), decimals) if len(finite) else "N/A"
+    if len(finite):
+        low, high = float(finite.min()), float(finite.max())
+        bins = HISTOGRAM_BINS if high - low > 1e-9 * max(abs(high), 1.0) else 1  # (near-)constant values
+        counts, edges = np.histogram(finite, bins=bins, range=(low, high))
+        summary["histogram"] = {"counts": counts.tolist(), "edges": np.round(edges, decimals).tolist()}
+    return summary
+
+
+def _tornado(base, ranges, discount_rate):
+    """Each driver at its low and high with the others at their mode, sorted by NPV swing."""
+    names = list(ranges)
+    modes = {name: ranges[name][1] for name in names}
+    # rows: base case, then (low, high) per driver
+    cases = [modes] + [{**modes, name: ranges[name][end]} for name in names for end in (0, 2)]
+    drivers = {name: np.array([case[name] for case in cases]) for name in names}
+    payback, roi, npv = metrics(*cashflows(base, **drivers), discount_rate=discount_rate)
+
+    def value(array, row, decimals):
+        return round(float(array[row]), decimals) if np.isfinite(array[row]) else "N/A"
+
+    bars = []
+    for i, name in enumerate(names):
+        low, high = 1 + 2 * i, 2 + 2 * i
+        bars.append({
+            "driver": name,
+            "low": ranges[name][0],
+            "high": ranges[name][2],
+            "npv_low": value(npv, low, 0),
+            "npv_high": value(npv, high, 0),
+            "payback_low": value(payback, low, 1),
+            "payback_high": value(payback, high, 1),
+            "swing": round(abs(float(npv[high] - npv[low])), 0),
+        })
+    bars.sort(key=lambda bar: bar["swing"], reverse=True)
+    base_case = {"payback": value(payback, 0, 1), "roi": value(roi, 0, 1), "npv": value(npv, 0, 0)}
+    return base_case, bars
+
+
+def run_sensitivity(financials, system_cost, escalation_schedule=None, scenarios=DEFAULT_SCENARIOS,
+                    ranges=None, seed=None, discount_rate=DISCOUNT_RATE):
+    """
+    `financials` is a run_quick_financials result for the design, `system_cost` the cost it
+    was run with. Returns {"scenarios", "ranges", "base", "payback", "roi", "npv", "tornado"}
+    or {"error": ...}.
+    """
+    try:
+        scenarios = int(scenarios)
+        if not 1 <= scenarios <= MAX_SCENARIOS:
+            return {"error": f"scenarios must be between 1 and {MAX_SCENARIOS}"}
+        ranges = _ranges(ranges)
+        base = _base_inputs(financials, system_cost, escalation_schedule)
+    except (ValueError, TypeError, KeyError) as e:
+        return {"error": str(e)}
+
+    # 1. Sample every driver for every scenario and build the cashflow matrix in one pass
+    rng = np.random.default_rng(seed)
+    samples = _sample(rng, ranges, scenarios)
+    payback, roi, npv = metrics(*cashflows(base, **samples), discount_rate=discount_rate)
+
+    # 2. One-at-a-time swings for the tornado chart
+    base_case, tornado = _tornado(base, ranges, discount_rate)
+
+    return {
+        "scenarios": scenarios,
+        "discount_rate": discount_rate,
+        "ranges": {name: list(bounds) for name, bounds in ranges.items()},
+        "base": base_case,
+        "payback": {**_summary(payback, 1), "never_pct": round(float(np.isinf(payback).mean() * 100), 1)},
+        "roi": _summary(roi, 1),
+        "npv": _summary(npv, 0),
+        "tornado": tornado,
+    }
@@ -1,14 +1,17 @@
 # services/simulation_engine.py
-from pvlib.location import Location
-from pvlib.pvsystem import PVSystem
-from pvlib.modelchain import ModelChain
-from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
-from pvlib.iotools import get_pvgis_tmy
+import logging
+
 import pandas as pd
 import numpy as np
-from models import EnergyData, Projects
-import math
-import os
+from functools import lru_cache
+from models import Projects
+from .dispatch import run_dispatch
+from .energy_series import load_project_series
+from .pv_profile_cache import get_unit_profile
+from . import generation_profiles
+from .metrics import stage
+
+logger = logging.getLogger(__name__)
 
 FUEL_TABLE = [
     {'size_kw': 0.00, 'lph': {0.25: 0.0, 0.50: 0.0, 0.75: 0.0, 1.00: 0.0}},
@@ -40,6 +43,30 @@ FUEL_TABLE = [
 ]
 
 FUEL_TABLE_SIZES = [row['size_kw'] for row in FUEL_TABLE]
+FUEL_LOAD_FACTORS = (0.25, 0.50, 0.75, 1.00)
+# L/h by generator size (rows) and load factor (columns)
+FUEL_GRID = np.array([[row['lph'][lf] for lf in FUEL_LOAD_FACTORS] for row in FUEL_TABLE])
+
+
+@lru_cache(maxsize=64)
+def fuel_curve(generator_size_kw):
+    """L/h at each of FUEL_LOAD_FACTORS for one generator size, interpolated between table sizes."""
+    return np.array([np.interp(generator_size_kw, FUEL_TABLE_SIZES, FUEL_GRID[:, j])
+                     for j in range(len(FUEL_LOAD_FACTORS))])
+
+
+def fuel_rate_lph(generator_size_kw, load_factor):
+    """
+    Vectorized get_fuel_consumption: fuel (L/h) for an array of load factors, from the
+    generator's fuel curve. Flat below 25% load, proportional above 100%.
+    """
+    load_factor = np.asarray(load_factor, dtype=float)
+    if generator_size_kw <= 0:
+        return np.zeros(load_factor.shape)
+    curve = fuel_curve(float(generator_size_kw))
+    rate = np.interp(load_factor, FUEL_LOAD_FACTORS, curve)
+    return np.where(load_factor > 1.0, curve[-1] * load_factor, rate)
+
 
 def get_fuel_consumption(generator_size_kw, load_factor):
     """
@@ -204,6 +231,14 @@ class GeneratorController:
             no_significant_shortfall = shortfall_kw <= (self.size_kw * 0.1)  # Less than 10% of capacity
             return no_significant_shortfall
     
+    def fuel_liters(self, output_kw, time_interval_hours):
+        """Fuel (L) used per interval for an array of generator outputs (kW); zero where it is off."""
+        output_kw = np.asarray(output_kw, dtype=float)
+        if self.size_kw <= 0:
+            return np.zeros(output_kw.shape)
+        lph = fuel_rate_lph(self.size_kw, output_kw / self.size_kw)
+        return np.where(output_kw > 0, lph * time_interval_hours, 0.0)
+
     def get_output(self, demand_shortfall_kw, battery_soc_kwh, battery_capacity_kwh, time_interval_hours, min_soc_limit_kwh, inverter_ac_limit_kw=None):
         """
         Calculate generator output and fuel consumption for this time step.
@@ -287,6 +322,72 @@ class GeneratorController:
         return gen_to_load_kw, gen_to_battery_kw, fuel_liters_consumed
 
 
+def isoformat_index(index):
+    """
+    Same strings as `[ts.isoformat() for ts in index]` without building a Timestamp per entry.
+    Falls back to the per-entry path for sub-second values or changing UTC offsets.
+    """
+    if len(index) == 0:
+        return []
+    if index.microsecond.any() or index.nanosecond.any():
+        return [ts.isoformat() for ts in index]
+
+    local = index.tz_localize(None) if index.tz is not None else index
+    strings = np.datetime_as_string(local.values, unit='s')
+    if index.tz is None:
+        return strings.tolist()
+
+    offsets = (local - index.tz_convert('UTC').tz_localize(None)).unique()
+    if len(offsets) != 1:
+        return [ts.isoformat() for ts in index]
+
+    offset_minutes = int(offsets[0].total_seconds() // 60)
+    sign = '+' if offset_minutes >= 0 else '-'
+    hh, mm = divmod(abs(offset_minutes), 60)
+    return np.char.add(strings, f"{sign}{hh:02d}:{mm:02d}").tolist()
+
+
+def load_project_demand(project):
+    """
+    Loads a project's demand onto a full-year 30-minute index, with the
+    project's energy_scale_factor applied.
+    Returns (full_30min_index, demand_kw array); raises ValueError if there is no usable data.
+    """
+    timestamps, demand_kw = load_project_series(project)
+    if not len(timestamps):
+        raise ValueError("No energy data found for project")
+
+    # Get the energy scale factor from the project
+    energy_scale_factor = getattr(project, 'energy_scale_factor', 1.0) or 1.0
+
+    sim_year = timestamps[0].year
+    full_30min_index = pd.date_range(start=f'{sim_year}-01-01', end=f'{sim_year}-12-31 23:59', freq='30min', tz='Africa/Johannesburg')
+
+    demand_kw = demand_kw * energy_scale_factor
+    if len(demand_kw) != len(full_30min_index):
+        raise ValueError(f"Length of values ({len(demand_kw)}) does not match length of index ({len(full_30min_index)})")
+
+    return full_30min_index, np.where(np.isnan(demand_kw), 0.0, demand_kw)
+
+
+def get_profile_percentages(profile_name, expected_length):
+    """
+    Returns a named generation profile (% of panel kWp per interval) as a float array.
+    `profile_name` is a registry key or label (services/generation_profiles.py).
+    """
+    try:
+        stored = generation_profiles.get_profile(profile_name)
+    except KeyError:
+        raise ValueError(f"Profile '{profile_name}' not found in generation profile data.")
+
+    if len(stored) != expected_length:
+        raise ValueError(f"Profile length mismatch. Expected {expected_length} entries, got {len(stored)}.")
+
+    # float64 for the arithmetic; the float32 store itself stays mapped and shared
+    return np.asarray(stored, dtype=float)
+
+
+@stage("simulate")
 def simulate_system_inner(
         project_id, 
         panel_kw, 
@@ -297,10 +398,16 @@ def simulate_system_inner(
         tilt,
         azimuth,
         use_pvgis=False,
-        profile_name='Midrand Azth:east-west Tilt:5',
+        profile_name=generation_profiles.DEFAULT_GENERATION_PROFILE,
         battery_soc_limit=20,
-        generator_config=None
+        generator_config=None,
+        include_index=False
 ):    
+    """
+    Simulates one design for a project over its demand year.
+    With include_index=True the result also carries the DatetimeIndex under "index"
+    (for in-process callers; it is not JSON serializable).
+    """
     try:
         project = Projects.query.get(project_id)
         if not project:
@@ -309,17 +416,14 @@ def simulate_system_inner(
         if not project.latitude or not project.longitude:
             return {"error": "Project location (latitude/longitude) is required for simulation"}
 
-        records = EnergyData.query.filter_by(project_id=project_id).order_by(EnergyData.timestamp).all()
-        if not records:
-            return {"error": "No energy data found for project"}
-
-        # Get the energy scale factor from the project
-        energy_scale_factor = getattr(project, 'energy_scale_factor', 1.0) or 1.0
+        try:
+            with stage("simulate.load_demand"):
+                full_30min_index, demand_values = load_project_demand(project)
+        except ValueError as e:
+            return {"error": str(e)}
 
         latitude, longitude = project.latitude, project.longitude
-        
-        sim_year = records[0].timestamp.year
-        full_30min_index = pd.date_range(start=f'{sim_year}-01-01', end=f'{sim_year}-12-31 23:59', freq='30min', tz='Africa/Johannesburg')
+        sim_year = full_30min_index[0].year
 
         generation_kw_series = None
         
@@ -327,443 +431,269 @@ def simulate_system_inner(
             if not project.latitude or not project.longitude:
                 return {"error": "Project location (latitude/longitude) is required for PVGIS simulation"}
 
-            weather_data, _, _, _ = get_pvgis_tmy(latitude, longitude, outputformat='csv', timeout=90)
-
-            if not isinstance(weather_data, pd.DataFrame):
-                raise TypeError("Failed to fetch weather data as a pandas DataFrame.")
-        
-            weather_data = weather_data.tz_convert('Africa/Johannesburg')
-
-            weather_data['month'] = weather_data.index.month
-            weather_data['day'] = weather_data.index.day
-            weather_data['hour'] = weather_data.index.hour
-            weather_data.sort_values(by=['month', 'day', 'hour'], inplace=True)
-            weather_data.drop(columns=['month', 'day', 'hour'], inplace=True)
-
-            new_hourly_index = pd.date_range(start=f"{sim_year}-01-01", periods=8760, freq='h', tz='Africa/Johannesburg')
-            weather_data.set_index(new_hourly_index, inplace=True)
-
-            # Resample to 30 minutes and interpolate to create smooth transitions
-            full_30min_index = pd.date_range(start=f"{sim_year}-01-01", end=f"{sim_year}-12-31 23:30", freq='30min', tz='Africa/Johannesburg')
-
-            weather_data_30min = weather_data.reindex(full_30min_index).interpolate(method='linear')
-
-            # Create a ModelChain for a more accurate simulation
-            site = Location(latitude, longitude, tz='Africa/Johannesburg')
-            temperature_params = TEMPERATURE_MODEL_PARAMETERS['sapm']['open_rack_glass_glass']
-
             panel_degrading_factor = 1
             degraded_panel_kw = panel_kw * panel_degrading_factor
-            PANEL_WATTAGE_W = 565 # JA SOLAR 72S30-565/GR
-            num_panels = math.ceil((degraded_panel_kw * 1000) / PANEL_WATTAGE_W)
-
-            ### THIS IS FOR CEC MODEL BUT IT NEEDS MORE PARAMETERS THAT WE DO NOT HAVE
-            # # PV Parameters (module paramaters) from datasheet for JA Solar JAM72S30-565/GR
-            # module_parameters = {
-            #     'V_mp_ref': 42.42, # Maximum Power Voltage (V)
-            #     'I_mp_ref': 13.32, # Maximum Power Current (A)
-            #     'V_oc_ref': 50.28, # Open Circuit Voltage (V)
-            #     'I_sc_ref': 14.21, # Short Circuit Current (A)
-
-            #     'alpha_sc': (0.045 / 100) * 14.21, # Temperature coefficient of short-circuit current (A/°C)
-            #     'beta_voc': (-0.275 / 100) * 50.28, # Temperature coefficient of open-circuit voltage (V/°C)
-
-            #     'gamma_pmp': -0.350 / 100, # Temperature coefficient of maximum power (Pmax) (%/°C)
-            #     'cells_in_series': 144, # Number of cells in series
-            #     'temp_ref': 25, # Reference temperature for STC
-            # }
-
-            pvwatts_module_parameters = {
-                # Total DC power of the array at reference conditions
-                'pdc0': degraded_panel_kw * 1000,  # Convert kW to W
-                'gamma_pdc': -0.350 / 100,  # Temperature coefficient of DC power (%/°C)
-            }
-
-            # Define the PV system components
-            system = PVSystem(
-                surface_tilt=tilt,
-                surface_azimuth=azimuth,  
-                module_parameters=pvwatts_module_parameters,  # kW to W
-                inverter_parameters={'pdc0': inverter_kva * 1000}, # kVA to W
-                temperature_model_parameters=temperature_params,
-                # modules_per_string=num_panels, ONLY IF USING CEC MODEL
-                # strings_per_inverter=1
-            )
-            mc = ModelChain(system, site, aoi_model="no_loss")
-
-            # Run the model against the weather data
-            mc.run_model(weather_data_30min)
-
-            # export pvlib generation profile
-            try:
-                # Handle both Series and DataFrame for dc results
-                raw_dc_kw = None
-                if isinstance(mc.results.dc, pd.DataFrame) and 'p_mp' in mc.results.dc:
-                    raw_dc_kw = mc.results.dc['p_mp'].fillna(0) / 1000
-                elif isinstance(mc.results.dc, pd.Series):
-                    raw_dc_kw = mc.results.dc.fillna(0) / 1000
-
-                if raw_dc_kw is not None and degraded_panel_kw > 0:
-                    # calculate yield (kwh/kwp)
-                    specific_yield_profile = (raw_dc_kw / degraded_panel_kw) * 100
-
-                    # define export path
-                    export_dir = "C:/Users/OrkaSolarEngineer/Documents/DesignWebApp/Load Profiles/PVlib Generation Profiles"
-                    os.makedirs(export_dir, exist_ok=True)
-
-                    sanitized_location = project.location.replace(' ', '_').replace(',', '')
-                    file_name = f'{sanitized_location}_gen_profile_{project_id}_azimuth_{azimuth}_tilt_{tilt}.csv'
-                    export_path = os.path.join(export_dir, file_name)
-
-
-                    # save profile
-                    specific_yield_profile.to_csv(export_path, index=False, header=False)
-                    print(f"SUCCESS: Unconstrained PVGIS generation profile exported to: {export_path}")
-
-            except Exception as export_exc:
-                print(f'ERROR: Failed to export: {export_exc}')
-
-            print("--- PVLIB RAW OUTPUT ---")
-            if mc.results is not None and mc.results.ac is not None:
-                print("Head of raw generation data (in watts):")
-                print(mc.results.ac.iloc[:20])
-                print(f"Number of entries in mc.results.ac: {len(mc.results.ac)}")
-                print(f"Number of entries in demand dataframe: {len(records)}")
-                print("\nStatistical summary of raw generation data:")
-                print(mc.results.ac.describe())
-            else:
-                print("mc.results.ac is None. No data was generated by pvlib")
-            print("---------------------------------------")
 
-            # Get the AC generation results (in Watts) and convert to kW
-            if mc.results is None or mc.results.ac is None:
-                raise ValueError("PVLib ModelChain did not produce AC generation results.")
-            
-            generation_kw_series = mc.results.ac.fillna(0) / 1000  # Convert Watts to kW
+            # pvlib runs once per site/orientation at 1 kWp; sizing is a scaling step on the cached profile
+            with stage("simulate.pv_profile"):
+                unit_profile = get_unit_profile(latitude, longitude, tilt, azimuth, sim_year)
+            full_30min_index = unit_profile.index
+
+            # register the pvlib profile (% of kWp) so it can be reused by name
+            try:
+                if degraded_panel_kw > 0:
+                    sanitized_location = (project.location or 'site').replace(' ', '_').replace(',', '')
+                    key = generation_profiles.profile_key(
+                        f'pvgis_{sanitized_location}_{project_id}_azimuth_{azimuth}_tilt_{tilt}')
+                    if not generation_profiles.has_profile(key):
+                        generation_profiles.add_profile(
+                            key, unit_profile.dc_per_kwp * 100,
+                            label=f'PVGIS {project.location or project_id} Azth:{azimuth} Tilt:{tilt}',
+                            location=project.location, latitude=latitude, longitude=longitude,
+                            azimuth=azimuth, tilt=tilt, source='pvgis', project_id=project_id)
+                        logger.info("registered unconstrained PVGIS generation profile %s", key)
+
+            except Exception:
+                logger.exception("could not register the PVGIS generation profile for project %s", project_id)
+
+            # AC generation in kW (pvwatts inverter clipping at inverter_kva)
+            generation_kw_series = pd.Series(unit_profile.ac_kw(degraded_panel_kw, inverter_kva), index=full_30min_index)
             
         else:
-            if GENERATION_PROFILE_DF.empty:
-                return {"error": "Generation profile CSV could not be loaded on server startup."}
-            
-            if profile_name not in GENERATION_PROFILE_DF.columns:
-                return {"error": f"Profile '{profile_name}' not found in generation profile data."}
-            
+            try:
+                with stage("simulate.generation_profile"):
+                    percentages = get_profile_percentages(profile_name, len(full_30min_index))
+            except ValueError as e:
+                return {"error": str(e)}
+
             panel_degrading_factor = 1
             real_panel_kw = panel_degrading_factor * panel_kw
             degraded_panel_kw = real_panel_kw
-            percentages = GENERATION_PROFILE_DF[profile_name].tolist()
 
-            if len(percentages) != len(full_30min_index):
-                return {"error": f"Profile length mismatch. Expected {len(full_30min_index)} entries, got {len(percentages)}."}
-            
-            raw_generation = [(perc / 100) * real_panel_kw for perc in percentages]
+            raw_generation = (percentages / 100) * real_panel_kw
             generation_kw_series = pd.Series(raw_generation, index=full_30min_index)
 
-            
-        generation_kw_series.name = 'generation_kw'
-        
-        # Now, align the generated series with the actual record timestamps
-        # Apply energy scale factor to demand values
-        demand_values = [r.demand_kw * energy_scale_factor for r in records]
-        demand_kw_series = pd.Series(demand_values, index=full_30min_index, name='demand_kw')
-        
-        sim_df = pd.DataFrame(demand_kw_series).join(generation_kw_series).fillna(0)
+        return simulate_arrays(full_30min_index, demand_values, generation_kw_series, degraded_panel_kw,
+                               battery_kwh, system_type, inverter_kva, allow_export,
+                               battery_soc_limit=battery_soc_limit, generator_config=generator_config,
+                               include_index=include_index)
 
-        # --- 2. Run the detailed energy flow simulation ---
-        demand_kw = sim_df['demand_kw'].tolist()
-        generation_kw = sim_df['generation_kw'].tolist()
-        
-        # The "potential" generation is what the panels could make, limited by the inverter
-        potential_generation_kw = pd.Series([min(gen, inverter_kva) for gen in generation_kw])
+    except Exception as e:
+        logger.exception("simulation failed for project %s", project_id)
+        return {"error": str(e)}
 
-        battery_capacity_kwh = battery_kwh or 0
-        battery_soc_kwh = battery_capacity_kwh
-        time_interval_hours = 0.5
 
-        usable_generation_kw = []
+def simulate_arrays(full_30min_index, demand_values, generation_kw, panel_kw, battery_kwh, system_type,
+                    inverter_kva, allow_export, battery_soc_limit=20, generator_config=None, include_index=False):
+    """
+    The dispatch and KPI half of simulate_system_inner, on already-loaded arrays (no database):
+    demand and AC generation in kW on `full_30min_index`. Returns the same result dict.
+    """
+    generation_kw_series = pd.Series(np.asarray(generation_kw, dtype=float), index=full_30min_index)
+    generation_kw_series.name = 'generation_kw'
+    
+    # Now, align the generated series with the demand timestamps
+    demand_kw_series = pd.Series(demand_values, index=full_30min_index, name='demand_kw')
+    
+    sim_df = pd.DataFrame(demand_kw_series).join(generation_kw_series).fillna(0)
 
-        min_soc_limit_kwh = battery_capacity_kwh * (float(battery_soc_limit) / 100)
-
-        # Generator config (defaults)
-        gen = generator_config or {}
-        gen_enabled = bool(gen.get('enabled', False))
-        gen_kva = float(gen.get('kva', 0) or 0)
-        gen_min_loading_pct = max(25.0, min(100.0, float(gen.get('min_loading_pct', 30))))
-        gen_can_charge = bool(gen.get('can_charge_battery', True))
-        gen_min_run_time = float(gen.get('min_run_time_hours', 1.0))
-        gen_start_soc = float(gen.get('battery_start_soc', 20))
-        gen_stop_soc = float(gen.get('battery_stop_soc', 80))
-        gen_service_cost = float(gen.get('service_cost', 1000))
-        gen_service_interval = float(gen.get('service_interval_hours', 1000))
-        diesel_price = float(
-            (gen.get('diesel_price_r_per_liter')
-             or gen.get('diesel_price_per_l')
-             or 22.58)
+    # --- 2. Run the detailed energy flow simulation ---
+    demand_kw = sim_df['demand_kw'].tolist()
+    
+    # The "potential" generation is what the panels could make, limited by the inverter
+    potential_generation_kw = np.minimum(sim_df['generation_kw'].to_numpy(dtype=float), inverter_kva).tolist()
+
+    battery_capacity_kwh = battery_kwh or 0
+    time_interval_hours = 0.5
+
+    min_soc_limit_kwh = battery_capacity_kwh * (float(battery_soc_limit) / 100)
+
+    # Generator config (defaults)
+    gen = generator_config or {}
+    gen_enabled = bool(gen.get('enabled', False))
+    gen_kva = float(gen.get('kva', 0) or 0)
+    gen_min_loading_pct = max(25.0, min(100.0, float(gen.get('min_loading_pct', 30))))
+    gen_can_charge = bool(gen.get('can_charge_battery', True))
+    gen_min_run_time = float(gen.get('min_run_time_hours', 1.0))
+    gen_start_soc = float(gen.get('battery_start_soc', 20))
+    gen_stop_soc = float(gen.get('battery_stop_soc', 80))
+    gen_service_cost = float(gen.get('service_cost', 1000))
+    gen_service_interval = float(gen.get('service_interval_hours', 1000))
+    diesel_price = float(
+        (gen.get('diesel_price_r_per_liter')
+         or gen.get('diesel_price_per_l')
+         or 22.58)
+    )
+
+    # Initialize generator controller for off-grid systems
+    generator = None
+    if system_type == 'off-grid' and gen_enabled and gen_kva > 0:
+        generator = GeneratorController(
+            size_kw=gen_kva,
+            min_loading_pct=gen_min_loading_pct,
+            min_run_time_hours=gen_min_run_time,
+            battery_start_soc=gen_start_soc,
+            battery_stop_soc=gen_stop_soc,
+            can_charge_battery=gen_can_charge
         )
 
-        # Initialize generator controller for off-grid systems
-        generator = None
-        if system_type == 'off-grid' and gen_enabled and gen_kva > 0:
-            generator = GeneratorController(
-                size_kw=gen_kva,
-                min_loading_pct=gen_min_loading_pct,
-                min_run_time_hours=gen_min_run_time,
-                battery_start_soc=gen_start_soc,
-                battery_stop_soc=gen_stop_soc,
-                can_charge_battery=gen_can_charge
-            )
-
-        import_from_grid, export_to_grid = [], []
-        usable_generation_kw, battery_soc_trace = [], []
-        shortfall_kw, generator_kw = [], []
-
-        for i in range(len(demand_kw)):
-            # PV available this interval (already inverter-capped)
-            gen_kwh = potential_generation_kw.iloc[i] * time_interval_hours
-            load_kwh = demand_kw[i] * time_interval_hours
-
-            # 1) PV to load
-            pv_to_load = min(gen_kwh, load_kwh)
-            rem_load_kwh = load_kwh - pv_to_load
-            excess_pv_kwh = gen_kwh - pv_to_load
-
-            # 2) Excess PV to battery (hybrid or off-grid)
-            pv_to_batt = 0.0
-            if excess_pv_kwh > 0 and system_type in ['hybrid', 'off-grid'] and battery_capacity_kwh > 0:
-                # Calculate available space in battery
-                available_space_kwh = battery_capacity_kwh - battery_soc_kwh
-                
-                # Battery maximum charge rate (1C rate = battery kWh capacity in kW)
-                battery_max_charge_rate_kw = battery_capacity_kwh
-                max_charge_kwh_this_interval = battery_max_charge_rate_kw * time_interval_hours
-                
-                # Use minimum of: excess PV, available space, charge rate limit
-                pv_to_batt = min(excess_pv_kwh, available_space_kwh, max_charge_kwh_this_interval)
-                battery_soc_kwh += pv_to_batt
-
-
-            # 3) Generator operation for off-grid systems
-            gen_to_load_kw = 0.0
-            gen_to_batt_kw = 0.0
-            fuel_consumed = 0.0
-            
-            if system_type == 'off-grid' and generator:
-                gen_to_load_kw, gen_to_batt_kw, fuel_consumed = generator.get_output(
-                    demand_shortfall_kw=rem_load_kwh / time_interval_hours,
-                    battery_soc_kwh=battery_soc_kwh,
-                    battery_capacity_kwh=battery_capacity_kwh,
-                    time_interval_hours=time_interval_hours,
-                    min_soc_limit_kwh=min_soc_limit_kwh,
-                    inverter_ac_limit_kw=inverter_kva
-                )
-                
-                # Apply generator output
-                gen_to_load_kwh = gen_to_load_kw * time_interval_hours
-                gen_to_batt_kwh = gen_to_batt_kw * time_interval_hours
-                
-                rem_load_kwh -= gen_to_load_kwh
-                rem_load_kwh = max(0.0, rem_load_kwh)  # Ensure non-negative
-                
-                if gen_to_batt_kwh > 0 and battery_capacity_kwh > 0:
-                    # Generator charges battery
-                    actual_charge = min(gen_to_batt_kwh, battery_capacity_kwh - battery_soc_kwh)
-                    battery_soc_kwh += actual_charge
-
-            # 4) Discharge battery to remaining load (respect min SOC)
-            batt_to_load = 0.0
-            if rem_load_kwh > 0 and system_type in ['hybrid', 'off-grid'] and battery_capacity_kwh > 0:
-                available_discharge = max(0.0, battery_soc_kwh - min_soc_limit_kwh)
-                batt_to_load = min(rem_load_kwh, available_discharge)
-                battery_soc_kwh -= batt_to_load
-                rem_load_kwh -= batt_to_load
-
-
-            # 5) Handle remaining load based on system type
-            if rem_load_kwh > 0:
-                if system_type == 'off-grid':
-                    # Off-grid: remaining load becomes shortfall (no grid)
-                    shortfall_kw.append(rem_load_kwh / time_interval_hours)
-                    import_from_grid.append(0.0)
-                else:
-                    # Grid-tied or hybrid: import from grid
-                    import_from_grid.append(rem_load_kwh / time_interval_hours)
-                    shortfall_kw.append(0.0)
-            else:
-                import_from_grid.append(0.0)
-                shortfall_kw.append(0.0)
-
-            # 6) Generator Output Tracking - get Actual Output including wasted power
-            if system_type == 'off-grid' and generator:
-                # Get the actual gen output (incl min loading)
-                actual_generator_output_kw = 0.0
-                if generator.is_running:
-                    min_output_kw = generator.size_kw * (generator.min_loading_pct / 100.0)
-                    useful_output_kw = gen_to_load_kw + gen_to_batt_kw
-                    actual_generator_output_kw = max(min_output_kw, useful_output_kw)
-                generator_kw.append(actual_generator_output_kw)
-            else:
-                generator_kw.append(0.0)
-
-            # 7) Grid export only if allowed (surplus PV after charging battery)
-            export_kwh = 0.0
-            remaining_excess_after_batt = excess_pv_kwh - pv_to_batt
-            if remaining_excess_after_batt > 0 and allow_export and system_type != 'off-grid':
-                export_kwh = remaining_excess_after_batt
-            export_to_grid.append(export_kwh / time_interval_hours)
-
-            # 8) Usable gen (PV used + PV to batt + export) for plotting
-            usable_kwh = pv_to_load + pv_to_batt + export_kwh
-            usable_generation_kw.append(usable_kwh / time_interval_hours)
-
-            battery_soc_trace.append((battery_soc_kwh / battery_capacity_kwh * 100) if battery_capacity_kwh > 0 else 0)
-
-        # Generator totals
-        diesel_liters_total = generator.total_fuel_liters if generator else 0.0
-        diesel_cost_total = diesel_liters_total * diesel_price
-        energy_shortfall_total_kwh = sum([x * time_interval_hours for x in shortfall_kw])
-        generator_energy_total_kwh = generator.total_energy_kwh if generator else 0.0
-        generator_runtime_hours = generator.total_runtime_hours if generator else 0.0
-
-        ### --- Calculate Annual Metrics --- ###
-        # data for full year (not filtered by date range)
-        total_demand_kwh = sum(demand_kw) * time_interval_hours
-        total_potential_gen_kwh = sum(potential_generation_kw) * time_interval_hours
-        total_utilized_gen_kwh = sum(usable_generation_kw) * time_interval_hours
-        total_import_kwh = sum(import_from_grid) * time_interval_hours
-        total_export_kwh = sum(export_to_grid) * time_interval_hours
-        pv_used_onsite_kwh = total_utilized_gen_kwh - total_export_kwh
-
-        # Calculate daytime consumptin (6AM to 6PM)
-        daytime_demand_kwh = 0
-        for i, ts in enumerate(full_30min_index):
-            hour = ts.hour
-            if 6 <= hour < 18:
-                daytime_demand_kwh += demand_kw[i] * time_interval_hours
-
-        # Calculate percentage metrics
-        daytime_consumption_ptc = (daytime_demand_kwh / total_demand_kwh * 100) if total_demand_kwh > 0 else 0
-        consumption_from_pv_ptc = (pv_used_onsite_kwh / total_demand_kwh * 100) if total_demand_kwh > 0 else 0
-        pv_utilization_ptc = (total_utilized_gen_kwh / total_potential_gen_kwh * 100) if total_potential_gen_kwh > 0 else 0
-
-        # Daily metrics
-        days_in_sim = len(full_30min_index) / 48
-        potential_gen_daily = total_potential_gen_kwh / days_in_sim
-        utilized_gen_daily = total_utilized_gen_kwh / days_in_sim
-        throttling_losses_daily = (total_potential_gen_kwh - total_utilized_gen_kwh) / days_in_sim
-
-        # Yield metrics
-        specific_yield_incl_losses = utilized_gen_daily / panel_kw if panel_kw > 0 else 0
-        specific_yield_excl_losses = potential_gen_daily / panel_kw if panel_kw > 0 else 0
-
-        # Annual projections
-        potential_gen_annual = potential_gen_daily * 365
-        utilized_gen_annual = utilized_gen_daily * 365
-        throttling_losses_annual = throttling_losses_daily * 365
-
-        # Battery cycles calculations
-        battery_cycles_annual = '-'
-        if battery_capacity_kwh > 0 and len(battery_soc_trace) > 1:
-            total_charge_energy = 0
-            for i in range(1, len(battery_soc_trace)):
-                # Calculate increase in SOC (charging only)
-                soc_diff = battery_soc_trace[i] - battery_soc_trace[i-1]
-                if soc_diff > 0: # Only count chargin
-                    # Convert SOC% to kWh
-                    charge_kwh = (soc_diff / 100) * battery_capacity_kwh
-                    total_charge_energy += charge_kwh
-
-            # Calculate daily cycles and project to annual
-            daily_cycles = (total_charge_energy / battery_capacity_kwh) / days_in_sim
-            battery_cycles_annual = daily_cycles * 365
-
-        # Create annual metrics object for the response
-        annual_metrics = {
-            "daytime_consumption_pct": round(daytime_consumption_ptc, 2),
-            "consumption_from_pv_pct": round(consumption_from_pv_ptc, 2),
-            "pv_utilization_pct": round(pv_utilization_ptc, 2),
-            "potential_gen_daily_kwh": round(potential_gen_daily, 2),
-            "utilized_gen_daily_kwh": round(utilized_gen_daily, 2),
-            "throttling_losses_daily_kwh": round(throttling_losses_daily, 2),
-            "specific_yield_incl_losses": round(specific_yield_incl_losses, 2),
-            "specific_yield_excl_losses": round(specific_yield_excl_losses, 2),
-            "potential_gen_annual_kwh": round(potential_gen_annual, 0),
-            "utilized_gen_annual_kwh": round(utilized_gen_annual, 0),
-            "throttling_losses_annual_kwh": round(throttling_losses_annual, 0),
-            "battery_cycles_annual": round(battery_cycles_annual, 1) if isinstance(battery_cycles_annual, (int, float)) else battery_cycles_annual,
-            "totalConsumptionAnnual": round(total_demand_kwh, 0),
-        }
+    with stage("simulate.dispatch"):
+        flows = run_dispatch(
+            demand_kw,
+            potential_generation_kw,
+            system_type,
+            battery_capacity_kwh,
+            min_soc_limit_kwh,
+            allow_export,
+            inverter_kva=inverter_kva,
+            generator=generator if system_type == 'off-grid' else None,
+            time_interval_hours=time_interval_hours
+        )
+    import_from_grid = flows["import_from_grid"]
+    export_to_grid = flows["export_to_grid"]
+    usable_generation_kw = flows["usable_generation_kw"]
+    battery_soc_trace = flows["battery_soc"]
+    shortfall_kw = flows["shortfall_kw"]
+    generator_kw = flows["generator_kw"]
+
+    # Generator totals
+    diesel_liters_total = generator.total_fuel_liters if generator else 0.0
+    diesel_cost_total = diesel_liters_total * diesel_price
+    energy_shortfall_total_kwh = sum([x * time_interval_hours for x in shortfall_kw])
+    generator_energy_total_kwh = generator.total_energy_kwh if generator else 0.0
+    generator_runtime_hours = generator.total_runtime_hours if generator else 0.0
+
+    ### --- Calculate Annual Metrics --- ###
+    # data for full year (not filtered by date range)
+    total_demand_kwh = sum(demand_kw) * time_interval_hours
+    total_potential_gen_kwh = sum(potential_generation_kw) * time_interval_hours
+    total_utilized_gen_kwh = sum(usable_generation_kw) * time_interval_hours
+    total_import_kwh = sum(import_from_grid) * time_interval_hours
+    total_export_kwh = sum(export_to_grid) * time_interval_hours
+    pv_used_onsite_kwh = total_utilized_gen_kwh - total_export_kwh
+
+    # Calculate daytime consumptin (6AM to 6PM)
+    hours = full_30min_index.hour
+    daytime_mask = (hours >= 6) & (hours < 18)
+    daytime_demand_kwh = sum((np.asarray(demand_kw)[daytime_mask] * time_interval_hours).tolist())
+
+    # Calculate percentage metrics
+    daytime_consumption_ptc = (daytime_demand_kwh / total_demand_kwh * 100) if total_demand_kwh > 0 else 0
+    consumption_from_pv_ptc = (pv_used_onsite_kwh / total_demand_kwh * 100) if total_demand_kwh > 0 else 0
+    pv_utilization_ptc = (total_utilized_gen_kwh / total_potential_gen_kwh * 100) if total_potential_gen_kwh > 0 else 0
+
+    # Daily metrics
+    days_in_sim = len(full_30min_index) / 48
+    potential_gen_daily = total_potential_gen_kwh / days_in_sim
+    utilized_gen_daily = total_utilized_gen_kwh / days_in_sim
+    throttling_losses_daily = (total_potential_gen_kwh - total_utilized_gen_kwh) / days_in_sim
+
+    # Yield metrics
+    specific_yield_incl_losses = utilized_gen_daily / panel_kw if panel_kw > 0 else 0
+    specific_yield_excl_losses = potential_gen_daily / panel_kw if panel_kw > 0 else 0
+
+    # Annual projections
+    potential_gen_annual = potential_gen_daily * 365
+    utilized_gen_annual = utilized_gen_daily * 365
+    throttling_losses_annual = throttling_losses_daily * 365
+
+    # Battery cycles calculations
+    battery_cycles_annual = '-'
+    if battery_capacity_kwh > 0 and len(battery_soc_trace) > 1:
+        total_charge_energy = 0
+        for i in range(1, len(battery_soc_trace)):
+            # Calculate increase in SOC (charging only)
+            soc_diff = battery_soc_trace[i] - battery_soc_trace[i-1]
+            if soc_diff > 0: # Only count chargin
+                # Convert SOC% to kWh
+                charge_kwh = (soc_diff / 100) * battery_capacity_kwh
+                total_charge_energy += charge_kwh
+
+        # Calculate daily cycles and project to annual
+        daily_cycles = (total_charge_energy / battery_capacity_kwh) / days_in_sim
+        battery_cycles_annual = daily_cycles * 365
+
+    # Create annual metrics object for the response
+    annual_metrics = {
+        "daytime_consumption_pct": round(daytime_consumption_ptc, 2),
+        "consumption_from_pv_pct": round(consumption_from_pv_ptc, 2),
+        "pv_utilization_pct": round(pv_utilization_ptc, 2),
+        "potential_gen_daily_kwh": round(potential_gen_daily, 2),
+        "utilized_gen_daily_kwh": round(utilized_gen_daily, 2),
+        "throttling_losses_daily_kwh": round(throttling_losses_daily, 2),
+        "specific_yield_incl_losses": round(specific_yield_incl_losses, 2),
+        "specific_yield_excl_losses": round(specific_yield_excl_losses, 2),
+        "potential_gen_annual_kwh": round(potential_gen_annual, 0),
+        "utilized_gen_annual_kwh": round(utilized_gen_annual, 0),
+        "throttling_losses_annual_kwh": round(throttling_losses_annual, 0),
+        "battery_cycles_annual": round(battery_cycles_annual, 1) if isinstance(battery_cycles_annual, (int, float)) else battery_cycles_annual,
+        "totalConsumptionAnnual": round(total_demand_kwh, 0),
+    }
+
+    result = {
+        "timestamps": isoformat_index(full_30min_index),
+        "demand": demand_kw,
+        "generation": [round(val, 2) for val in usable_generation_kw],
+        "import_from_grid": import_from_grid,
+        "export_to_grid": export_to_grid,
+        "battery_soc": [round(val, 2) for val in battery_soc_trace],
+        "panel_kw": panel_kw,
+        "potential_generation": [round(val, 2) for val in potential_generation_kw],
+        "inverter_kva": inverter_kva,
+        "battery_kwh": battery_kwh,
+
+        # Off-grid generator metrics
+        "shortfall_kw": [round(x, 3) for x in shortfall_kw],
+        "generator_kw": [round(x, 3) for x in generator_kw],
+        "diesel_liters_total": round(diesel_liters_total, 2),
+        "diesel_cost_total": round(diesel_cost_total, 2),
+        "energy_shortfall_total_kwh": round(energy_shortfall_total_kwh, 2),
+        "generator_energy_total_kwh": round(generator_energy_total_kwh, 2),
+        "generator_runtime_hours": round(generator_runtime_hours, 2),
+        "generator_config": {
+            "enabled": gen_enabled,
+            "kva": gen_kva,
+            "min_loading_pct": gen_min_loading_pct,
+            "can_charge_battery": gen_can_charge,
+            "min_run_time_hours": gen_min_run_time,
+            "battery_start_soc": gen_start_soc,
+            "battery_stop_soc": gen_stop_soc,
+            "service_cost": gen_service_cost,
+            "service_interval_hours": gen_service_interval,
+            "diesel_price_r_per_liter": diesel_price,
+            "generator_running_intervals": generator.is_running if generator else False,
+            "generator_total_run_time_hours": (generator.min_run_time_hours - generator.run_time_remaining) if generator else 0
+        },
+        "annual_metrics": annual_metrics
+    }
+    if generator:
+        # per-interval fuel, so the financials don't have to re-derive it from generator_kw
+        result["generator_fuel_l"] = np.round(flows["generator_fuel_l"], 4).tolist()
+    if include_index:
+        result["index"] = full_30min_index
+    return result
+    
 
-        return {
-            "timestamps": [ts.isoformat() for ts in full_30min_index],
-            "demand": demand_kw,
-            "generation": [round(val, 2) for val in usable_generation_kw],
-            "import_from_grid": import_from_grid,
-            "export_to_grid": export_to_grid,
-            "battery_soc": [round(val, 2) for val in battery_soc_trace],
-            "panel_kw": degraded_panel_kw,
-            "potential_generation": [round(val, 2) for val in potential_generation_kw],
-            "inverter_kva": inverter_kva,
-            "battery_kwh": battery_kwh,
-
-            # Off-grid generator metrics
-            "shortfall_kw": [round(x, 3) for x in shortfall_kw],
-            "generator_kw": [round(x, 3) for x in generator_kw],
-            "diesel_liters_total": round(diesel_liters_total, 2),
-            "diesel_cost_total": round(diesel_cost_total, 2),
-            "energy_shortfall_total_kwh": round(energy_shortfall_total_kwh, 2),
-            "generator_energy_total_kwh": round(generator_energy_total_kwh, 2),
-            "generator_runtime_hours": round(generator_runtime_hours, 2),
-            "generator_config": {
-                "enabled": gen_enabled,
-                "kva": gen_kva,
-                "min_loading_pct": gen_min_loading_pct,
-                "can_charge_battery": gen_can_charge,
-                "min_run_time_hours": gen_min_run_time,
-                "battery_start_soc": gen_start_soc,
-                "battery_stop_soc": gen_stop_soc,
-                "service_cost": gen_service_cost,
-                "service_interval_hours": gen_service_interval,
-                "diesel_price_r_per_liter": diesel_price,
-                "generator_running_intervals": generator.is_running if generator else False,
-                "generator_total_run_time_hours": (generator.min_run_time_hours - generator.run_time_remaining) if generator else 0
-            },
-            "annual_metrics": annual_metrics
-        }
+QUICK_DESIGN_PROFILE = "hopetown_14_15"  # the profile quick designs have always been simulated with
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {"error": str(e)}
-    
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-# Assumes your folder structure is: project_root/services/simulation_engine.py
-project_root = os.path.abspath(os.path.join(current_dir, '..'))
-csv_path = os.path.join(project_root, 'utils', 'generation_profile.csv')
-try:
-    GENERATION_PROFILE_DF = pd.read_csv(csv_path)
-    print(f"--- SUCCESS: Loaded generation profile from: {csv_path} ---")
-except FileNotFoundError:
-    print(f"--- FATAL STARTUP ERROR: Could not find 'generation_profile.csv'. Searched at path: {csv_path} ---")
-    GENERATION_PROFILE_DF = pd.DataFrame()
-
-def run_quick_simulation(scaled_load_profile, panel_kw, battery_kwh, system_type, inverter_kva):
+@stage("simulate.quick")
+def run_quick_simulation(scaled_load_profile, panel_kw, battery_kwh, system_type, inverter_kva,
+                         profile_name=QUICK_DESIGN_PROFILE):
     try:
-        if GENERATION_PROFILE_DF.empty:
-            return {"error": "Generation profile CSV could not be loaded on server startup."}
-
         demand_kw = [dp['demand_kw'] for dp in scaled_load_profile]
         timestamps = [dp['timestamp'] for dp in scaled_load_profile]
-        percentages = GENERATION_PROFILE_DF.iloc[:, 0].tolist()
+        try:
+            percentages = get_profile_percentages(profile_name, len(demand_kw))
+        except ValueError as e:
+            return {"error": str(e)}
 
-        if len(percentages) != len(demand_kw): return {"error": f"Profile length mismatch."}
-        
         panel_degrading_factor = 1
         real_panel_kw = panel_degrading_factor * panel_kw
 
         # inverter limiting
-        raw_pv_generation_kw = pd.Series([(perc / 100) * real_panel_kw for perc in percentages])
-        potential_generation_kw = pd.Series([min(gen, inverter_kva) for gen in raw_pv_generation_kw])
+        raw_pv_generation_kw = pd.Series((percentages / 100) * real_panel_kw)
+        potential_generation_kw = pd.Series(np.minimum(raw_pv_generation_kw.to_numpy(), inverter_kva))
 
         battery_capacity_kwh = battery_kwh or 0
         battery_soc_kwh = battery_capacity_kwh
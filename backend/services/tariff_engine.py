@@ -1,6 +1,8 @@
 # services/tariff_engine.py
 from datetime import datetime, time
 from decimal import Decimal, getcontext
+import numpy as np
+import pandas as pd
 
 getcontext().prec = 12
 
@@ -40,6 +42,57 @@ SUNDAY_TOU_LOW = {
     'off_peak': [(time(0), time(17, 59, 59)), (time(20), time(23, 59, 59))]
 }
 
+def _scan_tou_block(season: str, day_of_week: int, current_time: time) -> str:
+    """Finds the ToU block for a season, weekday (Monday is 0) and time of day."""
+    # Select the correct ToU map based on season and day of the week
+    tou_map = None
+    # A public holiday follows the Sunday schedule
+    if season == 'high':
+        if day_of_week == 5: tou_map = SATURDAY_TOU_HIGH
+        elif day_of_week == 6: tou_map = SUNDAY_TOU_HIGH
+        else: tou_map = WEEKDAY_TOU_HIGH
+    else:  # Low season
+        if day_of_week == 5: tou_map = SATURDAY_TOU_LOW
+        elif day_of_week == 6: tou_map = SUNDAY_TOU_LOW
+        else: tou_map = WEEKDAY_TOU_LOW
+
+    # Default to off_peak if no specific block is found
+    tou_block = 'off_peak'
+    for block, time_ranges in tou_map.items():
+        for start, end in time_ranges:
+            if start <= current_time <= end:
+                tou_block = block
+                # Break inner loop once matched
+                break
+        else:
+            # Continue if the inner loop wasn't broken
+            continue
+        # Break outer loop once matched
+        break
+
+    return tou_block
+
+
+# --- 2. Precompiled ToU lookup: (half-hour slot, weekday, season) -> block ---
+# Every ToU boundary falls on a whole hour, so one lookup per half-hour slot is exact.
+SLOTS_PER_DAY = 48
+SEASONS = ('high', 'low')  # season axis: 0 = high, 1 = low
+
+TOU_BLOCK_TABLE = np.empty((SLOTS_PER_DAY, 7, len(SEASONS)), dtype=object)
+for _season_idx, _season in enumerate(SEASONS):
+    for _weekday in range(7):
+        for _slot in range(SLOTS_PER_DAY):
+            TOU_BLOCK_TABLE[_slot, _weekday, _season_idx] = _scan_tou_block(
+                _season, _weekday, time(_slot // 2, 30 * (_slot % 2))
+            )
+
+
+def _table_position(timestamp: datetime) -> tuple:
+    """(slot, weekday, season index) of a timestamp in the lookup tables."""
+    season_idx = 0 if timestamp.month in HIGH_SEASON_MONTHS else 1
+    return timestamp.hour * 2 + timestamp.minute // 30, timestamp.weekday(), season_idx
+
+
 class TariffEngine:
     """
     A comprehensive engine to process and calculate costs based on complex tariff structures.
@@ -48,6 +101,11 @@ class TariffEngine:
     def __init__(self, tariff_json: dict):
         self.tariff_name = tariff_json.get('name', 'Unknown Tariff')
         self.processed_rates = self._process_rates(tariff_json.get('rates', []))
+        # Rate lookup tables, built once per tariff
+        self._energy_table = self._build_rate_table('energy')
+        self._demand_table = self._build_rate_table('demand')
+        self._energy_table_f = self._energy_table.astype(float)
+        self._demand_table_f = self._demand_table.astype(float)
 
     def _process_rates(self, rates_list: list) -> dict:
         """Transforms the flat list of rate objects into a structured dictionary for fast lookups."""
@@ -88,46 +146,34 @@ class TariffEngine:
 
     def _get_time_attributes(self, timestamp: datetime) -> (str, str):
         """Determines the season and ToU block for a given timestamp."""
-        season = 'high' if timestamp.month in HIGH_SEASON_MONTHS else 'low'
-        date_str = timestamp.strftime('%Y-%m-%d')
-        day_of_week = timestamp.weekday()  # Monday is 0, Sunday is 6
-
-        # Select the correct ToU map based on season and day of the week
-        tou_map = None
-        # A public holiday follows the Sunday schedule
-        if season == 'high':
-            if day_of_week == 5: tou_map = SATURDAY_TOU_HIGH
-            elif day_of_week == 6: tou_map = SUNDAY_TOU_HIGH
-            else: tou_map = WEEKDAY_TOU_HIGH
-        else:  # Low season
-            if day_of_week == 5: tou_map = SATURDAY_TOU_LOW
-            elif day_of_week == 6: tou_map = SUNDAY_TOU_LOW
-            else: tou_map = WEEKDAY_TOU_LOW
-        
-        # Find the corresponding ToU block for the current time
-        current_time = timestamp.time()
-        # Default to off_peak if no specific block is found
-        tou_block = 'off_peak'
-        for block, time_ranges in tou_map.items():
-            for start, end in time_ranges:
-                if start <= current_time <= end:
-                    tou_block = block
-                    # Break inner loop once matched
-                    break
-            else:
-                # Continue if the inner loop wasn't broken
-                continue
-            # Break outer loop once matched
-            break
-
-        return season, tou_block
+        slot, day_of_week, season_idx = _table_position(timestamp)
+        return SEASONS[season_idx], TOU_BLOCK_TABLE[slot, day_of_week, season_idx]
+
+    def _build_rate_table(self, category: str) -> np.ndarray:
+        """48x7x2 (slot x weekday x season) table of the total rate for a category (Decimal)."""
+        rates = self.processed_rates[category]
+        ancillary_rate = rates['all'].get('all', Decimal(0))
+        table = np.empty(TOU_BLOCK_TABLE.shape, dtype=object)
+        for position, tou_block in np.ndenumerate(TOU_BLOCK_TABLE):
+            season = SEASONS[position[2]]
+            table[position] = rates[season].get(tou_block, Decimal(0)) + ancillary_rate
+        return table
+
+    def rate_vector(self, index) -> (np.ndarray, np.ndarray):
+        """
+        Energy (R/kWh) and demand (R/kVA/month) rates for every timestamp in `index`,
+        as float arrays, in one vectorized lookup. Uses local wall-clock time of tz-aware indexes.
+        """
+        index = pd.DatetimeIndex(index)
+        slot = index.hour.to_numpy() * 2 + index.minute.to_numpy() // 30
+        weekday = index.dayofweek.to_numpy()
+        season_idx = np.where(np.isin(index.month.to_numpy(), list(HIGH_SEASON_MONTHS)), 0, 1)
+        return (self._energy_table_f[slot, weekday, season_idx],
+                self._demand_table_f[slot, weekday, season_idx])
 
     def get_energy_rate_r_per_kwh(self, timestamp: datetime) -> Decimal:
         """Gets the total applicable energy rate (R/kWh) for a specific timestamp."""
-        season, tou_block = self._get_time_attributes(timestamp)
-        time_based_rate = self.processed_rates['energy'][season].get(tou_block, Decimal(0))
-        ancillary_rate = self.processed_rates['energy']['all'].get('all', Decimal(0))
-        return time_based_rate + ancillary_rate
+        return self._energy_table[_table_position(timestamp)]
 
     def get_fixed_rate_r_per_day(self) -> Decimal:
         """Gets the total daily fixed charge in Rands."""
@@ -135,10 +181,7 @@ class TariffEngine:
 
     def get_demand_rate_r_per_kva_per_month(self, timestamp: datetime) -> Decimal:
         """Gets the total applicable demand rate (R/kVA/month) for a specific timestamp."""
-        season, tou_block = self._get_time_attributes(timestamp)
-        time_based_rate = self.processed_rates['demand'][season].get(tou_block, Decimal(0))
-        ancillary_rate = self.processed_rates['demand']['all'].get('all', Decimal(0))
-        return time_based_rate + ancillary_rate
+        return self._demand_table[_table_position(timestamp)]
 
 # --- Example Usage and Testing ---
 if __name__ == '__main__':
@@ -193,4 +236,15 @@ if __name__ == '__main__':
 
     demand_ts_offpeak = datetime(2025, 7, 7, 10, 30) # High Season, Standard
     demand_rate_offpeak = engine.get_demand_rate_r_per_kva_per_month(demand_ts_offpeak)
-    print(f"Demand rate for {demand_ts_offpeak.strftime('%B, %A at %H:%M')}: R {demand_rate_offpeak:.4f} (should be 0)")
\ No newline at end of file
+    print(f"Demand rate for {demand_ts_offpeak.strftime('%B, %A at %H:%M')}: R {demand_rate_offpeak:.4f} (should be 0)")
+    print("\n--- RATE VECTOR (full year, 30-min) ---")
+    year_index = pd.date_range('2025-01-01', periods=17520, freq='30min', tz='Africa/Johannesburg')
+    import time as _time
+    start = _time.perf_counter()
+    energy_rates, demand_rates = engine.rate_vector(year_index)
+    elapsed_ms = (_time.perf_counter() - start) * 1000
+    mismatches = sum(
+        1 for ts, rate in zip(year_index, energy_rates)
+        if rate != float(engine.get_energy_rate_r_per_kwh(ts))
+    )
+    print(f"{len(energy_rates)} rates in {elapsed_ms:.2f} ms, {mismatches} mismatches vs per-timestamp lookup")
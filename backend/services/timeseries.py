@@ -0,0 +1,166 @@
+# services/timeseries.py
+"""
+Helpers for shrinking 30-minute simulation series before they go to the browser.
+"""
+import numpy as np
+import pandas as pd
+
+# Named resolutions as a number of 30-minute intervals per bucket
+RESOLUTIONS = {'30min': 1, '1h': 2, '1d': 48, '1w': 336}
+
+
+def downsample_mean(values, factor):
+    """Mean of consecutive `factor`-sized buckets; a partial last bucket is averaged over its own length."""
+    values = np.asarray(values, dtype=float)
+    if factor <= 1 or len(values) == 0:
+        return values
+    starts = np.arange(0, len(values), factor)
+    sums = np.add.reduceat(values, starts)
+    counts = np.diff(np.append(starts, len(values)))
+    return sums / counts
+
+
+# --- Chart views of simulation traces (POST /api/simulate options) ---
+MONTHLY = '1mo'
+RESOLUTION_ALIASES = {'hourly': '1h', 'daily': '1d', 'weekly': '1w', 'monthly': MONTHLY}
+STEP_SECONDS = 1800  # simulation traces are 30-minute
+SIMULATION_SERIES = ("demand", "generation", "potential_generation", "import_from_grid",
+                     "export_to_grid", "battery_soc", "shortfall_kw", "generator_kw")
+
+
+def window_slice(index, window):
+    """
+    Positions of `index` inside `window` ({"start", "end"} or [start, end]; end exclusive,
+    either may be omitted). Naive bounds are read as the index's local time.
+    """
+    if not window:
+        return slice(0, len(index))
+    if not isinstance(window, (dict, list, tuple)) or (not isinstance(window, dict) and len(window) != 2):
+        raise ValueError('window must be {"start", "end"} or [start, end]')
+    start, end = window if isinstance(window, (list, tuple)) else (window.get("start"), window.get("end"))
+
+    def position(value, default):
+        if value is None:
+            return default
+        ts = pd.Timestamp(value)
+        if index.tz is not None and ts.tz is None:
+            ts = ts.tz_localize(index.tz)
+        return int(index.searchsorted(ts))
+
+    lo, hi = position(start, 0), position(end, len(index))
+    if lo >= hi:
+        raise ValueError("window does not overlap the simulated year")
+    return slice(lo, hi)
+
+
+def monthly_mean(values, index):
+    """Mean per calendar month of a contiguous, sorted series; returns (means, 'YYYY-MM' labels)."""
+    keys = index.year.to_numpy() * 100 + index.month.to_numpy()
+    months, starts = np.unique(keys, return_index=True)
+    sums = np.add.reduceat(np.asarray(values, dtype=float), starts)
+    counts = np.diff(np.append(starts, len(values)))
+    return sums / counts, [f"{k // 100}-{k % 100:02d}" for k in months]
+
+
+def lttb_indices(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets: positions of `threshold` points that keep the visual
+    shape of `values` (x is the position). The first and last points are always kept.
+    """
+    y = np.asarray(values, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)  # threshold - 2 middle buckets
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_lo, next_hi = (edges[b + 1], edges[b + 2]) if b + 2 < len(edges) else (n - 1, n)
+        avg_x = (next_lo + next_hi - 1) / 2
+        avg_y = y[next_lo:next_hi].mean()
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def check_view_options(series=None, resolution='30min', max_points=None):
+    """
+    Validates shape_series options as they arrive in a request body and returns the
+    canonical resolution. Raises ValueError for a wrong type or an unknown resolution.
+    """
+    if series is not None and (not isinstance(series, (list, tuple))
+                               or not all(isinstance(key, str) for key in series)):
+        raise ValueError("series must be a list of series names")
+    if not isinstance(resolution, str):
+        raise ValueError("resolution must be a string")
+    if max_points is not None and (isinstance(max_points, bool) or not isinstance(max_points, int)
+                                   or max_points < 3):
+        raise ValueError("max_points must be an integer of at least 3")
+    resolution = RESOLUTION_ALIASES.get(resolution, resolution)
+    if resolution != MONTHLY and resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of: {', '.join([*RESOLUTIONS, MONTHLY])}")
+    return resolution
+
+
+def shape_series(traces, index, series=None, resolution='30min', window=None, max_points=None):
+    """
+    Compact chart view of 30-minute traces: the `series` subset, cut to `window`, averaged
+    to `resolution` (RESOLUTIONS, '1mo' or an alias such as 'daily') and, past `max_points`, reduced with LTTB on the
+    first series. Timestamps are implied by "start" + "step_seconds" (+ "offsets", in steps,
+    after LTTB); monthly buckets are labelled by "periods" instead.
+    Raises ValueError for unknown series, resolutions or an empty window, and for options
+    of the wrong type (they come straight from request bodies).
+    """
+    resolution = check_view_options(series, resolution, max_points)
+    keys = list(series) if series else [key for key in SIMULATION_SERIES if key in traces]
+    unknown = [key for key in keys if key not in traces]
+    if unknown or not keys:
+        raise ValueError(f"unknown series: {', '.join(unknown) or '(none requested)'}")
+
+    window_positions = window_slice(index, window)
+    window_index = index[window_positions]
+    values = {key: np.asarray(traces[key], dtype=float)[window_positions] for key in keys}
+
+    view = {"resolution": resolution, "start": window_index[0].isoformat()}
+    periods = None
+    if resolution == MONTHLY:
+        for key in keys:
+            values[key], periods = monthly_mean(values[key], window_index)
+        view["step_seconds"] = None
+    else:
+        factor = RESOLUTIONS[resolution]
+        values = {key: downsample_mean(v, factor) for key, v in values.items()}
+        view["step_seconds"] = factor * STEP_SECONDS
+
+    if max_points and len(values[keys[0]]) > max_points:
+        offsets = lttb_indices(values[keys[0]], max_points)
+        values = {key: v[offsets] for key, v in values.items()}
+        view["offsets"] = offsets.tolist()
+        if periods:
+            periods = [periods[i] for i in offsets]
+    if periods:
+        view["periods"] = periods
+
+    view["count"] = len(values[keys[0]])
+    for key in keys:
+        view[key] = np.round(values[key], 3).tolist()
+    return view
+
+
+def compact_simulation(result, series=None, resolution='30min', window=None, max_points=None):
+    """
+    A simulate_system_inner result (run with include_index=True) with its full-resolution
+    lists and timestamps replaced by a shape_series view under "series". KPIs are untouched.
+    """
+    index = result.pop("index")
+    view = shape_series(result, index, series=series, resolution=resolution,
+                        window=window, max_points=max_points)
+    for key in (*SIMULATION_SERIES, "timestamps", "generator_fuel_l"):
+        result.pop(key, None)
+    result["series"] = view
+    return result
@@ -0,0 +1,78 @@
+# services/warmup.py
+"""
+Background warm-up of the simulation stack.
+
+The routes import numpy, pandas, pvlib and the simulation services inside their
+handlers, so the app starts (and answers /api/auth/* etc.) without paying for them.
+start_warmup() imports them in a background thread once the server is taking requests
+and compiles the generation profile store; GET /api/health/ready reports when that
+is done, so the first simulation after a deploy or scale-up does not pay the cost.
+"""
+import importlib
+import sys
+import time
+import traceback
+from datetime import datetime
+
+try:
+    # A real OS thread even when eventlet has monkey-patched threading
+    from eventlet.patcher import original as _original
+    _threading = _original("threading")
+except ImportError:
+    import threading as _threading
+
+WARM_MODULES = (
+    "numpy",
+    "pandas",
+    "pvlib.modelchain",
+    "pvlib.iotools",
+    "services.simulation_engine",
+    "services.batch_simulation",
+    "services.evaluation",
+    "services.financial_calcs",
+    "services.optimizer",
+    "services.columnar",
+)
+
+_lock = _threading.Lock()
+_state = {"status": "cold", "started_at": None, "finished_at": None, "seconds": None,
+          "modules": {}, "error": None}
+
+
+def start_warmup():
+    """Starts the warm-up thread once per process; safe to call on every request."""
+    with _lock:
+        if _state["status"] != "cold":
+            return
+        _state["status"] = "warming"
+        _state["started_at"] = datetime.utcnow().isoformat()
+    _threading.Thread(target=_warm, name="simulation-warmup", daemon=True).start()
+
+
+def _warm():
+    started = time.perf_counter()
+    try:
+        for name in WARM_MODULES:
+            module_started = time.perf_counter()
+            already_loaded = name in sys.modules
+            importlib.import_module(name)
+            if not already_loaded:
+                _state["modules"][name] = round((time.perf_counter() - module_started) * 1000, 1)
+
+        from services import generation_profiles
+        generation_profiles.list_profiles()  # compiles the .npy store if it is missing or stale
+        _state["status"] = "ready"
+    except Exception as e:
+        traceback.print_exc()
+        _state["status"], _state["error"] = "failed", str(e)
+    _state["finished_at"] = datetime.utcnow().isoformat()
+    _state["seconds"] = round(time.perf_counter() - started, 3)
+
+
+def warmup_status():
+    """Snapshot of the warm-up: status (cold/warming/ready/failed), timings in ms per module."""
+    return {**_state, "modules": dict(_state["modules"])}
+
+
+def is_ready():
+    return _state["status"] == "ready"
@@ -0,0 +1,160 @@
+# services/weather_cache.py
+"""
+Weather (PVGIS TMY) cache.
+
+Sites are keyed by latitude/longitude rounded to WEATHER_CACHE_PRECISION decimals
+(0.01 deg is roughly 1 km, finer than the PVGIS grid). Each site is stored once on
+disk as an .npz holding the hourly TMY rows already converted to SAST and sorted by
+month/day/hour, and is kept in an in-process LRU, so repeat simulations for the same
+site never go to the network.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pvlib.iotools import get_pvgis_tmy
+
+from .metrics import stage
+
+WEATHER_CACHE_DIR = os.environ.get(
+    'WEATHER_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'weather')
+)
+WEATHER_CACHE_PRECISION = 2
+WEATHER_LRU_SIZE = 32
+PVGIS_TIMEOUT = 90
+TMY_HOURS = 8760
+REQUIRED_COLUMNS = ('ghi', 'dni', 'dhi')
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+
+
+def site_key(latitude, longitude):
+    return (round(float(latitude), WEATHER_CACHE_PRECISION), round(float(longitude), WEATHER_CACHE_PRECISION))
+
+
+def _cache_path(key):
+    return os.path.join(WEATHER_CACHE_DIR, f"tmy_{key[0]:+.{WEATHER_CACHE_PRECISION}f}_{key[1]:+.{WEATHER_CACHE_PRECISION}f}.npz")
+
+
+def _order_tmy(weather_data):
+    """Converts a tz-aware hourly TMY frame to SAST and sorts it by month/day/hour."""
+    weather_data = weather_data.tz_convert('Africa/Johannesburg')
+
+    weather_data['month'] = weather_data.index.month
+    weather_data['day'] = weather_data.index.day
+    weather_data['hour'] = weather_data.index.hour
+    weather_data.sort_values(by=['month', 'day', 'hour'], inplace=True)
+    weather_data.drop(columns=['month', 'day', 'hour'], inplace=True)
+
+    return weather_data.reset_index(drop=True)
+
+
+def _validate(frame):
+    if len(frame) != TMY_HOURS:
+        raise ValueError(f"Weather data must have {TMY_HOURS} hourly rows, got {len(frame)}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Weather data is missing columns: {', '.join(missing)}")
+
+
+def _remember(key, frame):
+    with _lock:
+        _lru[key] = frame
+        _lru.move_to_end(key)
+        while len(_lru) > WEATHER_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def _store(key, frame, source):
+    """Writes a site to disk (atomically, so concurrent workers never read half a file) and to the LRU."""
+    _validate(frame)
+    frame = frame.astype(float)
+    os.makedirs(WEATHER_CACHE_DIR, exist_ok=True)
+    path = _cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            columns=np.array(frame.columns, dtype=str),
+            values=frame.to_numpy(),
+            site=np.array(key),
+            source=np.array(source),
+            created_at=np.array(datetime.utcnow().isoformat()),
+        )
+    os.replace(tmp_path, path)
+    _remember(key, frame)
+    return frame
+
+
+def _load(path):
+    with np.load(path) as npz:
+        return pd.DataFrame(npz['values'], columns=npz['columns'].tolist())
+
+
+def get_tmy(latitude, longitude, fetch=True):
+    """
+    Returns the hourly TMY for a site as an 8760-row DataFrame (RangeIndex, SAST month/day/hour order).
+    Checks the LRU, then disk, then PVGIS; with fetch=False a miss raises LookupError.
+    """
+    key = site_key(latitude, longitude)
+
+    with _lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            return _lru[key].copy()
+
+    path = _cache_path(key)
+    if os.path.exists(path):
+        frame = _load(path)
+        _remember(key, frame)
+        return frame.copy()
+
+    if not fetch:
+        raise LookupError(f"No cached weather data for site {key}")
+
+    with stage("pvgis.fetch"):
+        weather_data, _, _, _ = get_pvgis_tmy(key[0], key[1], outputformat='csv', timeout=PVGIS_TIMEOUT)
+    if not isinstance(weather_data, pd.DataFrame):
+        raise TypeError("Failed to fetch weather data as a pandas DataFrame.")
+
+    return _store(key, _order_tmy(weather_data), 'pvgis').copy()
+
+
+def fill_from_csv(latitude, longitude, csv_path):
+    """
+    Stores a local CSV as the site's weather data (offline stand-in for PVGIS).
+    The first column is the timestamp (naive values are taken as UTC, like PVGIS);
+    the rest use pvlib names and must include ghi, dni and dhi.
+    """
+    frame = pd.read_csv(csv_path, index_col=0, parse_dates=True, float_precision='round_trip')
+    index = pd.DatetimeIndex(frame.index)
+    frame.index = index.tz_localize('UTC') if index.tz is None else index
+    key = site_key(latitude, longitude)
+    _store(key, _order_tmy(frame), f"csv:{os.path.basename(csv_path)}")
+    return key
+
+
+def warm(coordinates):
+    """Makes sure every (lat, lon) is cached. Returns {key: 'cached' | 'fetched' | error message}."""
+    status = {}
+    for latitude, longitude in coordinates:
+        key = site_key(latitude, longitude)
+        if key in status:
+            continue
+        try:
+            cached = key in _lru or os.path.exists(_cache_path(key))
+            get_tmy(*key)
+            status[key] = 'cached' if cached else 'fetched'
+        except Exception as e:
+            status[key] = f"error: {e}"
+    return status
+
+
+def clear_memory_cache():
+    with _lock:
+        _lru.clear()
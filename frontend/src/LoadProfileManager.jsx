@@ -11,14 +11,13 @@ import { useNotification } from './NotificationContext';
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, Title, Tooltip, Legend, TimeScale, Filler);
 
 // A helper component to render the mini-chart for a profile
-const ProfileMiniChart = ({ profileData }) => {
+const ProfileMiniChart = ({ dayShape }) => {
     const chartData = useMemo(() => {
-        if (!profileData || profileData.length === 0) return { labels: [], datasets: [] };
+        if (!dayShape || dayShape.length === 0) return { labels: [], datasets: [] };
         
-        // Take a sample of the data (e.g., first week) for performance
-        const sampleData = profileData.slice(0, 336);
-        const labels = sampleData.map(d => new Date(d.timestamp || d.Timestamp));
-        const data = sampleData.map(d => d.demand_kw || d.Demand_kW || 0);
+        // The average day (48 half-hour points) precomputed by /api/load_profiles/summary
+        const labels = dayShape.map((_, i) => `${String(Math.floor(i / 2)).padStart(2, '0')}:${i % 2 ? '30' : '00'}`);
+        const data = dayShape;
 
         return {
             labels,
@@ -32,7 +31,7 @@ const ProfileMiniChart = ({ profileData }) => {
                 fill: true,
             }]
         };
-    }, [profileData]);
+    }, [dayShape]);
 
     const options = {
         responsive: true,
@@ -75,7 +74,7 @@ function LoadProfileManager() {
 
     const fetchProfiles = () => {
         setLoading(true);
-        axios.get(`${API_URL}/api/load_profiles`)
+        axios.get(`${API_URL}/api/load_profiles/summary`)
             .then(res => setProfiles(Array.isArray(res.data) ? res.data : []))
             .catch(err => {
                 setError(
@@ -283,7 +282,7 @@ function LoadProfileManager() {
                                                 </div>
                                             </Col>
                                             <Col xs={12} md={4} className="d-flex flex-column justify-content-center align-items-md-end">
-                                                <ProfileMiniChart profileData={profile.profile_data} />
+                                                <ProfileMiniChart dayShape={profile.day_shape} />
                                                 <div className="mt-2">
                                                     <Button variant="outline-primary" size="sm" className="me-2" onClick={() => handleEditClick(profile)}><i className="bi bi-pencil-fill"></i></Button>
                                                     <Button variant="outline-danger" size="sm" disabled={!isAdmin} title={!isAdmin ? 'Admin only' : 'Delete profile'} onClick={() => handleDelete(profile.id)}><i className="bi bi-trash-fill"></i></Button>